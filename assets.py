@@ -0,0 +1,103 @@
+""" image asset cache """
+
+import os
+import threading
+
+import helpers as hlp
+
+
+class AssetCache:
+    """
+    Cache of decoded images, converted to the image mode of the canvas they are pasted onto
+
+    Entries are keyed by path and image mode, and are reloaded if the modification time of their file changes.
+    """
+
+    def __init__(self):
+        self._images = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._images)
+
+    def get(self, path, mode):
+        """
+        Retrieve an image, loading and converting it if it is not cached or its file changed
+
+        Parameters:
+            path (string): Path of the image file.
+            mode (string): Image mode to convert the image to, e.g. `1`.
+
+        Returns:
+            object: PIL Image
+        """
+
+        key = (path, mode)
+        mtime = os.stat(path).st_mtime_ns
+
+        with self._lock:
+            entry = self._images.get(key)
+
+            if entry is not None and entry[0] == mtime:
+                return entry[1]
+
+            hlp.log_debug('AssetCache.get', 'load image `' + path + '` in mode `' + mode + '`')
+
+            # pylint: disable=import-outside-toplevel
+            from PIL import Image
+
+            # converting to `1` dithers the image, matching what `paste` does for images of a different mode
+            # see https://pillow.readthedocs.io/en/latest/reference/Image.html#PIL.Image.Image.convert
+            with Image.open(path) as file:
+                image = file.convert(mode)
+
+            self._images[key] = (mtime, image)
+
+            return image
+
+    def version(self, paths):
+        """
+        Describe the current version of image files, for use in cache keys of content they are part of
+
+        Parameters:
+            paths (iterable): Iterable of paths of image files.
+
+        Returns:
+            string: String containing the modification times of the files
+        """
+
+        return ",".join(str(os.stat(path).st_mtime_ns) for path in paths)
+
+    def preload(self, paths, mode):
+        """
+        Load and convert image files ahead of their first use
+
+        Parameters:
+            paths (iterable): Iterable of paths of image files.
+            mode (string):    Image mode to convert the images to, e.g. `1`.
+
+        Returns:
+            int: Number of images loaded
+        """
+
+        paths = sorted(set(paths))
+
+        for path in paths:
+            self.get(path, mode)
+
+        hlp.log_debug('AssetCache.preload', f'preload {len(paths)} images')
+
+        return len(paths)
+
+    def clear(self):
+        """
+        Remove all images from the cache
+
+        Returns:
+            bool: Boolean True
+        """
+
+        with self._lock:
+            self._images.clear()
+
+        return True
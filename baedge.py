@@ -1,13 +1,20 @@
 """ application """
 
-import importlib
+import functools
 import logging
-import os
 import platform
-import qrcode
-
-from PIL import Image, ImageDraw, ImageFont
-
+import threading
+
+from lib.waveshare_epd import epdregistry
+
+import assets
+import cache
+import fonts
+import layout
+import partial
+import refresh
+import screens
+import state
 import helpers as hlp
 import config as cfg
 
@@ -16,33 +23,369 @@ logging.basicConfig(level=cfg.app["logging"]["level"])
 
 hlp.log_debug(__name__, 'detected platform: `' + platform.system() + '`')
 
-# Waveshare's EPD library queries the content of `/proc/cpuinfo` for system information for string `Raspberry`
-# This makes it cumbersome to develop on non-RPi devices, so we override `epd_library` and skip initialization
-if os.path.exists("/proc/cpuinfo"):
-    # conditionally import the correct library depending on vartiables describing the EPD model and revision
-    hardware_model = cfg.baedge["hardware"]["model"]
-    hardware_revision = cfg.baedge["hardware"]["revision"]
+# conditionally import the correct library depending on vartiables describing the EPD model and revision
+hardware_model = cfg.baedge["hardware"]["model"]
+hardware_revision = cfg.baedge["hardware"]["revision"]
+
+# drivers are looked up in the capability registry, which indexes them without importing (hardware) modules
+driver_name = "epd" + hardware_model + hardware_revision
+
+# cache of packed display buffers, keyed by screen content
+buffer_cache = cache.BufferCache(cfg.baedge["cache"]["max_bytes"])
+
+# decoded images, converted to the image mode of the canvas
+asset_cache = assets.AssetCache()
+
+# registry of loaded fonts, keyed by face and size
+font_registry = fonts.FontRegistry(cfg.baedge["cache"]["max_fonts"])
+
+# largest font sizes at which texts fit the screen, keyed by content, font, and bounding box
+text_fitter = layout.TextFitter(font_registry)
+
+# serializes rendering, which is shared by the display worker and the warm-up thread
+render_lock = threading.Lock()
+
+# status returned by `write_screen` if the requested frame is already displayed
+UNCHANGED = "unchanged"
+
+# digest of the frame on a cleared panel
+CLEARED = "cleared"
 
-    hlp.log_debug(__name__, 'load EPD Library for Model `' + hardware_model + '` (Rev: `' + hardware_revision + '`)')
-    epd_library = importlib.import_module("lib.waveshare_epd.epd" + hardware_model + hardware_revision)
+# digest and name of the screen currently displayed on the panel
+on_glass = {
+    "digest": None,
+    "screen": None,
+}
 
-    SKIP_INITIALIZE_SCREEN = False
+# partial-refresh state of the panel, see `use_partial`
+partial_refresh = partial.PartialRefresh(cfg.baedge["partial"]["full_refresh_every"])
 
-else:
-    hlp.log_info(__name__, 'skip load of EPD Library on unsupported system')
-    epd_library = {}
+# waveform loaded into the panel, and when the next full refresh is due after fast refreshes
+waveform = refresh.Waveform(cfg.baedge["fast"]["full_refresh_every"])
 
-    # set flag to skip initialization of screen on unsupported system
-    SKIP_INITIALIZE_SCREEN = True
+# durations of refreshes, by refresh mode
+refresh_latency = refresh.Latency()
 
 
-def initialize_screen():
+@functools.cache
+def load_library():
     """
-    Initialize screen for use
+    Import the EPD library for the configured EPD model, on first use
+
+    The library is not imported when this module is imported, so that e.g. listing routes does not detect
+    (and claim) the hardware; hardware is detected on the first call into the library, see `epdconfig`.
+
+    Parameters:
+        n/a
+
+    Returns:
+        object: Module containing the EPD library
+    """
+
+    hlp.log_debug('load_library', 'load EPD Library for Model `' + hardware_model + '` (Rev: `' + hardware_revision + '`)')
+
+    library = epdregistry.load(driver_name)
+
+    # the GPIO backend is applied when the hardware is detected, on the first call into the library
+    library.epdconfig.set_gpio_backend(cfg.baedge["gpio"]["backend"])
+
+    return library
+
+
+def simulated():
+    """
+    Check if the EPD is simulated
+
+    Waveshare's EPD library falls back to a simulated panel if no supported hardware is found,
+    which allows for exercising (and benchmarking) the full render pipeline on non-RPi devices
+
+    Parameters:
+        n/a
+
+    Returns:
+        bool: Boolean True if no supported hardware was found, and the simulated EPD is used
+    """
+
+    # pylint: disable=import-outside-toplevel
+    from lib.waveshare_epd import epdsim
+
+    return isinstance(load_library().epdconfig.implementation, epdsim.Simulated)
+
+
+def capabilities(epd):
+    """
+    Retrieve the capabilities the driver of an EPD declares
+
+    Parameters:
+        epd (object): Object containing EPD library and configuration
+
+    Returns:
+        dict: Dict containing the resolution, planes, partial and fast refresh support, gray levels, and refresh durations
+    """
+
+    return epdregistry.capabilities(type(epd).__module__.rsplit(".", 1)[-1])
+
+
+def supported_modes(epd):
+    """
+    List the refresh modes the EPD model supports
+
+    Parameters:
+        epd (object): Object containing EPD library and configuration
+
+    Returns:
+        list: List of refresh modes (`full`, `fast`, `partial`, `gray4`)
+    """
+
+    return refresh.supported(capabilities(epd))
+
+
+def display_mode(epd):
+    """
+    Select the refresh mode contents are written with by default, based on the capabilities of the EPD model
+
+    Grayscale canvases use the 4-level grayscale mode if the EPD model supports it;
+    otherwise the enabled refresh mode with the shortest typical refresh duration is used.
+
+    Parameters:
+        epd (object): Object containing EPD library and configuration
+
+    Returns:
+        string: String containing the refresh mode (`gray4`, `partial`, `fast`, or `full`)
+    """
+
+    caps = capabilities(epd)
+
+    if cfg.baedge["image_mode"] == "L" and caps["gray_levels"] == 4:
+        return "gray4"
+
+    candidates = ["full"]
+
+    if caps["fast_init"] and cfg.baedge["fast"]["enable"]:
+        candidates.append("fast")
+
+    if caps["partial"] and cfg.baedge["partial"]["enable"]:
+        candidates.append("partial")
+
+    # ties are resolved in favor of the full refresh, which leaves no ghosting
+    return min(candidates, key=lambda mode: caps["refresh_ms"].get(mode, caps["refresh_ms"]["full"]))
+
+
+def use_4gray(epd, mode=None):
+    """
+    Check if contents should be written using the 4-level grayscale mode
+
+    Parameters:
+        epd (object):  Object containing EPD library and configuration
+        mode (string): String containing the requested refresh mode, or None for the default refresh mode
+
+    Returns:
+        bool: Boolean True if the refresh mode is the 4-level grayscale mode
+    """
+
+    return (mode or display_mode(epd)) == "gray4"
+
+
+def use_red(epd):
+    """
+    Check if contents should be written as separate black and red planes
+
+    Parameters:
+        epd (object): Object containing EPD library and configuration
+
+    Returns:
+        bool: Boolean True if the EPD model is a tri-color (black, white, and red) model
+    """
+
+    return capabilities(epd)["planes"] == 2
+
+
+def canvas_mode(epd, mode=None):
+    """
+    Determine the image mode of canvases rendered for the EPD
+
+    Parameters:
+        epd (object):  Object containing EPD library and configuration
+        mode (string): String containing the requested refresh mode, or None for the default refresh mode
+
+    Returns:
+        string: String containing `RGB` for tri-color EPD models, `L` for the 4-level grayscale mode,
+                or the configured image mode otherwise
+    """
+
+    if use_red(epd):
+        return "RGB"
+
+    if use_4gray(epd, mode):
+        return "L"
+
+    return cfg.baedge["image_mode"]
+
+
+def use_partial(epd, mode=None):
+    """
+    Check if contents should be written using partial refreshes
+
+    Parameters:
+        epd (object):  Object containing EPD library and configuration
+        mode (string): String containing the requested refresh mode, or None for the default refresh mode
+
+    Returns:
+        bool: Boolean True if the refresh mode is the partial refresh mode
+    """
+
+    return (mode or display_mode(epd)) == "partial"
+
+
+def use_spi_transport():
+    """
+    Check if the EPD is connected through the chunked spidev transport
 
     Parameters:
         n/a
 
+    Returns:
+        bool: Boolean True if the SPI clock can be configured and transfer statistics are recorded
+    """
+
+    epdconfig = load_library().epdconfig
+
+    return isinstance(epdconfig.implementation, epdconfig.SpiTransport)
+
+
+def spi_stats():
+    """
+    Retrieve SPI transfer statistics
+
+    Parameters:
+        n/a
+
+    Returns:
+        dict: Dict containing the SPI clock, chunk size, and throughput, or None if the transport does not record them
+    """
+
+    if not use_spi_transport():
+        return None
+
+    return load_library().epdconfig.implementation.spi_stats()
+
+
+def set_on_glass(digest, screen_name, sync=True):
+    """
+    Record which frame is currently displayed on the panel, and persist it for the next start
+
+    Parameters:
+        digest (string):      String containing the digest of the displayed buffer, `CLEARED`, or None if unknown
+        screen_name (string): String indicating which screen is displayed, or None if unknown
+        sync (bool):          Boolean indicating whether to flush the persisted state to the storage device
+
+    Returns:
+        bool: Boolean True
+    """
+
+    on_glass["digest"] = digest
+    on_glass["screen"] = screen_name
+
+    # the RAM of the simulated EPD does not outlive the process, so its state is not persisted
+    if cfg.baedge["state"]["enable"] and not simulated():
+        state.save(cfg.baedge["state"]["file"], {"driver": driver_name, **on_glass}, sync=sync)
+
+    return True
+
+
+def restore_screen(epd, screen_name=None):
+    """
+    Restore the on-glass state persisted before a restart, if the panel still shows what is needed at startup
+
+    Parameters:
+        epd (object):         Object containing EPD library and configuration
+        screen_name (string): String indicating which screen is displayed at startup, or None
+
+    Returns:
+        bool: Boolean True if the panel does not need to be cleared
+    """
+
+    if not cfg.baedge["state"]["enable"] or simulated():
+        return False
+
+    persisted = state.load(cfg.baedge["state"]["file"])
+
+    # frames of another EPD model cannot be compared with the frames of this one
+    if not persisted or persisted.get("driver") != driver_name:
+        return False
+
+    if persisted.get("digest") == CLEARED:
+        hlp.log_debug('restore_screen', 'panel is already cleared')
+        set_on_glass(CLEARED, None)
+        return True
+
+    if not screen_name or persisted.get("screen") != screen_name:
+        return False
+
+    # the screen or its assets may have changed since the frame was written, so the frame is compared by digest
+    digest = cache.buffer_digest(prepare_screen(epd, screen_name))
+
+    if digest != persisted.get("digest"):
+        return False
+
+    hlp.log_debug('restore_screen', 'panel already displays screen `' + screen_name + '`')
+    set_on_glass(digest, screen_name)
+
+    return True
+
+
+def load_waveform(epd, mode):
+    """
+    Load the waveform of a refresh mode into the EPD, unless it is already loaded
+
+    Parameters:
+        epd (object):  Object containing EPD library and configuration
+        mode (string): String containing the refresh mode
+
+    Returns:
+        bool: Boolean True if the EPD was re-initialized
+    """
+
+    if not waveform.load(epd, mode):
+        return False
+
+    # the simulated EPD decodes its RAM as 4-level grayscale only while the grayscale waveform is loaded
+    if simulated():
+        load_library().epdconfig.implementation.gray = mode == "gray4"
+
+    return True
+
+
+def init_display(epd):
+    """
+    Initialize the EPD with the full waveform
+
+    The waveform of the refresh mode of each write is loaded on that write, see `display_buffer`.
+
+    Parameters:
+        epd (object): Object containing EPD library and configuration
+
+    Returns:
+        bool: Boolean True
+    """
+
+    hlp.log_debug('init_display', 'initialize screen for `full` refreshes')
+
+    # the EPD may have been initialized by another driver, or not at all
+    # `Clear` writes white in the RAM format of the full waveform, which other waveforms (e.g. `gray4`) decode as black
+    waveform.forget()
+    load_waveform(epd, "full")
+
+    return True
+
+
+def initialize_screen(screen_name=None):
+    """
+    Initialize screen for use
+
+    Parameters:
+        screen_name (string): String indicating which screen is written next, to skip clearing a panel that shows it
+
     Returns:
         object: Object containing EPD library and configuration
     """
@@ -50,13 +393,42 @@ def initialize_screen():
     hlp.log_debug('initialize_screen', 'init function')
 
     try:
-        epd = epd_library.EPD()
+        library = load_library()
+        epd = library.EPD()
+
+        # describe the panel to the simulated EPD, so it can model refresh durations and decode its RAM
+        if simulated():
+            hlp.log_info('initialize_screen', 'no supported hardware found, use simulated EPD')
+
+            library.epdconfig.implementation.attach(
+                driver_name,
+                epd.width,
+                epd.height,
+                gray=use_4gray(epd),
+                output=cfg.baedge["simulator"]["output"] or None,
+                time_scale=cfg.baedge["simulator"]["time_scale"],
+            )
+
+        # waits for the busy EPD may have been cancelled before, e.g. when shutting down
+        library.epdconfig.reset_cancel()
 
-        hlp.log_debug('initialize_screen', 'initialize screen')
-        epd.init()
+        # the SPI clock is applied when the EPD module is initialized
+        if use_spi_transport():
+            library.epdconfig.implementation.spi_configure(cfg.baedge["spi"]["hz"])
+
+        init_display(epd)
+        partial_refresh.reset()
+
+        # skip the (slow) clear, and the write of the screen, if the panel still shows them from before the restart
+        if restore_screen(epd, screen_name):
+            hlp.log_debug('initialize_screen', 'skip clearing screen')
+            return epd
 
         hlp.log_debug('initialize_screen', 'clear screen')
+        load_waveform(epd, "full")
         epd.Clear()
+        waveform.record("full")
+        set_on_glass(CLEARED, None)
 
         hlp.log_debug('initialize_screen', 'end function')
         return epd
@@ -81,14 +453,25 @@ def clear_screen(epd, sleep_screen=False):
     hlp.log_debug('clear_screen', 'init function')
 
     try:
+        # load the full waveform again if the panel was left in another refresh mode
+        if partial_refresh.reset():
+            waveform.forget()
+
+        load_waveform(epd, "full")
+
         hlp.log_debug('clear_screen', 'clear screen')
         epd.Clear()
+        waveform.record("full")
+        set_on_glass(CLEARED, None)
 
         # only sleep if requested
         if sleep_screen:
             hlp.log_debug('clear_screen', 'sleep screen')
             epd.sleep()
 
+            # the panel is re-initialized after sleeping
+            waveform.forget()
+
         hlp.log_debug('clear_screen', 'end function')
         return True
 
@@ -97,166 +480,262 @@ def clear_screen(epd, sleep_screen=False):
         return None
 
 
-def write_screen(epd, screen_name, sleep_screen=False):
+def ink(fill, mode):
     """
-    Write contents to screen
+    Convert a configured fill to a color of a canvas
 
     Parameters:
-        epd (object):         Object containing EPD library and configuration
-        screen_name (string): String indicating which screen to load data from
-        sleep_screen (bool):  Boolean indicating whether to sleep display or not
+        fill (int or string): Gray value (0 is black, 255 is white), or color name (e.g. `red`).
+        mode (string):        Image mode of the canvas.
 
     Returns:
-        bool: Boolean True if contents were written successfully
+        object: Fill to draw with
     """
 
-    hlp.log_debug('write_screen', 'init function')
+    # PIL interprets integers as packed RGB values on RGB canvases, so gray values are expanded
+    if mode == "RGB" and isinstance(fill, int):
+        return (fill, fill, fill)
 
-    # load screen data from common object
-    hlp.log_debug('write_screen', 'load screen data for `' + screen_name + '`')
-    screen = cfg.screens[screen_name]
-    hlp.log_debug('write_screen:screen', screen_name)
+    return fill
 
-    try:
-        # assemble font information
-        # see https://pillow.readthedocs.io/en/latest/reference/ImageFont.html#PIL.ImageFont.truetype
-        font = ImageFont.truetype(
-            screen["font"]["face"],
-            screen["font"]["size"],
-        )
 
-        # create canvas for downstream population with relevant data
-        # see https://pillow.readthedocs.io/en/latesmt/reference/Image.html#PIL.Image.new
+def render_screen(epd, screen, timings=None, mode=None):
+    """
+    Render contents of a screen to a canvas
+
+    Parameters:
+        epd (object):    Object containing EPD library and configuration
+        screen (object): Layout of the screen, see `screens.load_layouts`
+        timings (dict):  Dict the durations (in milliseconds) of the `font`, `draw`, `paste`,
+                         and `qrcode` stages are added to, if any
+        mode (string):   String containing the requested refresh mode, or None for the default refresh mode
+
+    Returns:
+        object: PIL Image containing the rendered screen
+    """
+
+    # resolve fitted font sizes and QR code coordinates for this panel, once per layout
+    with hlp.timed(timings, "font"):
+        operations = screens.operations(screen, epd.width, epd.height, text_fitter)
+
+    # PIL is imported on first render, to keep it out of the server's startup
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image, ImageDraw
+
+    # create canvas for downstream population with relevant data
+    # see https://pillow.readthedocs.io/en/latest/reference/Image.html#PIL.Image.new
+    with hlp.timed(timings, "draw"):
         canvas = Image.new(
-            mode=cfg.baedge["image_mode"],
+            mode=canvas_mode(epd, mode),
             size=(epd.height, epd.width),
-            color=255,
+            color=ink(255, canvas_mode(epd, mode)),
         )
 
         # draw initial image to canvas
         draw = ImageDraw.Draw(canvas)
 
-        # iterate over shape items for screen
-        if "shapes" in screen:
-            for item in screen["shapes"]:
-                hlp.log_debug('write_screen:shape', item)
-
-                if "coordinates" in item and "fill" in item and "type" in item:
-                    hlp.log_debug('write_screen:shape', "Complete data to write a shape, trying to write it")
-                    if item["type"] == "rectangle":
-                        hlp.log_debug('write_screen:shape', "Creating a rectangle")
-                        draw.rectangle(item["coordinates"], fill=item["fill"])
-                    else:
-                        hlp.log_debug('write_screen:shape', "Unknown shape type: " + item["type"] + ", skipping")
-
-                else:
-                    hlp.log_debug('write_screen:shape', 'incomplete data, skip write shape')
-
-        # iterate over image items for screen
-        if "images" in screen:
-            for item in screen["images"]:
-                hlp.log_debug('write_screen:image', item)
-
-                if "content" in item and "coordinates" in item:
-                    content = item["content"]
-                    coordinates = item["coordinates"]
-
-                    hlp.log_debug('write_screen:image', 'write image')
-                    image = Image.open(item["content"])
-                    canvas.paste(image, item["coordinates"])
-
-                else:
-                    hlp.log_debug('write_screen:image', 'incomplete data, skip write image')
-
-        # iterate over text items for screen
-        if "texts" in screen:
-            for item in screen["texts"]:
-                hlp.log_debug('write_screen:text', item)
-
-                if "content" in item and "coordinates" in item and "fill" in item:
-                    text_font = font
-                    if "font" in item and "size" in item["font"] and "face" in item["font"]:
-                        hlp.log_debug("write_scree:text", "Overriding font with per-text specified one")
-                        text_font = ImageFont.truetype(
-                            item["font"]["face"],
-                            item["font"]["size"],
-                        )
-                        font_size = item["font"]["size"]
-                    else:
-                        font_size = screen["font"]["size"]
-                    # while the longest single line of text (based on splitting by \n, getting the longest one, and comparing its length)
-                    # used to make the text small enough to fit on the screen
-                    while text_font.getlength(max(item["content"].split("\n"), key=len)) > max(epd.width, epd.height):
-                        hlp.log_debug("write_scree:text", "Overriding font size to fit on screen")
-                        font_size -= 1
-                        text_font = ImageFont.truetype(
-                            screen["font"]["face"],
-                            font_size,
-                        )
-                    hlp.log_debug("write_screen:text", "Final font size, adjusted for tthe screen size:" + str(font_size))
-                    content = item["content"]
-                    coordinates = item["coordinates"]
-                    fill = item["fill"]
-
-                    hlp.log_debug('write_screen:text', 'write text')
-
-                    # assemble text object
-                    # see https://pillow.readthedocs.io/en/latest/reference/ImageDraw.html#PIL.ImageDraw.Draw
-                    draw.text(
-                        coordinates,
-                        content.lstrip(),
-                        font=text_font,
-                        fill=fill
-                    )
-                else:
-                    hlp.log_debug('write_screen:text', 'incomplete data, skip write text')
-
-        # check if QR Code configuration is present and prep QR code image
-        if "qrcode" not in screen:
-            hlp.log_debug('write_screen:qrcode', 'incomplete data, skip write QR code')
+        # tri-color panels have no gray levels, so text is drawn without anti-aliasing, as on `1` canvases
+        if use_red(epd):
+            draw.fontmode = "1"
+
+    # layouts are validated when compiled, so operations are drawn without further checks
+    for operation in operations:
+        if isinstance(operation, screens.Shape):
+            with hlp.timed(timings, "draw"):
+                draw.rectangle(operation.coordinates, fill=ink(operation.fill, canvas.mode))
+
+        elif isinstance(operation, screens.Picture):
+            with hlp.timed(timings, "paste"):
+                canvas.paste(asset_cache.get(operation.path, canvas.mode), operation.coordinates)
+
+        elif isinstance(operation, screens.Text):
+            with hlp.timed(timings, "font"):
+                text_font = font_registry.get(operation.font.face, operation.font.size)
+
+            # see https://pillow.readthedocs.io/en/latest/reference/ImageDraw.html#PIL.ImageDraw.Draw
+            with hlp.timed(timings, "draw"):
+                draw.text(operation.coordinates, operation.content, font=text_font, fill=ink(operation.fill, canvas.mode))
+
+        elif isinstance(operation, screens.QRCode):
+            with hlp.timed(timings, "qrcode"):
+                canvas.paste(operation.image, operation.coordinates)
+
+    return canvas
+
+
+def pack_screen(epd, canvas, mode=None):
+    """
+    Pack a rendered canvas into the EPD-specific buffer format
+
+    Parameters:
+        epd (object):    Object containing EPD library and configuration
+        canvas (object): PIL Image containing the rendered screen
+        mode (string):   String containing the requested refresh mode, or None for the default refresh mode
+
+    Returns:
+        object: Bytes (or tuple of Bytes for 4-level grayscale and tri-color models) containing the packed display buffer
+    """
+
+    if use_4gray(epd, mode):
+        return tuple(bytes(plane) for plane in epd.getbuffer_4Gray(canvas))
+
+    # black and red planes are split from the RGB canvas in a single pass
+    if use_red(epd):
+        return tuple(bytes(plane) for plane in epd.getbuffer_Red(canvas))
+
+    return bytes(epd.getbuffer(canvas))
+
+
+def display_buffer(epd, buffer, mode=None):
+    """
+    Write a packed display buffer to the EPD and refresh it
+
+    Fast refreshes are replaced by a full refresh when one is due, see `refresh.Waveform`.
+
+    Parameters:
+        epd (object):            Object containing EPD library and configuration
+        buffer (bytes or tuple): Bytes (or tuple of Bytes for 4-level grayscale and tri-color models) of the display buffer
+        mode (string):           String containing the requested refresh mode, or None for the default refresh mode
+
+    Returns:
+        string: String containing the refresh mode used
+    """
+
+    mode = waveform.resolve(mode or display_mode(epd))
+
+    # partial refreshes leave the partial waveform loaded, and any other refresh outdates their baseline
+    if mode != "partial" and partial_refresh.reset():
+        waveform.forget()
+
+    load_waveform(epd, mode)
+
+    timings = {}
+
+    with hlp.timed(timings, "refresh"):
+        if mode == "gray4":
+            hlp.log_debug('display_buffer', 'write 4-level grayscale buffers')
+            epd.display_4Gray(buffer)
+
+        # tri-color models take the black and the red plane as separate arguments
+        elif use_red(epd):
+            hlp.log_debug('display_buffer', 'write black and red buffers')
+            epd.display(*buffer)
+
+        # only the rows that changed since the previous frame are refreshed, with a periodic full refresh
+        elif mode == "partial":
+            mode = partial_refresh.display(epd, buffer)
+
+        # some drivers activate the fast waveform with a separate update sequence, others only load it in `init_Fast`
+        elif mode == "fast" and hasattr(epd, "display_Fast"):
+            epd.display_Fast(buffer)
 
         else:
-            if screen["qrcode"]["content"] and screen["qrcode"]["offset"]:
-                try:
-                    content = screen["qrcode"]["content"]
-                    # the (21,21) refers to the QR code image size, which matches the "version" 1 of the QR Code generation lib
-                    hlp.log_debug('write_screen:qrcode', 'prep QR code image')
-
-                    # see https://pypi.org/project/qrcode/#advanced-usage
-                    qrc_image = qrcode.QRCode(
-                        box_size=cfg.baedge["qrcode"]["box_size"],
-                        version=cfg.baedge["qrcode"]["version"],
-                    )
-
-                    # add data to image and make it fit the bounding box
-                    qrc_image.add_data(content)
-                    qrc_image.make(cfg.baedge["qrcode"]["fit"])
-
-                    hlp.log_debug('write_screen:qrcode', qrc_image)
-                    qrc_canvas = qrc_image.make_image()
-
-                    coordinates = hlp.generate_relative_coordinates(
-                        epd.height,
-                        epd.width,
-                        screen["qrcode"]["offset"],
-                        qrc_canvas.size
-                    )
-
-                    hlp.log_debug('write_screen:qrcode', 'place QR code image at coordinates: ' + str(coordinates))
-                    canvas.paste(qrc_canvas, coordinates)
-
-                except ValueError as e:
-                    hlp.log_exception('write_screen:qrcode', e)
-                    return None
-
-        # get buffered canvas data and update display
-        epd.display(epd.getbuffer(canvas))
+            epd.display(buffer)
+
+    hlp.log_debug('display_buffer', 'write buffer using ' + mode + ' refresh')
+
+    waveform.record(mode)
+    refresh_latency.record(mode, timings["refresh"])
+
+    return mode
+
+
+def prepare_screen(epd, screen_name, mode=None):
+    """
+    Retrieve the packed display buffer of a screen, rendering and caching it if it is not cached yet
+
+    Parameters:
+        epd (object):         Object containing EPD library and configuration
+        screen_name (string): String indicating which screen to load data from
+        mode (string):        String containing the requested refresh mode, or None for the default refresh mode
+
+    Returns:
+        object: Bytes (or tuple of Bytes for 4-level grayscale and tri-color models) containing the packed display buffer
+    """
+
+    # load the compiled layout of the screen
+    hlp.log_debug('prepare_screen', 'load screen layout for `' + screen_name + '`')
+    screen = screens.load_layouts()[screen_name]
+
+    # packed buffers are cached by screen content, so previously shown screens skip rendering entirely
+    # replaced image files change the key, as their modification time is part of it
+    # grayscale canvases are packed differently for the 4-level grayscale mode, so its buffers are cached separately
+    version = asset_cache.version(image.path for image in screen.images)
+    image_mode = canvas_mode(epd, mode) + ("/gray4" if use_4gray(epd, mode) else "")
+    key = cache.screen_key(screen.digest + version, epd.width, epd.height, image_mode)
+    buffer = buffer_cache.get(key)
+
+    if buffer is not None:
+        hlp.log_debug('prepare_screen', 'use cached buffer for screen `' + screen_name + '`')
+        return buffer
+
+    # screens are rendered by the display worker and the warm-up thread, one at a time
+    with render_lock:
+        hlp.log_debug('prepare_screen', 'render screen `' + screen_name + '`')
+        canvas = render_screen(epd, screen, mode=mode)
+        buffer = pack_screen(epd, canvas, mode)
+
+    buffer_cache.put(key, buffer)
+
+    return buffer
+
+
+# pylint: disable=too-many-arguments
+def write_screen(epd, screen_name, sleep_screen=False, force=False, progress=None, mode=None):
+    """
+    Write contents to screen
+
+    Parameters:
+        epd (object):         Object containing EPD library and configuration
+        screen_name (string): String indicating which screen to load data from
+        sleep_screen (bool):  Boolean indicating whether to sleep display or not
+        force (bool):         Boolean indicating whether to refresh the display if the frame is already displayed,
+                              which is implied for the `full` refresh mode
+        progress (function):  Function called with the name of each stage (`refreshing`) as it is entered
+        mode (string):        String containing the refresh mode (see `supported_modes`), or None for the default
+
+    Returns:
+        bool: Boolean True if contents were written successfully, or `UNCHANGED` if the frame is already displayed
+    """
+
+    hlp.log_debug('write_screen', 'init function')
+
+    if mode and mode not in supported_modes(epd):
+        hlp.log_debug('write_screen', 'refresh mode `' + mode + '` is not supported by the EPD model')
+        return False
+
+    try:
+        buffer = prepare_screen(epd, screen_name, mode)
+
+        # skip the (slow) display refresh if the panel already shows this exact frame
+        # explicitly requested full refreshes are never skipped, as they remove the ghosting left by other refreshes
+        digest = cache.buffer_digest(buffer)
+
+        if digest == on_glass["digest"] and not force and mode != "full":
+            hlp.log_debug('write_screen', 'frame for screen `' + screen_name + '` is already displayed, skip refresh')
+            return UNCHANGED
+
+        if progress:
+            progress("refreshing")
+
+        # the panel shows an unknown frame until the refresh completes, e.g. if the process is killed during it
+        # the marker is replaced right after the refresh, so only that state is flushed to the storage device
+        set_on_glass(None, None, sync=False)
+
+        # update display with packed buffer data
+        display_buffer(epd, buffer, mode)
+
+        set_on_glass(digest, screen_name)
 
         # only sleep if requested
         if sleep_screen:
             hlp.log_debug('write_screen', 'sleep screen')
             epd.sleep()
 
+            # the panel is re-initialized after sleeping, the next refresh must be a full refresh
+            partial_refresh.reset()
+            waveform.forget()
+
         hlp.log_debug('write_screen', 'end function')
         return True
 
@@ -0,0 +1,312 @@
+""" benchmark the render-to-glass pipeline of Baedge against simulated EPDs """
+
+import argparse
+import contextlib
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import helpers as hlp
+import config as cfg
+import baedge
+import screens
+
+from lib.waveshare_epd import epdconfig
+from lib.waveshare_epd import epdregistry
+from lib.waveshare_epd import epdsim
+
+# stages reported for each screen, in pipeline order
+STAGES = [
+    "font",
+    "draw",
+    "paste",
+    "qrcode",
+    "pack",
+    "transfer_bytes",
+    "refresh_wait",
+]
+
+
+def list_drivers():
+    """
+    List the EPD drivers available in the Waveshare library
+
+    Parameters:
+        n/a
+
+    Returns:
+        list: List of driver module names, e.g. `epd2in9_V2`
+    """
+
+    return sorted(epdregistry.drivers())
+
+
+def current_commit():
+    """
+    Retrieve the Git commit the benchmark runs against
+
+    Parameters:
+        n/a
+
+    Returns:
+        string: String containing the abbreviated commit hash, or None if it is unavailable
+    """
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            cwd=pathlib.Path(__file__).parent,
+            text=True,
+        ).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentiles(samples):
+    """
+    Summarize the samples of a stage
+
+    Parameters:
+        samples (list): List of samples.
+
+    Returns:
+        dict: Dict containing the 50th and 95th percentile of the samples
+    """
+
+    return {
+        "p50": round(float(np.percentile(samples, 50)), 3),
+        "p95": round(float(np.percentile(samples, 95)), 3),
+    }
+
+
+def clear_caches():
+    """
+    Remove all cached fonts, fitted text, QR codes, images, and drawing operations
+
+    Rendering memoizes this work across renders, so the caches are cleared before each run of the pipeline
+    for every stage to measure the work it does on first render.
+
+    Parameters:
+        n/a
+
+    Returns:
+        bool: Boolean True
+    """
+
+    baedge.font_registry.clear()
+    baedge.text_fitter.clear()
+    baedge.asset_cache.clear()
+    screens.qrcode_cache.clear()
+    screens.clear_operations()
+
+    return True
+
+
+def benchmark_screen(epd, simulator, layout, iterations):
+    """
+    Run every stage of the pipeline for a screen
+
+    Parameters:
+        epd (object):       Object containing EPD library and configuration
+        simulator (object): Simulated EPD the driver is bound to
+        layout (object):    Layout of the screen, see `screens.load_layouts`
+        iterations (int):   Number of times to run the pipeline
+
+    Returns:
+        dict: Dict containing the percentiles of each stage; durations are in milliseconds
+    """
+
+    samples = {stage: [] for stage in STAGES}
+
+    for _ in range(iterations):
+        timings = {}
+
+        clear_caches()
+
+        # QR codes are generated when layouts are compiled, so generation is timed separately
+        if layout.qrcode is not None:
+            with hlp.timed(timings, "qrcode"):
+                screens.compile_qrcode(layout.name, cfg.screens[layout.name]["qrcode"])
+
+        canvas = baedge.render_screen(epd, layout, timings)
+
+        with hlp.timed(timings, "pack"):
+            buffer = baedge.pack_screen(epd, canvas)
+
+        # the simulated EPD models the refresh, so only the modelled wait is reported
+        simulator.reset_stats()
+        baedge.display_buffer(epd, buffer)
+        stats = simulator.stats()
+
+        timings["transfer_bytes"] = stats["bytes_written"]
+        timings["refresh_wait"] = stats["busy_seconds"] * 1000
+
+        for stage in STAGES:
+            samples[stage].append(timings.get(stage, 0.0))
+
+    return {stage: percentiles(values) for stage, values in samples.items()}
+
+
+def benchmark_driver(driver, screen_names, iterations):
+    """
+    Run the pipeline for all screens against a simulated EPD driven by a driver
+
+    Parameters:
+        driver (string):     String containing the driver module name, e.g. `epd2in9_V2`
+        screen_names (list): List of screen names
+        iterations (int):    Number of times to run the pipeline for each screen
+
+    Returns:
+        dict: Dict containing the results for each screen
+    """
+
+    library = epdregistry.load(driver)
+    width, height = epdregistry.capabilities(driver)["resolution"]
+
+    # drivers read their pins from `epdconfig` when constructed, which detects (and claims) the hardware on first use,
+    # so the simulated EPD is bound before constructing the driver, and the benchmark never touches the panel
+    simulator = epdsim.Simulated()
+    previous = vars(epdconfig).get("implementation")
+    epdconfig.set_implementation(simulator)
+
+    try:
+        epd = library.EPD()
+        simulator.attach(driver, width, height, gray=baedge.use_4gray(epd), time_scale=0)
+
+        baedge.init_display(epd)
+
+        results = {}
+
+        for screen_name in screen_names:
+            try:
+                results[screen_name] = benchmark_screen(epd, simulator, screens.load_layouts()[screen_name], iterations)
+
+            # report failing drivers and screens, instead of aborting the whole benchmark
+            # pylint: disable=broad-exception-caught
+            except Exception as e:
+                results[screen_name] = {"error": f"{type(e).__name__}: {e}"}
+
+    # hardware that was not detected before the benchmark is not detected after it either
+    finally:
+        if previous is not None:
+            epdconfig.set_implementation(previous)
+
+    return results
+
+
+def benchmark_gpio(toggles):
+    """
+    Measure how fast the DC line can be toggled through each Raspberry Pi GPIO backend
+
+    Parameters:
+        toggles (int): Number of writes to the DC line for each backend
+
+    Returns:
+        dict: Dict containing the toggle rate of each backend, or the error that prevented measuring it
+    """
+
+    # the GPIO lines are claimed once the hardware is detected, and must be released for the backends to claim them
+    # hardware is detected on first use of `epdconfig`, so there is nothing to release if it was not used yet
+    implementation = vars(epdconfig).get("implementation")
+
+    if isinstance(implementation, epdconfig.RaspberryPi):
+        implementation.module_exit(cleanup=True)
+
+    results = {}
+
+    for backend, factory in (("gpiozero", epdconfig.RaspberryPi), ("lgpio", epdconfig.RaspberryPiLgpio)):
+        try:
+            implementation = factory()
+
+        # report unavailable backends (e.g. on non-RPi devices), instead of aborting the whole benchmark
+        # pylint: disable=broad-exception-caught
+        except Exception as e:
+            results[backend] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+
+        try:
+            start = time.perf_counter()
+
+            for toggle in range(toggles):
+                implementation.digital_write(implementation.DC_PIN, toggle & 1)
+
+            seconds = time.perf_counter() - start
+
+        finally:
+            implementation.module_exit(cleanup=True)
+
+        results[backend] = {
+            "toggles": toggles,
+            "seconds": round(seconds, 6),
+            "toggles_per_second": round(toggles / seconds),
+        }
+
+    return results
+
+
+def main():
+    """
+    Run the benchmark and print (or write) its results as JSON
+
+    Parameters:
+        n/a
+
+    Returns:
+        int: Exit code
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--iterations", type=int, default=20, help="number of runs per screen and driver")
+    parser.add_argument("--drivers", nargs="*", default=list_drivers(), help="driver module names")
+    parser.add_argument("--screens", nargs="*", default=cfg.screens["active"], help="screen names")
+    parser.add_argument("--output", help="file to write the JSON results to, instead of printing them")
+    parser.add_argument("--gpio", action="store_true", help="benchmark the GPIO backends instead of the render pipeline")
+    parser.add_argument("--toggles", type=int, default=100000, help="number of GPIO writes per backend")
+    args = parser.parse_args()
+
+    # partial refreshes depend on the previously displayed frame, so every run uses a full refresh
+    cfg.baedge["partial"]["enable"] = False
+
+    results = {
+        "meta": {
+            "commit": current_commit(),
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "image_mode": cfg.baedge["image_mode"],
+            "iterations": args.iterations,
+            "units": {stage: "bytes" if stage == "transfer_bytes" else "ms" for stage in STAGES},
+        },
+    }
+
+    # keep stdout clean for the JSON results, rendering helpers print debug output
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.gpio:
+            results["gpio"] = benchmark_gpio(args.toggles)
+
+        else:
+            results["drivers"] = {
+                driver: benchmark_driver(driver, args.screens, args.iterations)
+                for driver in args.drivers
+            }
+
+    output = json.dumps(results, indent=2)
+
+    if args.output:
+        pathlib.Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
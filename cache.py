@@ -0,0 +1,149 @@
+""" application caches """
+
+import collections
+import hashlib
+import threading
+
+import helpers as hlp
+
+
+def buffer_size(buffer):
+    """
+    Calculate the size of a packed display buffer
+
+    Parameters:
+        buffer (bytes or tuple): Bytes (or tuple of Bytes for multi-plane buffers) of a packed display buffer.
+
+    Returns:
+        int: Size of the buffer, in bytes
+    """
+
+    if isinstance(buffer, tuple):
+        return sum(len(plane) for plane in buffer)
+
+    return len(buffer)
+
+
+def buffer_digest(buffer):
+    """
+    Generate a digest of a packed display buffer
+
+    Parameters:
+        buffer (bytes or tuple): Bytes (or tuple of Bytes for multi-plane buffers) of a packed display buffer.
+
+    Returns:
+        string: SHA-256 hex digest of the buffer
+    """
+
+    digest = hashlib.sha256()
+
+    for plane in (buffer if isinstance(buffer, tuple) else (buffer,)):
+        digest.update(plane)
+
+    return digest.hexdigest()
+
+
+def screen_key(digest, width, height, image_mode):
+    """
+    Generate a content-addressed cache key for a screen
+
+    Parameters:
+        digest (string):     Digest of the screen configuration, see `screens.Layout`.
+        width (int):         Width of the eInk screen.
+        height (int):        Height of the eInk screen.
+        image_mode (string): Image mode of the canvas.
+
+    Returns:
+        string: SHA-256 hex digest of the screen configuration, panel geometry, and image mode
+    """
+
+    content = f"{digest}:{width}x{height}:{image_mode}"
+
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class BufferCache:
+    """
+    Least-recently-used cache of packed display buffers, bounded by their total size in bytes
+    """
+
+    def __init__(self, max_bytes):
+        """
+        Parameters:
+            max_bytes (int): Maximum total size of all cached buffers, in bytes.
+        """
+
+        self.max_bytes = max_bytes
+        self.size = 0
+
+        self._buffers = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buffers)
+
+    def get(self, key):
+        """
+        Retrieve a buffer from the cache and mark it as most recently used
+
+        Parameters:
+            key (string): Cache key, see `screen_key`.
+
+        Returns:
+            object: Cached buffer, or None if the key is not cached
+        """
+
+        with self._lock:
+            buffer = self._buffers.get(key)
+
+            if buffer is not None:
+                self._buffers.move_to_end(key)
+
+            return buffer
+
+    def put(self, key, buffer):
+        """
+        Store a buffer in the cache, evicting least recently used buffers to stay within `max_bytes`
+
+        Parameters:
+            key (string):            Cache key, see `screen_key`.
+            buffer (bytes or tuple): Bytes (or tuple of Bytes for multi-plane buffers) of a packed display buffer.
+
+        Returns:
+            bool: Boolean True if the buffer was cached
+        """
+
+        size = buffer_size(buffer)
+
+        # buffers larger than the cache itself are never stored
+        if size > self.max_bytes:
+            hlp.log_debug('BufferCache.put', f'skip caching buffer of {size} bytes, exceeds {self.max_bytes} bytes')
+            return False
+
+        with self._lock:
+            if key in self._buffers:
+                self.size -= buffer_size(self._buffers.pop(key))
+
+            self._buffers[key] = buffer
+            self.size += size
+
+            while self.size > self.max_bytes:
+                evicted_key, evicted_buffer = self._buffers.popitem(last=False)
+                self.size -= buffer_size(evicted_buffer)
+                hlp.log_debug('BufferCache.put', f'evict buffer `{evicted_key}`')
+
+        return True
+
+    def clear(self):
+        """
+        Remove all buffers from the cache
+
+        Returns:
+            bool: Boolean True
+        """
+
+        with self._lock:
+            self._buffers.clear()
+            self.size = 0
+
+        return True
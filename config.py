@@ -16,6 +16,15 @@ app = {
 
     "host": os.getenv("BAEDGE_SERVER_HOST", "0.0.0.0"),
 
+    # display job configuration
+    "jobs": {
+        # `history` defines how many (finished) jobs are kept for the `device_jobs` endpoint
+        "history": int(os.getenv("BAEDGE_JOBS_HISTORY", "32")),
+
+        # `stop_timeout` defines how many seconds to wait for a running job when shutting down
+        "stop_timeout": int(os.getenv("BAEDGE_JOBS_STOP_TIMEOUT", "30")),
+    },
+
     "logging": {
         # generic logging level, for Baedge functionality etc.
         "level": os.getenv("LOG_LEVEL", "INFO"),
@@ -30,6 +39,9 @@ app = {
         },
     },
 
+    # directory for data that is kept across restarts, e.g. the display state
+    "data": os.getenv("BAEDGE_DATA_PATH", "./data"),
+
     "media": os.getenv("BAEDGE_MEDIA_PATH", "./media"),
     "name": os.getenv("BAEDGE_SERVER_NAME", "Baedge"),
 
@@ -50,22 +62,91 @@ app = {
 baedge = {
     "hardware": {
         "model": os.getenv("BAEDGE_HARDWARE_MODEL", "2in9b"),
-        "revision": os.getenv("BAEDGE_HARDWARE_REVISION", "_v3"),
+        "revision": os.getenv("BAEDGE_HARDWARE_REVISION", "_V3"),
     },
 
     # "1" = 1-bit pixels, black and white, stored with one pixel per byte
-    # "L" = 8-bit pixels, grayscale
+    # "L" = 8-bit pixels, grayscale; uses the 4-level grayscale mode on EPD models that support it
     # see https://pillow.readthedocs.io/en/latest/handbook/concepts.html#concept-modes
-    "image_mode": "1",
+    "image_mode": os.getenv("BAEDGE_IMAGE_MODE", "1"),
+
+    # packed display buffer and font cache configuration
+    "cache": {
+        # `max_bytes` defines the total size of all cached display buffers
+        "max_bytes": int(os.getenv("BAEDGE_CACHE_MAX_BYTES", "262144")),
+
+        # `max_fonts` defines how many (face, size) font objects are kept in the font registry
+        "max_fonts": int(os.getenv("BAEDGE_CACHE_MAX_FONTS", "32")),
+    },
+
+    # SPI configuration, only used on hardware with a spidev-based SPI bus
+    "spi": {
+        # `hz` defines the SPI clock; the fastest stable clock differs per EPD model, see `spi` in `/v1/status/screen`
+        "hz": int(os.getenv("BAEDGE_SPI_HZ", "4000000")),
+    },
+
+    # GPIO configuration, only used on Raspberry Pis
+    "gpio": {
+        # `backend` is one of `gpiozero` or `lgpio`; `lgpio` writes the GPIO lines directly, see `make bench-gpio`
+        "backend": os.getenv("BAEDGE_GPIO_BACKEND", "gpiozero").lower(),
+    },
 
     # initial screen to display
     "initial_screen": "baedge",
 
+    # `clear_on_exit` is expected to be bool; keeping the screen on exit lets a restart skip the initial refreshes
+    "clear_on_exit": os.getenv("BAEDGE_CLEAR_ON_EXIT", "true").lower() == "true",
+
+    # display state configuration, persists which frame is displayed so that restarts skip redundant refreshes
+    "state": {
+        # `enable` is expected to be bool
+        "enable": os.getenv("BAEDGE_STATE", "true").lower() == "true",
+
+        # `file` defines where the display state is persisted, in the data directory
+        "file": os.path.join(app["data"], "state.json"),
+    },
+
+    # partial refresh configuration, only used on EPD models that support windowed partial refreshes
+    "partial": {
+        # `enable` is expected to be bool
+        "enable": os.getenv("BAEDGE_PARTIAL_REFRESH", "false").lower() == "true",
+
+        # `full_refresh_every` defines after how many partial refreshes a full refresh is forced to clear ghosting
+        "full_refresh_every": int(os.getenv("BAEDGE_PARTIAL_FULL_REFRESH_EVERY", "5")),
+    },
+
+    # fast refresh configuration, only used on EPD models that support a fast refresh waveform
+    "fast": {
+        # `enable` is expected to be bool; fast refreshes are used if they are the fastest enabled refresh type
+        "enable": os.getenv("BAEDGE_FAST_REFRESH", "true").lower() == "true",
+
+        # `full_refresh_every` defines after how many fast refreshes a full refresh is forced to clear ghosting
+        "full_refresh_every": int(os.getenv("BAEDGE_FAST_FULL_REFRESH_EVERY", "5")),
+    },
+
+    # simulated EPD configuration, only used if no supported hardware is found
+    "simulator": {
+        # `output` defines a PNG file the simulated panel contents are written to after each refresh, empty to disable
+        "output": os.getenv("BAEDGE_SIMULATOR_OUTPUT", ""),
+
+        # `time_scale` scales the modelled refresh durations and delays; `0` skips all waiting
+        "time_scale": float(os.getenv("BAEDGE_SIMULATOR_TIME_SCALE", "1")),
+    },
+
+    # warm-up configuration, renders and packs all active screens in the background after startup
+    "warmup": {
+        # `enable` is expected to be bool
+        "enable": os.getenv("BAEDGE_WARMUP", "true").lower() == "true",
+    },
+
     # QR code configuration
     "qrcode": {
         # `box_size` defines how many pixels each block of the QR code is
         "box_size": 3,
 
+        # `error_correction` is one of `L`, `M`, `Q`, or `H`, see https://pypi.org/project/qrcode/#advanced-usage
+        "error_correction": os.getenv("BAEDGE_QRCODE_ERROR_CORRECTION", "M"),
+
         # `fit` defines wether the image should be made to fit the bounding box
         "fit": True,
 
@@ -125,6 +206,7 @@ routes = {
     # list of routes to hide from the `status_routes` endpoint
     "hidden_routes": [
         "/<path:filename>",
+        app["prefix"] + app["namespaces"]["device"] + "/jobs/<job_id>",
         "/" + media["web"]["apple-touch-icon"],
         "/" + media["web"]["favicon"],
     ],
@@ -138,6 +220,7 @@ routes = {
     # /device routes
     "device_clear": app["prefix"] + app["namespaces"]["device"] + "/clear",
     "device_write": app["prefix"] + app["namespaces"]["device"] + "/write",
+    "device_jobs": app["prefix"] + app["namespaces"]["device"] + "/jobs/<job_id>",
 
     # /status routes
     "status": app["prefix"] + app["namespaces"]["status"],
@@ -284,7 +367,11 @@ screens = {
 
         "texts": [
             {
-                "content": baedge["wearer"]["name"] + "\n" + baedge["wearer"]["title"] + "\n\n" + baedge["wearer"]["social"],  # noqa: E501
+                "content": (
+                    baedge["wearer"]["name"] + "\n"
+                    + baedge["wearer"]["title"] + "\n\n"
+                    + baedge["wearer"]["social"]
+                ),
                 "coordinates": (5, 5),
                 "fill": 0,
             }
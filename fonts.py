@@ -0,0 +1,110 @@
+""" font registry """
+
+import collections
+import io
+import threading
+
+import helpers as hlp
+
+
+class FontRegistry:
+    """
+    Process-wide registry of FreeType fonts, keyed by face path and size
+
+    Each face is read from disk once; per-size font objects are kept in a least-recently-used cache
+    bounded by `max_fonts`.
+    """
+
+    def __init__(self, max_fonts):
+        """
+        Parameters:
+            max_fonts (int): Maximum number of (face, size) font objects to keep.
+        """
+
+        self.max_fonts = max_fonts
+
+        self._faces = {}
+        self._fonts = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._fonts)
+
+    def get(self, face, size):
+        """
+        Retrieve a font, loading it on first use
+
+        Parameters:
+            face (string): Path of the TrueType face.
+            size (int):    Size of the font, in points.
+
+        Returns:
+            object: PIL FreeTypeFont
+        """
+
+        key = (face, size)
+
+        with self._lock:
+            font = self._fonts.get(key)
+
+            if font is not None:
+                self._fonts.move_to_end(key)
+                return font
+
+            # read each face once, per-size fonts are created from the in-memory copy
+            if face not in self._faces:
+                hlp.log_debug('FontRegistry.get', 'read face `' + face + '`')
+                with open(face, "rb") as file:
+                    self._faces[face] = file.read()
+
+            # PIL is imported on first use, to keep it out of the server's startup
+            # pylint: disable=import-outside-toplevel
+            from PIL import ImageFont
+
+            # see https://pillow.readthedocs.io/en/latest/reference/ImageFont.html#PIL.ImageFont.truetype
+            font = ImageFont.truetype(io.BytesIO(self._faces[face]), size)
+            self._fonts[key] = font
+
+            while len(self._fonts) > self.max_fonts:
+                evicted_key, _ = self._fonts.popitem(last=False)
+                hlp.log_debug('FontRegistry.get', f'evict font `{evicted_key}`')
+
+            return font
+
+    def preload(self, layouts):
+        """
+        Load the fonts referenced by screen layouts
+
+        Parameters:
+            layouts (dict): Dict containing screen layouts, see `screens.load_layouts`.
+
+        Returns:
+            int: Number of fonts referenced by the layouts
+        """
+
+        references = set()
+
+        for layout in layouts.values():
+            references.add(layout.font)
+            references.update(text.font for text in layout.texts)
+
+        for face, size in sorted(references):
+            self.get(face, size)
+
+        hlp.log_debug('FontRegistry.preload', f'preload {len(references)} fonts')
+
+        return len(references)
+
+    def clear(self):
+        """
+        Remove all faces and fonts from the registry
+
+        Returns:
+            bool: Boolean True
+        """
+
+        with self._lock:
+            self._faces.clear()
+            self._fonts.clear()
+
+        return True
@@ -1,6 +1,9 @@
 """ application helpers """
 
+import contextlib
 import logging as log
+import os
+import time
 
 
 def log_info(identifier, message):
@@ -80,6 +83,73 @@ def log_exception(identifier, exception):
     return True
 
 
+def is_truthy(value):
+    """
+    Check if a (form or environment) value represents a boolean True
+
+    Parameters:
+        value (string): String value, e.g. `true`, `1`, or `yes`.
+
+    Returns:
+        bool: Boolean True if the value represents a boolean True
+    """
+
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def process_started_at():
+    """
+    Determine when the current process was started, including the time spent importing modules
+
+    Parameters:
+        n/a
+
+    Returns:
+        float: Timestamp (in seconds since the epoch) of the process start, or the current time if it cannot be determined
+    """
+
+    try:
+        # the process name (field 2) may contain spaces, so fields are counted from its closing parenthesis
+        # see https://man7.org/linux/man-pages/man5/proc_pid_stat.5.html
+        with open("/proc/self/stat", encoding="utf-8") as file:
+            fields = file.read().rsplit(")", 1)[1].split()
+
+        # `starttime` (field 22) is the time the process started after system boot, in clock ticks
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+
+        return time.time() - (time.clock_gettime(time.CLOCK_BOOTTIME) - started)
+
+    # not available on non-Linux systems
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.time()
+
+
+@contextlib.contextmanager
+def timed(timings, stage):
+    """
+    Measure the duration of a block of code, adding it to the total duration of a stage
+
+    Parameters:
+        timings (dict): Dict of durations (in milliseconds) by stage, or None to skip measuring.
+        stage (string): String indicating the stage the block of code belongs to.
+
+    Returns:
+        n/a
+    """
+
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+
+    try:
+        yield
+
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+
 def generate_relative_coordinates(height, width, offset, object_size):
     """
     Log an exception-level item containing an identifier and an exception
@@ -138,8 +208,8 @@ def format_url_map(url_map, hidden_routes, visible_methods, visible_prefix):
 
     # iterate over all received URLs
     for route in url_map:
-        # only consider rules that start with `visible_prefix`
-        if str(route).startswith(visible_prefix):
+        # only consider rules that start with `visible_prefix` and are not hidden
+        if str(route).startswith(visible_prefix) and str(route) not in hidden_routes:
 
             methods = [
               method for method in route.methods if method in visible_methods
@@ -0,0 +1,156 @@
+""" text layout """
+
+import threading
+
+import helpers as hlp
+
+# spacing (in pixels) between lines of multiline text, matches the default of PIL's `ImageDraw.text`
+# see https://pillow.readthedocs.io/en/latest/reference/ImageDraw.html#PIL.ImageDraw.ImageDraw.multiline_text
+LINE_SPACING = 4
+
+# smallest font size considered when fitting text
+MIN_FONT_SIZE = 1
+
+
+class TextFitter:
+    """
+    Find the largest font size at which text fits a bounding box
+
+    Font sizes are found by bisection, using a table of line metrics per (face, size);
+    results are memoized per (content, face, size, box), so repeated renders of a screen do no fitting.
+    """
+
+    def __init__(self, registry):
+        """
+        Parameters:
+            registry (object): FontRegistry used to load fonts, see `fonts.FontRegistry`.
+        """
+
+        self.registry = registry
+
+        self._metrics = {}
+        self._fits = {}
+        self._lock = threading.Lock()
+
+    def line_metrics(self, face, size):
+        """
+        Retrieve the vertical metrics of a font
+
+        Parameters:
+            face (string): Path of the TrueType face.
+            size (int):    Size of the font, in points.
+
+        Returns:
+            tuple: Tuple containing the line height and the line advance (line height including spacing), in pixels
+        """
+
+        key = (face, size)
+        metrics = self._metrics.get(key)
+
+        if metrics is None:
+            font = self.registry.get(face, size)
+            ascent, descent = font.getmetrics()
+
+            # PIL advances multiline text by the bottom of `A` plus the line spacing
+            metrics = (ascent + descent, font.getbbox("A")[3] + LINE_SPACING)
+            self._metrics[key] = metrics
+
+        return metrics
+
+    def measure(self, content, face, size):
+        """
+        Measure the size of (multiline) text
+
+        Parameters:
+            content (string): Text, lines are separated by `\\n`.
+            face (string):    Path of the TrueType face.
+            size (int):       Size of the font, in points.
+
+        Returns:
+            tuple: Tuple containing the width and height of the text, in pixels
+        """
+
+        font = self.registry.get(face, size)
+        lines = content.split("\n")
+        line_height, line_advance = self.line_metrics(face, size)
+
+        width = max(font.getlength(line) for line in lines)
+        height = (len(lines) - 1) * line_advance + line_height
+
+        return width, height
+
+    def fits(self, content, face, size, box):
+        """
+        Check if text fits a bounding box
+
+        Parameters:
+            content (string): Text, lines are separated by `\\n`.
+            face (string):    Path of the TrueType face.
+            size (int):       Size of the font, in points.
+            box (tuple):      Tuple containing the width and height of the bounding box, in pixels.
+
+        Returns:
+            bool: Boolean True if the text fits the bounding box
+        """
+
+        width, height = self.measure(content, face, size)
+
+        return width <= box[0] and height <= box[1]
+
+    def fit(self, content, face, size, box):
+        """
+        Find the largest font size, up to `size`, at which text fits a bounding box
+
+        Parameters:
+            content (string): Text, lines are separated by `\\n`.
+            face (string):    Path of the TrueType face.
+            size (int):       Preferred size of the font, in points.
+            box (tuple):      Tuple containing the width and height of the bounding box, in pixels.
+
+        Returns:
+            int: Font size, or `MIN_FONT_SIZE` if the text does not fit at any size
+        """
+
+        key = (content, face, size, box)
+
+        with self._lock:
+            fitted = self._fits.get(key)
+
+            if fitted is not None:
+                return fitted
+
+            if self.fits(content, face, size, box):
+                fitted = size
+
+            else:
+                # invariant: `low` fits (or is the smallest size considered), `high` does not fit
+                low, high = MIN_FONT_SIZE, size
+
+                while high - low > 1:
+                    middle = (low + high) // 2
+
+                    if self.fits(content, face, middle, box):
+                        low = middle
+                    else:
+                        high = middle
+
+                fitted = low
+                hlp.log_debug('TextFitter.fit', f'fit text at size {fitted} (of {size}) into box {box}')
+
+            self._fits[key] = fitted
+
+        return fitted
+
+    def clear(self):
+        """
+        Remove all line metrics and fitted font sizes
+
+        Returns:
+            bool: Boolean True
+        """
+
+        with self._lock:
+            self._metrics.clear()
+            self._fits.clear()
+
+        return True
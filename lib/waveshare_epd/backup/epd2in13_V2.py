@@ -30,6 +30,8 @@
 
 import logging
 from . import epdconfig
+from . import epdpack
+import numpy as np
 
 # Display resolution
 EPD_WIDTH       = 122
@@ -113,8 +115,7 @@ class EPD:
         epdconfig.digital_write(self.cs_pin, 1)
 
     def ReadBusy(self):
-        while(epdconfig.digital_read(self.busy_pin) == 1):      # 0: idle, 1: busy
-            epdconfig.delay_ms(100)
+        epdconfig.wait_busy(self.busy_pin, 0)      # 0: idle, 1: busy
 
     def TurnOnDisplay(self):
         self.send_command(0x22)
@@ -219,33 +220,20 @@ class EPD:
         return 0
 
     def getbuffer(self, image):
-        if self.width%8 == 0:
-            linewidth = int(self.width/8)
-        else:
-            linewidth = int(self.width/8) + 1
-
-        buf = [0xFF] * (linewidth * self.height)
         image_monocolor = image.convert('1')
         imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
 
         if(imwidth == self.width and imheight == self.height):
             logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    if pixels[x, y] == 0:
-                        x = imwidth - x
-                        buf[int(x / 8) + y * linewidth] &= ~(0x80 >> (x % 8))
+            # columns are mirrored and shifted by one (`x = imwidth - x`)
+            white = np.pad(np.asarray(image_monocolor)[:, ::-1], ((0, 0), (1, 0)), constant_values=True)
         elif(imwidth == self.height and imheight == self.width):
             logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        newy = imwidth - newy - 1
-                        buf[int(newx / 8) + newy*linewidth] &= ~(0x80 >> (y % 8))
-        return buf
+            white = np.asarray(image_monocolor).T
+        else:
+            return bytearray([0xFF]) * (epdpack.linewidth(self.width) * self.height)
+
+        return epdpack.pack_plane(white, epdpack.linewidth(self.width))
 
 
     def display(self, image):
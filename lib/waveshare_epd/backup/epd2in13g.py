@@ -30,10 +30,12 @@
 
 import logging
 from . import epdconfig
+from . import epdpack
 
 import PIL
 from PIL import Image
 import io
+import numpy as np
 
 # Display resolution
 EPD_WIDTH       = 122
@@ -84,8 +86,7 @@ class EPD:
     def ReadBusy(self):
         logger.debug("e-Paper busy H")
         epdconfig.delay_ms(100)
-        while(epdconfig.digital_read(self.busy_pin) == 0):      # 0: idle, 1: busy
-            epdconfig.delay_ms(5)
+        epdconfig.wait_busy(self.busy_pin, 1)      # 1: idle, 0: busy
         logger.debug("e-Paper busy release")
 
     def SetWindow(self):
@@ -180,25 +181,8 @@ class EPD:
 
         # Convert the soruce image to the 4 colors, dithering if needed
         image_4color = image_temp.convert("RGB").quantize(palette=pal_image)
-        buf_4color = bytearray(image_4color.tobytes('raw'))
-
-        # into a single byte to transfer to the panel
-        if self.width % 4 == 0 :
-            Width = self.width // 4
-        else :
-            Width = self.width // 4 + 1
-        Height = self.height
-        buf = [0x00] * int(Width * Height)
-        idx = 0
-        for j in range(0, Height):
-            for i in range(0, Width):
-                if i == Width -1:
-                    buf[i + j * Width] = (buf_4color[idx] << 6) + (buf_4color[idx+1] << 4)
-                    idx = idx + 2
-                else:
-                    buf[i + j * Width] = (buf_4color[idx] << 6) + (buf_4color[idx+1] << 4) + (buf_4color[idx+2] << 2) + buf_4color[idx+3]
-                    idx = idx + 4
-        return buf
+        # pack 4 pixels into a single byte to transfer to the panel
+        return epdpack.pack_2bpp(np.asarray(image_4color), epdpack.linewidth(self.width, 4))
 
     def display(self, image):
         if self.width % 4 == 0 :
@@ -29,11 +29,24 @@
 
 import logging
 from . import epdconfig
+from . import epdbase
+from . import epdpack
 
 # Display resolution
 EPD_WIDTH       = 176
 EPD_HEIGHT      = 264
 
+# Panel capabilities, indexed by `epdregistry` without importing this module, so only literals are allowed
+CAPABILITIES = {
+    "resolution": (176, 264),  # EPD_WIDTH, EPD_HEIGHT
+    "planes": 1,  # 1: black, 2: black and red
+    "partial": True,
+    "fast_init": True,
+    "gray_levels": 4,
+    # typical refresh duration in milliseconds, by refresh type (`full`, `fast`, `partial`, `gray4`)
+    "refresh_ms": {"full": 3000, "fast": 1500, "partial": 300, "gray4": 1500},
+}
+
 GRAY1  = 0xff #white
 GRAY2  = 0xC0
 GRAY3  = 0x80 #gray
@@ -41,7 +54,7 @@ GRAY4  = 0x00 #Blackest
 
 logger = logging.getLogger(__name__)
 
-class EPD:
+class EPD(epdbase.EPDBase):
     def __init__(self):
         self.reset_pin = epdconfig.RST_PIN
         self.dc_pin = epdconfig.DC_PIN
@@ -76,6 +89,54 @@ class EPD:
         0x22,0x17,0x41,0x0,0x32,0x1C,
         ]
 
+    INIT_SEQUENCE = [
+        epdbase.BUSY,
+        (0x12, None),                       #SWRESET
+        epdbase.BUSY,
+        (0x45, [0x00, 0x00, 0x07, 0x01]),   #set Ram-Y address start/end position, 0x0107-->(263+1)=264
+        (0x4F, [0x00, 0x00]),               # set RAM y address count to 0;
+        (0x11, [0x03]),                     # data entry mode
+    ]
+
+    INIT_FAST_SEQUENCE = [
+        epdbase.BUSY,
+        (0x12, None),                       #SWRESET
+        epdbase.BUSY,
+        (0x12, None),                       #SWRESET
+        epdbase.BUSY,
+        (0x18, [0x80]),                     #Read built-in temperature sensor
+        (0x22, [0xB1]),                     # Load temperature value
+        (0x20, None),
+        epdbase.BUSY,
+        (0x1A, [0x64, 0x00]),               # Write to temperature register
+        (0x45, [0x00, 0x00, 0x07, 0x01]),   #set Ram-Y address start/end position, 0x0107-->(263+1)=264
+        (0x4F, [0x00, 0x00]),               # set RAM y address count to 0;
+        (0x11, [0x03]),                     # data entry mode
+        (0x22, [0x91]),                     # Load temperature value
+        (0x20, None),
+        epdbase.BUSY,
+    ]
+
+    INIT_4GRAY_SEQUENCE = [
+        (0x12, None),                       # soft reset
+        epdbase.BUSY,
+        (0x74, [0x54]),                     #set analog block control
+        (0x7E, [0x3B]),                     #set digital block control
+        (0x01, [0x07, 0x01, 0x00]),         #Driver output control
+        (0x11, [0x03]),                     #data entry mode
+        (0x44, [0x00, 0x15]),               #set Ram-X address start/end position, 0x15-->(21+1)*8=176
+        (0x45, [0x00, 0x00, 0x07, 0x01]),   #set Ram-Y address start/end position, 0x0107-->(263+1)=264
+        (0x3C, [0x00]),                     #BorderWavefrom
+        (0x2C, LUT_DATA_4Gray[158:159]),    #VCOM Voltage, 0x1C
+        (0x3F, LUT_DATA_4Gray[153:154]),    #EOPQ
+        (0x03, LUT_DATA_4Gray[154:155]),    #VGH
+        (0x04, LUT_DATA_4Gray[155:158]),    #VSH1, VSH2, VSL
+        (0x32, LUT_DATA_4Gray[0:159]),      #LUT
+        (0x4E, [0x00]),                     # set RAM x address count to 0;
+        (0x4F, [0x00, 0x00]),               # set RAM y address count to 0X199;
+        epdbase.BUSY,
+    ]
+
     # Hardware reset
     def reset(self):
         epdconfig.digital_write(self.reset_pin, 1)
@@ -85,52 +146,33 @@ class EPD:
         epdconfig.digital_write(self.reset_pin, 1)
         epdconfig.delay_ms(200)
 
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-
     def ReadBusy(self):
         logger.debug("e-Paper busy")
-        while(epdconfig.digital_read(self.busy_pin) == 1):      #  1: idle, 0: busy
-            epdconfig.delay_ms(20)
+        epdconfig.wait_busy(self.busy_pin, 0)      #  0: idle, 1: busy
         logger.debug("e-Paper busy release")
 
     def TurnOnDisplay(self):
-        self.send_command(0x22) #Display Update Control
-        self.send_data(0xF7)
-        self.send_command(0x20) #Activate Display Update Sequence
+        self.send(0x22, [0xF7]) #Display Update Control
+        self.send(0x20) #Activate Display Update Sequence
         self.ReadBusy()
 
     def TurnOnDisplay_Fast(self):
-        self.send_command(0x22) #Display Update Control
-        self.send_data(0xC7)
-        self.send_command(0x20) #Activate Display Update Sequence
+        self.send(0x22, [0xC7]) #Display Update Control
+        self.send(0x20) #Activate Display Update Sequence
         self.ReadBusy()
 
     def TurnOnDisplay_Partial(self):
-        self.send_command(0x22) #Display Update Control
-        self.send_data(0xFF)
-        self.send_command(0x20) #Activate Display Update Sequence
+        self.send(0x22, [0xFF]) #Display Update Control
+        self.send(0x20) #Activate Display Update Sequence
         self.ReadBusy()
 
     def TurnOnDisplay_4GRAY(self):
-        self.send_command(0x22) #Display Update Control
-        self.send_data(0xC7)
-        self.send_command(0x20) #Activate Display Update Sequence
+        self.send(0x22, [0xC7]) #Display Update Control
+        self.send(0x20) #Activate Display Update Sequence
         self.ReadBusy()
 
     def Lut(self):
-        self.send_command(0x32)
-        for i in range(159):
-            self.send_data(self.LUT_DATA_4Gray[i])
+        self.send(0x32, self.LUT_DATA_4Gray[0:159])
 
     def init(self):
         if (epdconfig.module_init() != 0):
@@ -138,23 +180,7 @@ class EPD:
 
         # EPD hardware init start
         self.reset()
-        self.ReadBusy()
-
-        self.send_command(0x12) #SWRESET
-        self.ReadBusy()
-
-        self.send_command(0x45) #set Ram-Y address start/end position
-        self.send_data(0x00)
-        self.send_data(0x00)
-        self.send_data(0x07) #0x0107-->(263+1)=264
-        self.send_data(0x01)
-
-        self.send_command(0x4F)   # set RAM y address count to 0;
-        self.send_data(0x00)
-        self.send_data(0x00)
-
-        self.send_command(0x11)  # data entry mode
-        self.send_data(0x03)
+        self.send_sequence(self.INIT_SEQUENCE)
         return 0
 
     def init_Fast(self):
@@ -163,235 +189,44 @@ class EPD:
 
         # EPD hardware init start
         self.reset()
-        self.ReadBusy()
-
-        self.send_command(0x12) #SWRESET
-        self.ReadBusy()
-
-        self.send_command(0x12) #SWRESET
-        self.ReadBusy()
-
-        self.send_command(0x18) #Read built-in temperature sensor
-        self.send_data(0x80)
-
-        self.send_command(0x22) # Load temperature value
-        self.send_data(0xB1)
-        self.send_command(0x20)
-        self.ReadBusy()
-
-        self.send_command(0x1A) # Write to temperature register
-        self.send_data(0x64)
-        self.send_data(0x00)
-
-        self.send_command(0x45) #set Ram-Y address start/end position
-        self.send_data(0x00)
-        self.send_data(0x00)
-        self.send_data(0x07) #0x0107-->(263+1)=264
-        self.send_data(0x01)
-
-        self.send_command(0x4F)   # set RAM y address count to 0;
-        self.send_data(0x00)
-        self.send_data(0x00)
-
-        self.send_command(0x11)   # data entry mode
-        self.send_data(0x03)
-
-        self.send_command(0x22) # Load temperature value
-        self.send_data(0x91)
-        self.send_command(0x20)
-        self.ReadBusy()
+        self.send_sequence(self.INIT_FAST_SEQUENCE)
         return 0
 
     def Init_4Gray(self):
         if (epdconfig.module_init() != 0):
             return -1
         self.reset()
-
-        self.send_command(0x12) # soft reset
-        self.ReadBusy();
-
-        self.send_command(0x74) #set analog block control
-        self.send_data(0x54)
-        self.send_command(0x7E) #set digital block control
-        self.send_data(0x3B)
-
-        self.send_command(0x01) #Driver output control
-        self.send_data(0x07)
-        self.send_data(0x01)
-        self.send_data(0x00)
-
-        self.send_command(0x11) #data entry mode
-        self.send_data(0x03)
-
-        self.send_command(0x44) #set Ram-X address start/end position
-        self.send_data(0x00)
-        self.send_data(0x15)   #0x15-->(21+1)*8=176
-
-        self.send_command(0x45) #set Ram-Y address start/end position
-        self.send_data(0x00)
-        self.send_data(0x00)
-        self.send_data(0x07) #0x0107-->(263+1)=264
-        self.send_data(0x01)
-
-
-        self.send_command(0x3C) #BorderWavefrom
-        self.send_data(0x00)
-
-
-        self.send_command(0x2C)     #VCOM Voltage
-        self.send_data(self.LUT_DATA_4Gray[158])    #0x1C
-
-
-        self.send_command(0x3F) #EOPQ
-        self.send_data(self.LUT_DATA_4Gray[153])
-
-        self.send_command(0x03) #VGH
-        self.send_data(self.LUT_DATA_4Gray[154])
-
-        self.send_command(0x04) #
-        self.send_data(self.LUT_DATA_4Gray[155]) #VSH1
-        self.send_data(self.LUT_DATA_4Gray[156]) #VSH2
-        self.send_data(self.LUT_DATA_4Gray[157]) #VSL
-
-        self.Lut() #LUT
-
-
-        self.send_command(0x4E)   # set RAM x address count to 0;
-        self.send_data(0x00)
-        self.send_command(0x4F)  # set RAM y address count to 0X199;
-        self.send_data(0x00)
-        self.send_data(0x00)
-        self.ReadBusy()
+        self.send_sequence(self.INIT_4GRAY_SEQUENCE)
         return 0
 
     def getbuffer(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width/8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy*self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
+        return epdpack.pack_image(image, self.width, self.height)
 
     def getbuffer_4Gray(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 4) * self.height)
-        image_monocolor = image.convert('L')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        i=0
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((x + (y * self.width))/4)] = ((pixels[x-3, y]&0xc0) | (pixels[x-2, y]&0xc0)>>2 | (pixels[x-1, y]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6)
-
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for x in range(imwidth):
-                for y in range(imheight):
-                    newx = y
-                    newy = self.height - x - 1
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((newx + (newy * self.width))/4)] = ((pixels[x, y-3]&0xc0) | (pixels[x, y-2]&0xc0)>>2 | (pixels[x, y-1]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6)
-        return buf
+        # RAM 0x24 holds the inverted low bit, RAM 0x26 the inverted high bit of each pixel's gray level
+        return epdpack.pack_image_4gray(image, self.width, self.height, inverted=True)
 
     def Clear(self):
-        if(self.width % 8 == 0):
-            Width = self.width // 8
-        else:
-            Width = self.width // 8 +1
-        Height = self.height
-        self.send_command(0x24)
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(0XFF)
+        self.send(0x24, epdpack.solid(0xFF, epdpack.linewidth(self.width) * self.height))
         self.TurnOnDisplay()
 
     def display(self, image):
-        if(self.width % 8 == 0):
-            Width = self.width // 8
-        else:
-            Width = self.width // 8 +1
-        Height = self.height
-        self.send_command(0x24)
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(image[i + j * Width])
+        self.send(0x24, image)
         self.TurnOnDisplay()
 
     def display_Fast(self, image):
-        if(self.width % 8 == 0):
-            Width = self.width // 8
-        else:
-            Width = self.width // 8 +1
-        Height = self.height
-        self.send_command(0x24)
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(image[i + j * Width])
+        self.send(0x24, image)
         self.TurnOnDisplay_Fast()
 
     def display_Base(self, image):
-        if(self.width % 8 == 0):
-            Width = self.width // 8
-        else:
-            Width = self.width // 8 +1
-        Height = self.height
-        self.send_command(0x24)   #Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(image[i + j * Width])
-
-        self.send_command(0x26)  #Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(image[i + j * Width])
+        self.send(0x24, image)   #Write Black and White image to RAM
+        self.send(0x26, image)   #Write Black and White image to RAM
         self.TurnOnDisplay()
 
     def display_Base_color(self, color):
-        if(self.width % 8 == 0):
-            Width = self.width // 8
-        else:
-            Width = self.width // 8 +1
-        Height = self.height
-        self.send_command(0x24)   #Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(color)
-
-        self.send_command(0x26)  #Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(color)
+        frame = epdpack.solid(color, epdpack.linewidth(self.width) * self.height)
+        self.send(0x24, frame)   #Write Black and White image to RAM
+        self.send(0x26, frame)   #Write Black and White image to RAM
         # self.TurnOnDisplay()
 
     def display_Partial(self, Image, Xstart, Ystart, Xend, Yend):
@@ -409,7 +244,6 @@ class EPD:
             Width = self.width // 8
         else:
             Width = self.width // 8 +1
-        Height = self.height
 
         Xend -= 1
         Yend -= 1
@@ -417,101 +251,49 @@ class EPD:
         # Reset
         self.reset()
 
-        self.send_command(0x3C) #BorderWavefrom
-        self.send_data(0x80)
-
-        self.send_command(0x44)       # set RAM x address start/end, in page 35
-        self.send_data(Xstart & 0xff)    # RAM x address start at 00h;
-        self.send_data(Xend & 0xff)    # RAM x address end at 0fh(15+1)*8->128
-        self.send_command(0x45)       # set RAM y address start/end, in page 35
-        self.send_data(Ystart & 0xff)    # RAM y address start at 0127h;
-        self.send_data((Ystart>>8) & 0x01)    # RAM y address start at 0127h;
-        self.send_data(Yend & 0xff)    # RAM y address end at 00h;
-        self.send_data((Yend>>8) & 0x01)
-
-        self.send_command(0x4E)   # set RAM x address count to 0;
-        self.send_data(Xstart & 0xff)
-        self.send_command(0x4F)   # set RAM y address count to 0X127;
-        self.send_data(Ystart & 0xff)
-        self.send_data((Ystart>>8) & 0x01)
-
-        self.send_command(0x24)   #Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                if((j > Ystart-1) & (j < (Yend + 1)) & (i > Xstart-1) & (i < (Xend + 1))):
-                    self.send_data(Image[i + j * Width])
+        self.send(0x3C, [0x80]) #BorderWavefrom
+        # set RAM x address start/end, in page 35
+        self.send(0x44, [Xstart & 0xff, Xend & 0xff])
+        # set RAM y address start/end, in page 35
+        self.send(0x45, [Ystart & 0xff, (Ystart>>8) & 0x01, Yend & 0xff, (Yend>>8) & 0x01])
+        # set RAM x/y address count
+        self.send(0x4E, [Xstart & 0xff])
+        self.send(0x4F, [Ystart & 0xff, (Ystart>>8) & 0x01])
+
+        # Write Black and White image to RAM, window rows only
+        view = memoryview(Image)
+        window = b"".join(
+            view[j * Width + max(Xstart, 0):j * Width + min(Xend + 1, Width)]
+            for j in range(max(Ystart, 0), min(Yend + 1, self.height))
+        )
+        self.send(0x24, window)
+        self.TurnOnDisplay_Partial()
+
+    def display_Partial_Rows(self, Image, Ystart, Yend):
+        # partial refresh of full-width rows `Ystart` to `Yend` (inclusive), `Image` is a full frame buffer
+        Width = epdpack.linewidth(self.width)
+
+        # Reset
+        self.reset()
+
+        self.send(0x3C, [0x80]) #BorderWavefrom
+        self.send(0x44, [0x00, (Width - 1) & 0xff])
+        self.send(0x45, [Ystart & 0xff, (Ystart>>8) & 0x01, Yend & 0xff, (Yend>>8) & 0x01])
+        self.send(0x4E, [0x00])
+        self.send(0x4F, [Ystart & 0xff, (Ystart>>8) & 0x01])
+
+        # Write Black and White image to RAM, changed rows only
+        self.send(0x24, memoryview(Image)[Ystart * Width:(Yend + 1) * Width])
         self.TurnOnDisplay_Partial()
 
     def display_4Gray(self, image):
-        self.send_command(0x24)
-        for i in range(0, 48000):                     #5808*4  46464
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0xC0
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x01
-                    else: #0x40
-                        temp3 |= 0x00
-                    temp3 <<= 1
-
-                    temp1 <<= 2
-                    temp2 = temp1&0xC0
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x01
-                    else :   #0x40
-                        temp3 |= 0x00
-                    if(j!=1 or k!=1):
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
-
-        self.send_command(0x26)
-        for i in range(0, 48000):                #5808*4  46464
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0xC0
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x00
-                    else: #0x40
-                        temp3 |= 0x01
-                    temp3 <<= 1
-
-                    temp1 <<= 2
-                    temp2 = temp1&0xC0
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x00
-                    else:    #0x40
-                            temp3 |= 0x01
-                    if(j!=1 or k!=1):
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
+        self.send(0x24, image[0])
+        self.send(0x26, image[1])
 
         self.TurnOnDisplay_4GRAY()
 
     def sleep(self):
-        self.send_command(0X10)
-        self.send_data(0x01)
+        self.send(0X10, [0x01])
 
         epdconfig.delay_ms(2000)
         epdconfig.module_exit()
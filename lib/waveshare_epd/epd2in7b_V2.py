@@ -30,14 +30,27 @@
 
 import logging
 from . import epdconfig
+from . import epdbase
+from . import epdpack
 
 # Display resolution
 EPD_WIDTH       = 176
 EPD_HEIGHT      = 264
 
+# Panel capabilities, indexed by `epdregistry` without importing this module, so only literals are allowed
+CAPABILITIES = {
+    "resolution": (176, 264),  # EPD_WIDTH, EPD_HEIGHT
+    "planes": 2,  # 1: black, 2: black and red
+    "partial": False,
+    "fast_init": False,
+    "gray_levels": 2,
+    # typical refresh duration in milliseconds, by refresh type (`full`, `fast`, `partial`, `gray4`)
+    "refresh_ms": {"full": 16000},
+}
+
 logger = logging.getLogger(__name__)
 
-class EPD:
+class EPD(epdbase.EPDBase):
     def __init__(self):
         self.reset_pin = epdconfig.RST_PIN
         self.dc_pin = epdconfig.DC_PIN
@@ -46,6 +59,18 @@ class EPD:
         self.width = EPD_WIDTH
         self.height = EPD_HEIGHT
 
+    INIT_SEQUENCE = [
+        epdbase.BUSY,
+        (0x12, None),
+        epdbase.BUSY,
+        (0x00, [0x27, 0x01, 0x00]),
+        (0x11, [0x03]),
+        (0x44, [0x00, (EPD_WIDTH - 1) >> 3]),                                   # display window, x
+        (0x45, [0x00, 0x00, (EPD_HEIGHT - 1) & 0xff, (EPD_HEIGHT - 1) >> 8]),   # display window, y
+        (0x4E, [0x00]),                                                         # cursor, x
+        (0x4F, [0x00, 0x00]),                                                   # cursor, y
+    ]
+
     # Hardware reset
     def reset(self):
         epdconfig.digital_write(self.reset_pin, 1)
@@ -55,53 +80,21 @@ class EPD:
         epdconfig.digital_write(self.reset_pin, 1)
         epdconfig.delay_ms(200)
 
-    # Send Command
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    # Send Data
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    # send a lot of data
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-
     # Read Busy
     def ReadBusy(self):
         logger.debug("e-Paper busy")
-        while(epdconfig.digital_read(self.busy_pin) == 1):      # 0: idle, 1: busy
-            epdconfig.delay_ms(10)
+        epdconfig.wait_busy(self.busy_pin, 0)      # 0: idle, 1: busy
         logger.debug("e-Paper busy release")
 
     # Setting the display window
     def SetWindows(self, Xstart, Ystart, Xend, Yend):
-        self.send_command(0x44)
-        self.send_data((Xstart >> 3) & 0xff)
-        self.send_data((Xend >> 3) & 0xff)
-
-        self.send_command(0x45)
-        self.send_data(Ystart & 0xff)
-        self.send_data((Ystart >> 8) & 0xff)
-        self.send_data(Yend & 0xff)
-        self.send_data((Yend >> 8) & 0xff)
+        self.send(0x44, [(Xstart >> 3) & 0xff, (Xend >> 3) & 0xff])
+        self.send(0x45, [Ystart & 0xff, (Ystart >> 8) & 0xff, Yend & 0xff, (Yend >> 8) & 0xff])
 
     # Set Cursor
     def SetCursor(self, Xstart, Ystart):
-        self.send_command(0x4E)
-        self.send_data(Xstart & 0xff)
-        self.send_command(0x4F)
-        self.send_data(Ystart & 0xff)
-        self.send_data((Ystart >> 8) & 0xff)
+        self.send(0x4E, [Xstart & 0xff])
+        self.send(0x4F, [Ystart & 0xff, (Ystart >> 8) & 0xff])
 
     # Initialize the e-Paper register
     def init(self):
@@ -109,83 +102,40 @@ class EPD:
             return -1
 
         self.reset()
-
-        self.ReadBusy()
-        self.send_command(0x12)
-        self.ReadBusy()
-
-        self.send_command(0x00)
-        self.send_data(0x27)
-        self.send_data(0x01)
-        self.send_data(0x00)
-
-        self.send_command(0x11)
-        self.send_data(0x03)
-
-        self.SetWindows(0, 0, self.width-1, self.height-1)
-        self.SetCursor(0, 0)
+        self.send_sequence(self.INIT_SEQUENCE)
         return 0
 
     def getbuffer(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width/8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy*self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
+        return epdpack.pack_image(image, self.width, self.height)
+
+    def getbuffer_Red(self, image):
+        # black and red planes of a single RGB image, see `display`
+        # RAM 0x26 expects set bits for red pixels, so the red plane is packed in that polarity
+        return epdpack.pack_image_red(image, self.width, self.height, red_inverted=True)
 
     # Sends the image buffer in RAM to e-Paper and displays
     def display(self, imageblack, imagered):
-        Width = self.width / 8
-        Height = self.height
-
-        buf = [0x00] * int(Width * Height)
-        for i in range(0, int(Width * Height)):
-            buf[i] = ~imagered[i]
-
-        self.send_command(0x24)
-        self.send_data2(imageblack)
-
-        self.send_command(0x26)
-        self.send_data2(buf)
+        self.send(0x24, imageblack)
+        self.send(0x26, imagered)
 
         self.TurnOnDisplay()
 
     # Clear the screen
     def Clear(self):
-        self.send_command(0x24)
-        self.send_data2([0xff] * int(self.width * self.height / 8))
-
-        self.send_command(0x26)
-        self.send_data2([0x00] * int(self.width * self.height / 8))
+        size = epdpack.linewidth(self.width) * self.height
+        self.send(0x24, epdpack.solid(0xFF, size))
+        self.send(0x26, epdpack.solid(0x00, size))
 
         self.TurnOnDisplay()
 
     # Turn on display
     def TurnOnDisplay(self):
-        self.send_command(0x20)
+        self.send(0x20)
         self.ReadBusy()
 
     # Enter sleep mode
     def sleep(self):
-        self.send_command(0x10)
-        self.send_data(0x01)
+        self.send(0x10, [0x01])
 
         epdconfig.delay_ms(2000)
         epdconfig.module_exit()
@@ -29,10 +29,23 @@
 
 import logging
 from . import epdconfig
+from . import epdbase
+from . import epdpack
 
 # Display resolution
 EPD_WIDTH       = 128
 EPD_HEIGHT      = 296
+
+# Panel capabilities, indexed by `epdregistry` without importing this module, so only literals are allowed
+CAPABILITIES = {
+    "resolution": (128, 296),  # EPD_WIDTH, EPD_HEIGHT
+    "planes": 1,  # 1: black, 2: black and red
+    "partial": True,
+    "fast_init": True,
+    "gray_levels": 4,
+    # typical refresh duration in milliseconds, by refresh type (`full`, `fast`, `partial`, `gray4`)
+    "refresh_ms": {"full": 3000, "fast": 1500, "partial": 300, "gray4": 3000},
+}
 GRAY1  = 0xff #white
 GRAY2  = 0xC0
 GRAY3  = 0x80 #gray
@@ -40,7 +53,7 @@ GRAY4  = 0x00 #Blackest
 
 logger = logging.getLogger(__name__)
 
-class EPD:
+class EPD(epdbase.EPDBase):
     def __init__(self):
         self.reset_pin = epdconfig.RST_PIN
         self.dc_pin = epdconfig.DC_PIN
@@ -140,6 +153,57 @@ class EPD:
     0x24,	0x42,	0x22,	0x22,	0x23,	0x32,	0x00,	0x00,	0x00,
     0x22,	0x17,	0x41,	0xAE,	0x32,	0x38]
 
+    INIT_SEQUENCE = [
+        epdbase.BUSY,
+        (0x12, None),                           #SWRESET
+        epdbase.BUSY,
+        (0x01, [0x27, 0x01, 0x00]),             #Driver output control
+        (0x11, [0x03]),                         #data entry mode
+        (0x44, [0x00, (EPD_WIDTH - 1) >> 3]),   # SET_RAM_X_ADDRESS_START_END_POSITION
+        (0x45, [0x00, 0x00, (EPD_HEIGHT - 1) & 0xFF, (EPD_HEIGHT - 1) >> 8]), # SET_RAM_Y_ADDRESS_START_END_POSITION
+        (0x21, [0x00, 0x80]),                   #  Display update control
+        (0x4E, [0x00]),                         # SET_RAM_X_ADDRESS_COUNTER
+        (0x4F, [0x00, 0x00]),                   # SET_RAM_Y_ADDRESS_COUNTER
+        epdbase.BUSY,
+    ]
+
+    INIT_FAST_SEQUENCE = [
+        epdbase.BUSY,
+        (0x12, None),                           #SWRESET
+        epdbase.BUSY,
+        (0x01, [0x27, 0x01, 0x00]),             #Driver output control
+        (0x11, [0x03]),                         #data entry mode
+        (0x44, [0x00, (EPD_WIDTH - 1) >> 3]),   # SET_RAM_X_ADDRESS_START_END_POSITION
+        (0x45, [0x00, 0x00, (EPD_HEIGHT - 1) & 0xFF, (EPD_HEIGHT - 1) >> 8]), # SET_RAM_Y_ADDRESS_START_END_POSITION
+        (0x3C, [0x05]),
+        (0x21, [0x00, 0x80]),                   #  Display update control
+        (0x4E, [0x00]),                         # SET_RAM_X_ADDRESS_COUNTER
+        (0x4F, [0x00, 0x00]),                   # SET_RAM_Y_ADDRESS_COUNTER
+        epdbase.BUSY,
+    ]
+
+    INIT_4GRAY_SEQUENCE = [
+        epdbase.BUSY,
+        (0x12, None),                           #SWRESET
+        epdbase.BUSY,
+        (0x01, [0x27, 0x01, 0x00]),             #Driver output control
+        (0x11, [0x03]),                         #data entry mode
+        (0x44, [0x01, EPD_WIDTH >> 3]),         # SET_RAM_X_ADDRESS_START_END_POSITION
+        (0x45, [0x00, 0x00, (EPD_HEIGHT - 1) & 0xFF, (EPD_HEIGHT - 1) >> 8]), # SET_RAM_Y_ADDRESS_START_END_POSITION
+        (0x3C, [0x04]),
+        (0x4E, [0x01]),                         # SET_RAM_X_ADDRESS_COUNTER
+        (0x4F, [0x00, 0x00]),                   # SET_RAM_Y_ADDRESS_COUNTER
+        epdbase.BUSY,
+    ]
+
+    PARTIAL_SEQUENCE = [
+        (0x37, [0x00, 0x00, 0x00, 0x00, 0x00, 0x40, 0x00, 0x00, 0x00, 0x00]),
+        (0x3C, [0x80]),                         #BorderWavefrom
+        (0x22, [0xC0]),
+        (0x20, None),
+        epdbase.BUSY,
+    ]
+
     # Hardware reset
     def reset(self):
         epdconfig.digital_write(self.reset_pin, 1)
@@ -149,109 +213,48 @@ class EPD:
         epdconfig.digital_write(self.reset_pin, 1)
         epdconfig.delay_ms(50)
 
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    # send a lot of data
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-
     def ReadBusy(self):
         logger.debug("e-Paper busy")
-        while(epdconfig.digital_read(self.busy_pin) == 1):      #  0: idle, 1: busy
-            epdconfig.delay_ms(10)
+        epdconfig.wait_busy(self.busy_pin, 0)      #  0: idle, 1: busy
         logger.debug("e-Paper busy release")
 
     def TurnOnDisplay(self):
-        self.send_command(0x22) # DISPLAY_UPDATE_CONTROL_2
-        self.send_data(0xc7)
-        self.send_command(0x20) # MASTER_ACTIVATION
+        self.send(0x22, [0xc7]) # DISPLAY_UPDATE_CONTROL_2
+        self.send(0x20) # MASTER_ACTIVATION
         self.ReadBusy()
 
     def TurnOnDisplay_Partial(self):
-        self.send_command(0x22) # DISPLAY_UPDATE_CONTROL_2
-        self.send_data(0x0F)
-        self.send_command(0x20) # MASTER_ACTIVATION
+        self.send(0x22, [0x0F]) # DISPLAY_UPDATE_CONTROL_2
+        self.send(0x20) # MASTER_ACTIVATION
         self.ReadBusy()
 
     def lut(self, lut):
-        self.send_command(0x32)
-        for i in range(0, 153):
-            self.send_data(lut[i])
+        self.send(0x32, lut[0:153])
         self.ReadBusy()
 
     def SetLut(self, lut):
         self.lut(lut)
-        self.send_command(0x3f)
-        self.send_data(lut[153])
-        self.send_command(0x03);	# gate voltage
-        self.send_data(lut[154])
-        self.send_command(0x04);	# source voltage
-        self.send_data(lut[155])	# VSH
-        self.send_data(lut[156])	# VSH2
-        self.send_data(lut[157])	# VSL
-        self.send_command(0x2c);		# VCOM
-        self.send_data(lut[158])
+        self.send(0x3f, lut[153:154])
+        self.send(0x03, lut[154:155])	# gate voltage
+        self.send(0x04, lut[155:158])	# source voltage: VSH, VSH2, VSL
+        self.send(0x2c, lut[158:159])	# VCOM
 
     def SetWindow(self, x_start, y_start, x_end, y_end):
-        self.send_command(0x44) # SET_RAM_X_ADDRESS_START_END_POSITION
         # x point must be the multiple of 8 or the last 3 bits will be ignored
-        self.send_data((x_start>>3) & 0xFF)
-        self.send_data((x_end>>3) & 0xFF)
-        self.send_command(0x45) # SET_RAM_Y_ADDRESS_START_END_POSITION
-        self.send_data(y_start & 0xFF)
-        self.send_data((y_start >> 8) & 0xFF)
-        self.send_data(y_end & 0xFF)
-        self.send_data((y_end >> 8) & 0xFF)
+        self.send(0x44, [(x_start>>3) & 0xFF, (x_end>>3) & 0xFF]) # SET_RAM_X_ADDRESS_START_END_POSITION
+        self.send(0x45, [y_start & 0xFF, (y_start >> 8) & 0xFF, y_end & 0xFF, (y_end >> 8) & 0xFF]) # SET_RAM_Y_ADDRESS_START_END_POSITION
 
     def SetCursor(self, x, y):
-        self.send_command(0x4E) # SET_RAM_X_ADDRESS_COUNTER
         # x point must be the multiple of 8 or the last 3 bits will be ignored
-        self.send_data(x & 0xFF)
-
-        self.send_command(0x4F) # SET_RAM_Y_ADDRESS_COUNTER
-        self.send_data(y & 0xFF)
-        self.send_data((y >> 8) & 0xFF)
+        self.send(0x4E, [x & 0xFF]) # SET_RAM_X_ADDRESS_COUNTER
+        self.send(0x4F, [y & 0xFF, (y >> 8) & 0xFF]) # SET_RAM_Y_ADDRESS_COUNTER
 
     def init(self):
         if (epdconfig.module_init() != 0):
             return -1
         # EPD hardware init start
         self.reset()
-
-        self.ReadBusy()
-        self.send_command(0x12)  #SWRESET
-        self.ReadBusy()
-
-        self.send_command(0x01) #Driver output control
-        self.send_data(0x27)
-        self.send_data(0x01)
-        self.send_data(0x00)
-
-        self.send_command(0x11) #data entry mode
-        self.send_data(0x03)
-
-        self.SetWindow(0, 0, self.width-1, self.height-1)
-
-        self.send_command(0x21) #  Display update control
-        self.send_data(0x00)
-        self.send_data(0x80)
-
-        self.SetCursor(0, 0)
-        self.ReadBusy()
-
+        self.send_sequence(self.INIT_SEQUENCE)
         self.SetLut(self.WS_20_30)
         # EPD hardware init end
         return 0
@@ -261,31 +264,7 @@ class EPD:
             return -1
         # EPD hardware init start
         self.reset()
-
-        self.ReadBusy()
-        self.send_command(0x12)  #SWRESET
-        self.ReadBusy()
-
-        self.send_command(0x01) #Driver output control
-        self.send_data(0x27)
-        self.send_data(0x01)
-        self.send_data(0x00)
-
-        self.send_command(0x11) #data entry mode
-        self.send_data(0x03)
-
-        self.SetWindow(0, 0, self.width-1, self.height-1)
-
-        self.send_command(0x3C)
-        self.send_data(0x05)
-
-        self.send_command(0x21) #  Display update control
-        self.send_data(0x00)
-        self.send_data(0x80)
-
-        self.SetCursor(0, 0)
-        self.ReadBusy()
-
+        self.send_sequence(self.INIT_FAST_SEQUENCE)
         self.SetLut(self.WF_FULL)
         # EPD hardware init end
         return 0
@@ -296,178 +275,41 @@ class EPD:
         self.reset()
         epdconfig.delay_ms(100)
 
-        self.ReadBusy()
-        self.send_command(0x12)  #SWRESET
-        self.ReadBusy()
-
-        self.send_command(0x01) #Driver output control
-        self.send_data(0x27)
-        self.send_data(0x01)
-        self.send_data(0x00)
-
-        self.send_command(0x11) #data entry mode
-        self.send_data(0x03)
-
-        self.SetWindow(8, 0, self.width, self.height-1)
-
-        self.send_command(0x3C)
-        self.send_data(0x04)
-
-        self.SetCursor(1, 0)
-        self.ReadBusy()
-
+        self.send_sequence(self.INIT_4GRAY_SEQUENCE)
         self.SetLut(self.Gray4)
         # EPD hardware init end
         return 0
 
     def getbuffer(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width/8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy*self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
+        return epdpack.pack_image(image, self.width, self.height)
 
     def getbuffer_4Gray(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 4) * self.height)
-        image_monocolor = image.convert('L')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        i=0
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((x + (y * self.width))/4)] = ((pixels[x-3, y]&0xc0) | (pixels[x-2, y]&0xc0)>>2 | (pixels[x-1, y]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6)
-
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for x in range(imwidth):
-                for y in range(imheight):
-                    newx = y
-                    newy = self.height - x - 1
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((newx + (newy * self.width))/4)] = ((pixels[x, y-3]&0xc0) | (pixels[x, y-2]&0xc0)>>2 | (pixels[x, y-1]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6)
-        return buf
+        # RAM 0x24 holds the inverted low bit, RAM 0x26 the inverted high bit of each pixel's gray level
+        return epdpack.pack_image_4gray(image, self.width, self.height, inverted=True)
 
     def display(self, image):
-        if (image == None):
+        if image is None:
             return
-        self.send_command(0x24) # WRITE_RAM
-        self.send_data2(image)
+        self.send(0x24, image) # WRITE_RAM
         self.TurnOnDisplay()
 
     def display_Base(self, image):
-        if (image == None):
+        if image is None:
             return
 
-        self.send_command(0x24) # WRITE_RAM
-        self.send_data2(image)
-
-        self.send_command(0x26) # WRITE_RAM
-        self.send_data2(image)
+        self.send(0x24, image) # WRITE_RAM
+        self.send(0x26, image) # WRITE_RAM
 
         self.TurnOnDisplay()
 
     def display_4Gray(self, image):
-        self.send_command(0x24)
-        for i in range(0, 4736):
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0xC0
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x01
-                    else: #0x40
-                        temp3 |= 0x00
-                    temp3 <<= 1
-
-                    temp1 <<= 2
-                    temp2 = temp1&0xC0
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x01
-                    else :   #0x40
-                        temp3 |= 0x00
-                    if(j!=1 or k!=1):
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
-
-        self.send_command(0x26)
-        for i in range(0, 4736):
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0xC0
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x00
-                    else: #0x40
-                        temp3 |= 0x01
-                    temp3 <<= 1
-
-                    temp1 <<= 2
-                    temp2 = temp1&0xC0
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x00
-                    else:    #0x40
-                        temp3 |= 0x01
-                    if(j!=1 or k!=1):
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
+        self.send(0x24, image[0])
+        self.send(0x26, image[1])
 
         self.TurnOnDisplay()
 
     def display_Partial(self, image):
-        if (image == None):
+        if image is None:
             return
 
         epdconfig.digital_write(self.reset_pin, 0)
@@ -476,50 +318,48 @@ class EPD:
         epdconfig.delay_ms(2)
 
         self.SetLut(self.WF_PARTIAL_2IN9)
-        self.send_command(0x37)
-        self.send_data(0x00)
-        self.send_data(0x00)
-        self.send_data(0x00)
-        self.send_data(0x00)
-        self.send_data(0x00)
-        self.send_data(0x40)
-        self.send_data(0x00)
-        self.send_data(0x00)
-        self.send_data(0x00)
-        self.send_data(0x00)
-
-        self.send_command(0x3C) #BorderWavefrom
-        self.send_data(0x80)
-
-        self.send_command(0x22)
-        self.send_data(0xC0)
-        self.send_command(0x20)
-        self.ReadBusy()
+        self.send_sequence(self.PARTIAL_SEQUENCE)
 
         self.SetWindow(0, 0, self.width - 1, self.height - 1)
         self.SetCursor(0, 0)
 
-        self.send_command(0x24) # WRITE_RAM
-        self.send_data2(image)
+        self.send(0x24, image) # WRITE_RAM
         self.TurnOnDisplay_Partial()
 
+    def display_Partial_Rows(self, image, Ystart, Yend):
+        # partial refresh of full-width rows `Ystart` to `Yend` (inclusive), `image` is a full frame buffer
+        if image is None:
+            return
+
+        linewidth = epdpack.linewidth(self.width)
+
+        epdconfig.digital_write(self.reset_pin, 0)
+        epdconfig.delay_ms(2)
+        epdconfig.digital_write(self.reset_pin, 1)
+        epdconfig.delay_ms(2)
+
+        self.SetLut(self.WF_PARTIAL_2IN9)
+        self.send_sequence(self.PARTIAL_SEQUENCE)
+
+        self.SetWindow(0, Ystart, self.width - 1, Yend)
+        self.SetCursor(0, Ystart)
+
+        self.send(0x24, memoryview(image)[Ystart * linewidth:(Yend + 1) * linewidth]) # WRITE_RAM
+        self.TurnOnDisplay_Partial()
+
+        self.SetWindow(0, 0, self.width - 1, self.height - 1)
+        self.SetCursor(0, 0)
 
     def Clear(self, color=0xFF):
-        if self.width%8 == 0:
-            linewidth = int(self.width/8)
-        else:
-            linewidth = int(self.width/8) + 1
+        frame = epdpack.solid(color, epdpack.linewidth(self.width) * self.height)
 
-        self.send_command(0x24) # WRITE_RAM
-        self.send_data2([color] * int(self.height * linewidth))
+        self.send(0x24, frame) # WRITE_RAM
         self.TurnOnDisplay()
-        self.send_command(0x26) # WRITE_RAM
-        self.send_data2([color] * int(self.height * linewidth))
+        self.send(0x26, frame) # WRITE_RAM
         self.TurnOnDisplay()
 
     def sleep(self):
-        self.send_command(0x10) # DEEP_SLEEP_MODE
-        self.send_data(0x01)
+        self.send(0x10, [0x01]) # DEEP_SLEEP_MODE
 
         epdconfig.delay_ms(2000)
         epdconfig.module_exit()
@@ -30,14 +30,27 @@
 
 import logging
 from . import epdconfig
+from . import epdbase
+from . import epdpack
 
 # Display resolution
 EPD_WIDTH       = 128
 EPD_HEIGHT      = 296
 
+# Panel capabilities, indexed by `epdregistry` without importing this module, so only literals are allowed
+CAPABILITIES = {
+    "resolution": (128, 296),  # EPD_WIDTH, EPD_HEIGHT
+    "planes": 2,  # 1: black, 2: black and red
+    "partial": False,
+    "fast_init": False,
+    "gray_levels": 2,
+    # typical refresh duration in milliseconds, by refresh type (`full`, `fast`, `partial`, `gray4`)
+    "refresh_ms": {"full": 15000},
+}
+
 logger = logging.getLogger(__name__)
 
-class EPD:
+class EPD(epdbase.EPDBase):
     def __init__(self):
         self.reset_pin = epdconfig.RST_PIN
         self.dc_pin = epdconfig.DC_PIN
@@ -46,6 +59,16 @@ class EPD:
         self.width = EPD_WIDTH
         self.height = EPD_HEIGHT
 
+    INIT_SEQUENCE = [
+        (0x04, None),
+        epdbase.BUSY,                   #waiting for the electronic paper IC to release the idle signal
+        (0x00, [0x0f, 0x89]),           #panel setting: LUT from OTP,128x296; Temperature sensor, boost and other related timing settings
+        (0x61, [0x80, 0x01, 0x28]),     #resolution setting
+        (0X50, [0x77]),                 #VCOM AND DATA INTERVAL SETTING
+                                        #WBmode:VBDF 17|D7 VBDW 97 VBDB 57
+                                        # WBRmode:VBDF F7 VBDW 77 VBDB 37  VBDR B7
+    ]
+
     # Hardware reset
     def reset(self):
         epdconfig.digital_write(self.reset_pin, 1)
@@ -55,31 +78,10 @@ class EPD:
         epdconfig.digital_write(self.reset_pin, 1)
         epdconfig.delay_ms(200)
 
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    # send a lot of data
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-
     def ReadBusy(self):
         logger.debug("e-Paper busy")
         self.send_command(0X71)
-        while(epdconfig.digital_read(self.busy_pin) == 0):      #  0: idle, 1: busy
-            self.send_command(0X71)
-            epdconfig.delay_ms(200)
+        epdconfig.wait_busy(self.busy_pin, 1)      # 1: idle, 0: busy
         logger.debug("e-Paper busy release")
 
     def init(self):
@@ -87,76 +89,39 @@ class EPD:
             return -1
         # EPD hardware init start
         self.reset()
-
-        self.send_command(0x04)
-        self.ReadBusy()#waiting for the electronic paper IC to release the idle signal
-
-        self.send_command(0x00)    #panel setting
-        self.send_data(0x0f)   #LUT from OTP,128x296
-        self.send_data(0x89)    #Temperature sensor, boost and other related timing settings
-
-        self.send_command(0x61)    #resolution setting
-        self.send_data (0x80)
-        self.send_data (0x01)
-        self.send_data (0x28)
-
-        self.send_command(0X50)    #VCOM AND DATA INTERVAL SETTING
-        self.send_data(0x77)   #WBmode:VBDF 17|D7 VBDW 97 VBDB 57
-                            # WBRmode:VBDF F7 VBDW 77 VBDB 37  VBDR B7
-
+        self.send_sequence(self.INIT_SEQUENCE)
         return 0
 
     def getbuffer(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width/8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy*self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
+        return epdpack.pack_image(image, self.width, self.height)
+
+    def getbuffer_Red(self, image):
+        # black and red planes of a single RGB image, see `display`
+        return epdpack.pack_image_red(image, self.width, self.height)
 
     def display(self, blackimage, ryimage): # ryimage: red or yellow image
-        if (blackimage != None):
-            self.send_command(0X10)
-            self.send_data2(blackimage)
-        if (ryimage != None):
-            self.send_command(0X13)
-            self.send_data2(ryimage)
-
-        self.send_command(0x12)
+        if blackimage is not None:
+            self.send(0X10, blackimage)
+        if ryimage is not None:
+            self.send(0X13, ryimage)
+
+        self.send(0x12)
         epdconfig.delay_ms(200)
         self.ReadBusy()
 
     def Clear(self):
-        self.send_command(0X10)
-        self.send_data2([0xff] * int(self.width * self.height / 8))
-        self.send_command(0X13)
-        self.send_data2([0xff] * int(self.width * self.height / 8))
+        frame = epdpack.solid(0xFF, epdpack.linewidth(self.width) * self.height)
+        self.send(0X10, frame)
+        self.send(0X13, frame)
 
-        self.send_command(0x12)
+        self.send(0x12)
         epdconfig.delay_ms(200)
         self.ReadBusy()
 
     def sleep(self):
-        self.send_command(0X02) # power off
+        self.send(0X02) # power off
         self.ReadBusy()
-        self.send_command(0X07) # deep sleep
-        self.send_data(0xA5)
+        self.send(0X07, [0xA5]) # deep sleep
 
         epdconfig.delay_ms(2000)
         epdconfig.module_exit()
@@ -0,0 +1,130 @@
+""" shared command and data transfers for Waveshare e-Paper Display drivers """
+
+from . import epdconfig
+
+# marker for command sequences; waits for the panel to release the BUSY line
+BUSY = "busy"
+
+
+class EPDBase:
+    """
+    Base class for EPD drivers, batching the payload of a command into a single SPI transfer
+
+    Drivers are expected to set `dc_pin` and `cs_pin`, and to implement `ReadBusy`.
+    On platforms whose SPI controller drives chip-select in hardware (`epdconfig.HARDWARE_CS`), `cs_pin` is never written.
+    """
+
+    def send_command(self, command):
+        """
+        Send a single command byte
+
+        Parameters:
+            command (int): Command byte.
+
+        Returns:
+            n/a
+        """
+
+        epdconfig.digital_write(self.dc_pin, 0)
+        manual_cs = not epdconfig.HARDWARE_CS
+
+        if manual_cs:
+            epdconfig.digital_write(self.cs_pin, 0)
+
+        epdconfig.spi_writebyte([command])
+
+        if manual_cs:
+            epdconfig.digital_write(self.cs_pin, 1)
+
+    def send_data(self, data):
+        """
+        Send a single data byte
+
+        Parameters:
+            data (int): Data byte.
+
+        Returns:
+            n/a
+        """
+
+        epdconfig.digital_write(self.dc_pin, 1)
+        manual_cs = not epdconfig.HARDWARE_CS
+
+        if manual_cs:
+            epdconfig.digital_write(self.cs_pin, 0)
+
+        epdconfig.spi_writebyte([data])
+
+        if manual_cs:
+            epdconfig.digital_write(self.cs_pin, 1)
+
+    def send_data2(self, data):
+        """
+        Send a sequence of data bytes in a single SPI transfer
+
+        Parameters:
+            data (bytes-like or list): Data bytes, e.g. `bytes`, `bytearray`, or `memoryview`.
+
+        Returns:
+            n/a
+        """
+
+        epdconfig.digital_write(self.dc_pin, 1)
+        manual_cs = not epdconfig.HARDWARE_CS
+
+        if manual_cs:
+            epdconfig.digital_write(self.cs_pin, 0)
+
+        epdconfig.spi_writebyte2(data)
+
+        if manual_cs:
+            epdconfig.digital_write(self.cs_pin, 1)
+
+    def send(self, command, data=None):
+        """
+        Send a command followed by its payload
+
+        The command byte is written with DC low, then DC is toggled once and the payload
+        is written in a single SPI transfer, instead of toggling DC and CS for every byte.
+
+        Parameters:
+            command (int):             Command byte.
+            data (bytes-like or list): Data bytes, e.g. `bytes`, `bytearray`, or `memoryview`, if any.
+
+        Returns:
+            n/a
+        """
+
+        manual_cs = not epdconfig.HARDWARE_CS
+
+        if manual_cs:
+            epdconfig.digital_write(self.cs_pin, 0)
+
+        epdconfig.digital_write(self.dc_pin, 0)
+        epdconfig.spi_writebyte([command])
+
+        if data:
+            epdconfig.digital_write(self.dc_pin, 1)
+            epdconfig.spi_writebyte2(data)
+
+        if manual_cs:
+            epdconfig.digital_write(self.cs_pin, 1)
+
+    def send_sequence(self, sequence):
+        """
+        Replay a table of commands and their payloads
+
+        Parameters:
+            sequence (list): List of `(command, data)` tuples or `BUSY` markers.
+
+        Returns:
+            n/a
+        """
+
+        for item in sequence:
+            if item == BUSY:
+                # pylint: disable=no-member
+                self.ReadBusy()
+
+            else:
+                self.send(*item)
@@ -31,12 +31,110 @@ import os
 import logging
 import sys
 import time
-import subprocess
+import threading
 
 logger = logging.getLogger(__name__)
 
 
-class RaspberryPi:
+class BusyPolling:
+    # chip-select is driven by the EPD drivers through `digital_write(CS_PIN, ...)`, unless the SPI controller drives it
+    HARDWARE_CS = False
+
+    # maximum number of seconds to wait for the BUSY pin to reach its idle level
+    BUSY_TIMEOUT = 60
+
+    # polling interval used by implementations without GPIO edge events
+    BUSY_POLL_MS = 10
+
+    _cancelled = False
+
+    def wait_busy(self, pin, idle, timeout=None):
+        # wait for `pin` to read `idle`; returns False on timeout or cancellation
+        deadline = time.monotonic() + (self.BUSY_TIMEOUT if timeout is None else timeout)
+
+        while self.digital_read(pin) != idle:
+            if self._cancelled:
+                logger.warning("e-Paper busy wait cancelled")
+                return False
+
+            if time.monotonic() >= deadline:
+                logger.warning("e-Paper busy wait timed out")
+                return False
+
+            self.delay_ms(self.BUSY_POLL_MS)
+
+        return True
+
+    def cancel_wait(self):
+        # cancellation hook, releases a pending `wait_busy` (e.g. from another thread when shutting down)
+        # the cancellation also applies to all later waits, until it is re-armed with `reset_cancel`
+        self._cancelled = True
+
+    def reset_cancel(self):
+        # re-arm `wait_busy` after `cancel_wait`, e.g. when the panel is (re-)initialized
+        self._cancelled = False
+
+
+class SpiTransport:
+    # default SPI clock, see `spi_configure`
+    SPI_HZ = 4000000
+
+    # spidev rejects transfers larger than its `bufsiz` module parameter
+    SPI_BUFSIZ_PATH = '/sys/module/spidev/parameters/bufsiz'
+    SPI_BUFSIZ_DEFAULT = 4096
+
+    spi_hz = SPI_HZ
+
+    _spi_chunk = None
+    _spi_bytes = 0
+    _spi_seconds = 0.0
+
+    def spi_configure(self, hz=None):
+        # set the SPI clock (in Hz), applied when the SPI device is (re-)opened by `module_init`
+        self.spi_hz = int(hz) if hz else self.SPI_HZ
+        logger.debug("SPI clock set to %d Hz", self.spi_hz)
+
+    def spi_chunk_size(self):
+        # transfers are split into chunks of spidev's `bufsiz`, read once from sysfs
+        if self._spi_chunk is None:
+            try:
+                with open(self.SPI_BUFSIZ_PATH) as f:
+                    self._spi_chunk = int(f.read().strip())
+            except (OSError, ValueError):
+                self._spi_chunk = self.SPI_BUFSIZ_DEFAULT
+
+            logger.debug("SPI transfers are split into chunks of %d bytes", self._spi_chunk)
+
+        return self._spi_chunk
+
+    def spi_writebyte2(self, data):
+        # write `data` (bytes-like or list) in bufsiz-aligned chunks; buffer objects are sliced without copying
+        chunk = self.spi_chunk_size()
+        view = data if isinstance(data, list) else memoryview(data)
+        start = time.perf_counter()
+
+        for offset in range(0, len(view), chunk):
+            self._spi_write(view[offset:offset + chunk])
+
+        self._spi_seconds += time.perf_counter() - start
+        self._spi_bytes += len(view)
+
+    def spi_stats(self):
+        # throughput of `spi_writebyte2` transfers since the last `spi_reset_stats`
+        return {
+            "hz": self.spi_hz,
+            "chunk_bytes": self.spi_chunk_size(),
+            "bytes": self._spi_bytes,
+            "seconds": round(self._spi_seconds, 6),
+            "bytes_per_second": round(self._spi_bytes / self._spi_seconds) if self._spi_seconds else None,
+        }
+
+    def spi_reset_stats(self):
+        self._spi_bytes = 0
+        self._spi_seconds = 0.0
+
+
+class RaspberryPi(BusyPolling, SpiTransport):
     # Pin definition
     RST_PIN  = 17
     DC_PIN   = 25
@@ -44,6 +142,9 @@ class RaspberryPi:
     BUSY_PIN = 24
     PWR_PIN  = 18
 
+    # spidev drives CE0 (`CS_PIN`) in hardware for every transfer
+    HARDWARE_CS = True
+
     def __init__(self):
         import spidev
         import gpiozero
@@ -55,6 +156,9 @@ class RaspberryPi:
         self.GPIO_PWR_PIN    = gpiozero.LED(self.PWR_PIN)
         self.GPIO_BUSY_PIN   = gpiozero.Button(self.BUSY_PIN, pull_up = False)
 
+        # set by the BUSY pin's edge callbacks, or by `cancel_wait`
+        self._busy_event = threading.Event()
+
     def digital_write(self, pin, value):
         if pin == self.RST_PIN:
             if value:
@@ -89,13 +193,47 @@ class RaspberryPi:
         elif pin == self.PWR_PIN:
             return self.PWR_PIN.value
 
+    def wait_busy(self, pin, idle, timeout=None):
+        # edge-triggered wait for the BUSY pin to read `idle`, instead of polling it
+        if pin != self.BUSY_PIN:
+            return super().wait_busy(pin, idle, timeout)
+
+        self._busy_event.clear()
+
+        # arm the edge callback before checking the level, so that an edge in between is not missed
+        if idle:
+            self.GPIO_BUSY_PIN.when_pressed = self._busy_event.set
+        else:
+            self.GPIO_BUSY_PIN.when_released = self._busy_event.set
+
+        try:
+            if not self._cancelled and self.GPIO_BUSY_PIN.value != idle:
+                self._busy_event.wait(self.BUSY_TIMEOUT if timeout is None else timeout)
+        finally:
+            self.GPIO_BUSY_PIN.when_pressed = None
+            self.GPIO_BUSY_PIN.when_released = None
+
+        if self._cancelled:
+            logger.warning("e-Paper busy wait cancelled")
+            return False
+
+        if self.GPIO_BUSY_PIN.value != idle:
+            logger.warning("e-Paper busy wait timed out")
+            return False
+
+        return True
+
+    def cancel_wait(self):
+        self._cancelled = True
+        self._busy_event.set()
+
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
 
     def spi_writebyte(self, data):
         self.SPI.writebytes(data)
 
-    def spi_writebyte2(self, data):
+    def _spi_write(self, data):
         self.SPI.writebytes2(data)
 
     def module_init(self):
@@ -103,7 +241,7 @@ class RaspberryPi:
 
         # SPI device, bus = 0, device = 0
         self.SPI.open(0, 0)
-        self.SPI.max_speed_hz = 4000000
+        self.SPI.max_speed_hz = self.spi_hz
         self.SPI.mode = 0b00
         return 0
 
@@ -128,7 +266,90 @@ class RaspberryPi:
 
 
 
-class JetsonNano:
+class RaspberryPiLgpio(RaspberryPi):
+    # gpiochip the RST, DC, PWR and BUSY lines are claimed from
+    GPIO_CHIP = 0
+
+    def __init__(self):
+        # same pins and SPI transport as `RaspberryPi`, but lines are claimed and written through lgpio handles directly,
+        # bypassing gpiozero's device and pin factory layers
+        import spidev
+        import lgpio
+
+        self.SPI = spidev.SpiDev()
+        self.lgpio = lgpio
+        self.chip = lgpio.gpiochip_open(self.GPIO_CHIP)
+
+        self._outputs = (self.RST_PIN, self.DC_PIN, self.PWR_PIN)
+        for pin in self._outputs:
+            lgpio.gpio_claim_output(self.chip, pin, 0)
+
+        # BUSY is pulled down (as `gpiozero.Button(pull_up=False)`), edges wake up `wait_busy`
+        lgpio.gpio_claim_alert(self.chip, self.BUSY_PIN, lgpio.BOTH_EDGES, lgpio.SET_PULL_DOWN)
+        self._busy_event = threading.Event()
+        self._busy_callback = lgpio.callback(self.chip, self.BUSY_PIN, lgpio.BOTH_EDGES, self._busy_edge)
+
+    def _busy_edge(self, chip, gpio, level, tick):
+        self._busy_event.set()
+
+    def digital_write(self, pin, value):
+        # CS is driven by the SPI hardware and is not claimed
+        if pin in self._outputs:
+            self.lgpio.gpio_write(self.chip, pin, 1 if value else 0)
+
+    def digital_read(self, pin):
+        return self.lgpio.gpio_read(self.chip, pin)
+
+    def wait_busy(self, pin, idle, timeout=None):
+        # edge-triggered wait for the BUSY pin to read `idle`; the level is re-read after every edge
+        if pin != self.BUSY_PIN:
+            return BusyPolling.wait_busy(self, pin, idle, timeout)
+
+        deadline = time.monotonic() + (self.BUSY_TIMEOUT if timeout is None else timeout)
+
+        while True:
+            # clear before reading the level, so that an edge in between is not missed
+            self._busy_event.clear()
+
+            if self._cancelled:
+                logger.warning("e-Paper busy wait cancelled")
+                return False
+
+            if self.lgpio.gpio_read(self.chip, pin) == idle:
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning("e-Paper busy wait timed out")
+                return False
+
+            self._busy_event.wait(remaining)
+
+    def module_init(self):
+        self.digital_write(self.PWR_PIN, 1)
+
+        # SPI device, bus = 0, device = 0
+        self.SPI.open(0, 0)
+        self.SPI.max_speed_hz = self.spi_hz
+        self.SPI.mode = 0b00
+        return 0
+
+    def module_exit(self, cleanup=False):
+        logger.debug("spi end")
+        self.SPI.close()
+
+        for pin in self._outputs:
+            self.digital_write(pin, 0)
+        logger.debug("close 5V, Module enters 0 power consumption ...")
+
+        if cleanup:
+            self._busy_callback.cancel()
+            for pin in self._outputs + (self.BUSY_PIN,):
+                self.lgpio.gpio_free(self.chip, pin)
+            self.lgpio.gpiochip_close(self.chip)
+
+
+class JetsonNano(BusyPolling):
     # Pin definition
     RST_PIN  = 17
     DC_PIN   = 25
@@ -197,7 +418,7 @@ class JetsonNano:
         self.GPIO.cleanup([self.RST_PIN, self.DC_PIN, self.CS_PIN, self.BUSY_PIN, self.PWR_PIN])
 
 
-class SunriseX3:
+class SunriseX3(BusyPolling, SpiTransport):
     # Pin definition
     RST_PIN  = 17
     DC_PIN   = 25
@@ -225,7 +446,7 @@ class SunriseX3:
     def spi_writebyte(self, data):
         self.SPI.writebytes(data)
 
-    def spi_writebyte2(self, data):
+    def _spi_write(self, data):
         # for i in range(len(data)):
         #     self.SPI.writebytes([data[i]])
         self.SPI.xfer3(data)
@@ -245,7 +466,7 @@ class SunriseX3:
         
             # SPI device, bus = 0, device = 0
             self.SPI.open(2, 0)
-            self.SPI.max_speed_hz = 4000000
+            self.SPI.max_speed_hz = self.spi_hz
             self.SPI.mode = 0b00
             return 0
         else:
@@ -264,22 +485,80 @@ class SunriseX3:
         self.GPIO.cleanup([self.RST_PIN, self.DC_PIN, self.CS_PIN, self.BUSY_PIN], self.PWR_PIN)
 
 
-if sys.version_info[0] == 2:
-    process = subprocess.Popen("cat /proc/cpuinfo | grep Raspberry", shell=True, stdout=subprocess.PIPE)
-else:
-    process = subprocess.Popen("cat /proc/cpuinfo | grep Raspberry", shell=True, stdout=subprocess.PIPE, text=True)
-output, _ = process.communicate()
-if sys.version_info[0] == 2:
-    output = output.decode(sys.stdout.encoding)
+def is_raspberry_pi():
+    # read the board model directly, instead of spawning a shell to `grep` it
+    # `/proc/device-tree/model` is not available on all kernels, and 64-bit kernels omit the model from `/proc/cpuinfo`
+    for path in ('/proc/device-tree/model', '/proc/cpuinfo'):
+        try:
+            with open(path, 'rb') as file:
+                if b'Raspberry' in file.read():
+                    return True
+        except OSError:
+            continue
+
+    return False
+
+
+def detect(gpio_backend="gpiozero"):
+    # construct the implementation for the hardware this runs on, claiming its GPIO lines and SPI bus
+    if is_raspberry_pi():
+        # `lgpio` writes GPIO lines directly, `gpiozero` (default) goes through gpiozero's LED and Button devices
+        if gpio_backend == "lgpio":
+            return RaspberryPiLgpio()
+        return RaspberryPi()
+    if os.path.exists('/sys/bus/platform/drivers/gpio-x3'):
+        return SunriseX3()
+    if os.path.exists('/etc/nv_tegra_release'):
+        return JetsonNano()
+
+    # no supported hardware found, simulate the panel (see `epdsim.py`)
+    from . import epdsim
+    logger.warning("no e-Paper hardware found, using simulated e-Paper")
+    return epdsim.Simulated()
+
+
+_detect_lock = threading.Lock()
+
+# GPIO backend used on Raspberry Pis when the hardware is detected, see `set_gpio_backend`
+_gpio_backend = "gpiozero"
+
+
+def set_gpio_backend(backend):
+    # select the GPIO backend (`gpiozero` or `lgpio`) of Raspberry Pis, before the hardware is detected on first use
+    global _gpio_backend
+
+    if 'implementation' in globals():
+        logger.warning("e-Paper hardware is already detected, GPIO backend `%s` is not used", backend)
+
+    _gpio_backend = backend
+
+
+def __getattr__(name):
+    # hardware is detected on first use of the module-level functions (e.g. `module_init`), not on import,
+    # so that importing drivers does not claim GPIO lines or load hardware libraries
+    if name.startswith('_'):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    with _detect_lock:
+        if 'implementation' not in globals():
+            set_implementation(detect(_gpio_backend))
+
+    try:
+        return globals()[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+
+def set_implementation(new_implementation):
+    # (re-)bind the module-level functions, e.g. to run drivers against the simulated e-Paper on real hardware
+    global implementation
+    implementation = new_implementation
+
+    for func in [x for x in dir(implementation) if not x.startswith('_')]:
+        setattr(sys.modules[__name__], func, getattr(implementation, func))
 
-if "Raspberry" in output:
-    implementation = RaspberryPi()
-elif os.path.exists('/sys/bus/platform/drivers/gpio-x3'):
-    implementation = SunriseX3()
-else:
-    implementation = JetsonNano()
+    # always rebound, so that implementations without hardware chip-select do not inherit the flag of a previous one
+    setattr(sys.modules[__name__], 'HARDWARE_CS', getattr(implementation, 'HARDWARE_CS', False))
 
-for func in [x for x in dir(implementation) if not x.startswith('_')]:
-    setattr(sys.modules[__name__], func, getattr(implementation, func))
 
 ### END OF FILE ###
@@ -0,0 +1,247 @@
+""" frame buffer packing for Waveshare e-Paper Displays """
+
+import functools
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def linewidth(width, pixels_per_byte=8):
+    """
+    Calculate the number of bytes needed to store a single row of pixels
+
+    Parameters:
+        width (int):           Width of the row, in pixels.
+        pixels_per_byte (int): Number of pixels packed into a single byte.
+
+    Returns:
+        int: Number of bytes per row
+    """
+
+    return (width + pixels_per_byte - 1) // pixels_per_byte
+
+
+def orient(image, width, height):
+    """
+    Convert an image to a pixel array matching the panel's RAM orientation
+
+    Images that are `width` x `height` are used as-is ("Vertical"), images that are `height` x `width`
+    are rotated by 90 degrees counter-clockwise ("Horizontal"), matching the per-pixel loops of the Waveshare drivers.
+
+    Parameters:
+        image (object): PIL Image to convert; must already be in the target mode.
+        width (int):    Width of the panel (as defined by the driver).
+        height (int):   Height of the panel (as defined by the driver).
+
+    Returns:
+        object: NumPy array of shape (`height`, `width`), or None if the image dimensions do not match the panel
+    """
+
+    imwidth, imheight = image.size
+
+    if imwidth == width and imheight == height:
+        logger.debug("Vertical")
+        return np.asarray(image)
+
+    if imwidth == height and imheight == width:
+        logger.debug("Horizontal")
+        return np.rot90(np.asarray(image))
+
+    logger.warning("Wrong image dimensions: %d x %d, expected %d x %d", imwidth, imheight, width, height)
+    return None
+
+
+@functools.lru_cache(maxsize=16)
+def solid(value, size):
+    """
+    Create a frame buffer filled with a single byte value, e.g. to clear a panel
+
+    Frames are created once for each value and size, and shared by all callers.
+
+    Parameters:
+        value (int): Byte value of every byte in the frame.
+        size (int):  Size of the frame, in bytes.
+
+    Returns:
+        bytes: Frame buffer
+    """
+
+    return bytes([value]) * size
+
+
+def invert(buffer):
+    """
+    Invert all bits of a frame buffer
+
+    Parameters:
+        buffer (bytes-like): Frame buffer, e.g. `bytes`, `bytearray`, or `memoryview`.
+
+    Returns:
+        bytes: Inverted frame buffer
+    """
+
+    return np.bitwise_xor(np.frombuffer(buffer, dtype=np.uint8), 0xFF).tobytes()
+
+
+def pack_plane(white, row_bytes):
+    """
+    Pack a boolean pixel array into a 1-bit-per-pixel, MSB-first frame buffer
+
+    Rows are padded to `row_bytes`; padding bits are set (white), as in the Waveshare drivers.
+
+    Parameters:
+        white (object):  NumPy array of shape (rows, columns) where True indicates a white pixel.
+        row_bytes (int): Number of bytes per row in the packed buffer.
+
+    Returns:
+        bytes: Packed frame buffer
+    """
+
+    padding = row_bytes * 8 - white.shape[1]
+
+    if padding:
+        white = np.pad(white, ((0, 0), (0, padding)), constant_values=True)
+
+    return np.packbits(white, axis=1).tobytes()
+
+
+def pack_image(image, width, height):
+    """
+    Pack a PIL Image into a 1-bit-per-pixel frame buffer for a panel
+
+    Parameters:
+        image (object): PIL Image of size (`width`, `height`) or (`height`, `width`).
+        width (int):    Width of the panel (as defined by the driver).
+        height (int):   Height of the panel (as defined by the driver).
+
+    Returns:
+        bytes: Packed frame buffer; a white frame if the image dimensions do not match the panel
+    """
+
+    row_bytes = linewidth(width)
+    white = orient(image.convert('1'), width, height)
+
+    if white is None:
+        return solid(0xFF, row_bytes * height)
+
+    return pack_plane(white, row_bytes)
+
+
+def pack_2bpp(values, row_bytes):
+    """
+    Pack an array of 2-bit values into a 2-bits-per-pixel, MSB-first frame buffer
+
+    Parameters:
+        values (object): NumPy array of shape (rows, columns) containing values between 0 and 3.
+        row_bytes (int): Number of bytes per row in the packed buffer.
+
+    Returns:
+        bytes: Packed frame buffer
+    """
+
+    rows, columns = values.shape
+    padding = row_bytes * 4 - columns
+
+    values = values.astype(np.uint8)
+    if padding:
+        values = np.pad(values, ((0, 0), (0, padding)))
+
+    quads = values.reshape(rows, row_bytes, 4)
+    packed = (quads[..., 0] << 6) | (quads[..., 1] << 4) | (quads[..., 2] << 2) | quads[..., 3]
+
+    return packed.tobytes()
+
+
+def quantize_4gray(image, width, height):
+    """
+    Quantize a PIL Image to the 4 gray levels supported by the panel
+
+    Pixels are mapped to the nearest of `0x00` (black), `0x80`, `0xC0` and `0xFF` (white),
+    matching the `GRAY4` to `GRAY1` constants of the Waveshare drivers.
+
+    Parameters:
+        image (object): PIL Image of size (`width`, `height`) or (`height`, `width`).
+        width (int):    Width of the panel (as defined by the driver).
+        height (int):   Height of the panel (as defined by the driver).
+
+    Returns:
+        object: NumPy array of shape (`height`, `width`) containing levels between 0 (black) and 3 (white)
+    """
+
+    gray = orient(image.convert('L'), width, height)
+
+    if gray is None:
+        return np.full((height, width), 3, dtype=np.uint8)
+
+    # thresholds are the midpoints between `0x00`, `0x80`, `0xC0` and `0xFF`
+    return np.digitize(gray, (0x40, 0xA0, 0xE0)).astype(np.uint8)
+
+
+def pack_image_4gray(image, width, height, inverted=False):
+    """
+    Pack a PIL Image into the two bit-planes used for 4-level grayscale refreshes
+
+    Parameters:
+        image (object):  PIL Image of size (`width`, `height`) or (`height`, `width`).
+        width (int):     Width of the panel (as defined by the driver).
+        height (int):    Height of the panel (as defined by the driver).
+        inverted (bool): Boolean indicating whether to invert the bits of both planes.
+
+    Returns:
+        tuple: Tuple of packed frame buffers containing the low and the high bit of each pixel's level
+    """
+
+    levels = quantize_4gray(image, width, height)
+    row_bytes = linewidth(width)
+
+    low = (levels & 0x01).astype(bool)
+    high = (levels & 0x02).astype(bool)
+
+    if inverted:
+        low, high = ~low, ~high
+
+    return pack_plane(low, row_bytes), pack_plane(high, row_bytes)
+
+
+def pack_image_red(image, width, height, red_inverted=False):
+    """
+    Split a PIL Image into the black and the red plane of a tri-color panel, in a single pass
+
+    Red pixels (red channel at least `0x80`, green and blue channels below `0x80`) are set in the red plane only;
+    other pixels darker than the `1` mode threshold are set in the black plane. In both planes, cleared bits are inked,
+    unless `red_inverted` is set, and planes without any inked pixels are returned as shared constant frames (see `solid`).
+
+    Parameters:
+        image (object):      PIL Image of size (`width`, `height`) or (`height`, `width`).
+        width (int):         Width of the panel (as defined by the driver).
+        height (int):        Height of the panel (as defined by the driver).
+        red_inverted (bool): Boolean indicating whether red pixels are set bits in the red plane, as some panels expect.
+
+    Returns:
+        tuple: Tuple of packed frame buffers containing the black and the red plane
+    """
+
+    row_bytes = linewidth(width)
+    size = row_bytes * height
+    pixels = orient(image.convert('RGB'), width, height)
+
+    # empty red plane, in the polarity of the panel
+    blank = solid(0x00 if red_inverted else 0xFF, size)
+
+    if pixels is None:
+        return solid(0xFF, size), blank
+
+    red_channel, green_channel, blue_channel = (pixels[..., channel].astype(np.int32) for channel in range(3))
+
+    red = (red_channel >= 0x80) & (green_channel < 0x80) & (blue_channel < 0x80)
+
+    # luminance as in PIL's `L` conversion
+    # see https://pillow.readthedocs.io/en/latest/reference/Image.html#PIL.Image.Image.convert
+    black = ~red & (red_channel * 299 + green_channel * 587 + blue_channel * 114 < 0x80 * 1000)
+
+    black_plane = pack_plane(~black, row_bytes) if black.any() else solid(0xFF, size)
+    red_plane = pack_plane(red if red_inverted else ~red, row_bytes) if red.any() else blank
+
+    return black_plane, red_plane
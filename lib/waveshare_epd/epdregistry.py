@@ -0,0 +1,69 @@
+""" capability registry of the Waveshare e-Paper Display drivers """
+
+import ast
+import functools
+import importlib
+import logging
+import pathlib
+
+logger = logging.getLogger(__name__)
+
+# fields of the `CAPABILITIES` descriptor declared by each driver module
+# "resolution":  (width, height) of the panel, in pixels
+# "planes":      number of color planes, 1 for black only, 2 for black and red
+# "partial":     whether windowed partial refreshes are supported
+# "fast_init":   whether a fast refresh waveform can be loaded (`init_Fast`)
+# "gray_levels": number of gray levels, 4 if the 4-level grayscale mode is supported
+# "refresh_ms":  typical refresh duration in milliseconds, by refresh type (`full`, `fast`, `partial`, `gray4`)
+FIELDS = ("resolution", "planes", "partial", "fast_init", "gray_levels", "refresh_ms")
+
+DRIVER_DIRECTORY = pathlib.Path(__file__).parent
+
+
+def _descriptor(path):
+    # read the `CAPABILITIES` literal from the source of a driver module, or None if it declares none
+    for node in ast.parse(path.read_text(encoding="utf-8"), filename=str(path)).body:
+        if not isinstance(node, ast.Assign):
+            continue
+
+        if any(isinstance(target, ast.Name) and target.id == "CAPABILITIES" for target in node.targets):
+            descriptor = ast.literal_eval(node.value)
+            missing = [field for field in FIELDS if field not in descriptor]
+
+            if missing:
+                logger.warning("driver `%s` does not declare capabilities %s", path.stem, ", ".join(missing))
+                return None
+
+            return descriptor
+
+    return None
+
+
+@functools.lru_cache(maxsize=1)
+def drivers():
+    # index the capabilities of all driver modules in this directory
+    # drivers import `epdconfig`, which probes (and claims) the hardware, so descriptors are read from their source
+    # the returned dict is shared by all callers, and must not be modified
+    registry = {}
+
+    for path in sorted(DRIVER_DIRECTORY.glob("epd*.py")):
+        descriptor = _descriptor(path)
+
+        if descriptor is not None:
+            registry[path.stem] = descriptor
+
+    logger.debug("indexed %d e-Paper drivers", len(registry))
+    return registry
+
+
+def capabilities(name):
+    # capabilities of a driver module, e.g. `epd2in9_V2`, or None if the driver is unknown
+    return drivers().get(name)
+
+
+def load(name):
+    # import a driver module, e.g. `epd2in9_V2`; only drivers in the registry can be loaded
+    if name not in drivers():
+        raise ValueError(f"unsupported e-Paper driver `{name}`, expected one of: {', '.join(drivers())}")
+
+    return importlib.import_module(__package__ + "." + name)
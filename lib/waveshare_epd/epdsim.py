@@ -0,0 +1,349 @@
+""" simulated hardware interface for Waveshare e-Paper Displays, for development and CI without a panel """
+
+import collections
+import logging
+import threading
+import time
+
+import numpy as np
+
+from . import epdpack
+
+logger = logging.getLogger(__name__)
+
+# controller families, see `PROFILES`
+# "ssd": SSD16xx, RAM `0x24` (black / new) and `0x26` (red / old), windowed addressing, updates on `0x20`
+# "uc":  UC81xx, RAM `0x10` (black / old) and `0x13` (red / new), linear addressing, refreshes on `0x12`
+SSD = "ssd"
+UC = "uc"
+
+# simulated panels: controller family, plane layout, refresh durations in seconds,
+# and (optionally) panel-specific `0x22` options overriding `SSD_UPDATE_OPTIONS`
+# durations follow the refresh times Waveshare lists for each panel
+PROFILES = {
+    "epd2in7_V2": {
+        "controller": SSD,
+        "colors": "mono",
+        "refresh": {"full": 3.0, "fast": 1.5, "partial": 0.3, "short": 0.01},
+
+        # `display_Fast` skips loading the temperature value (`0xF7`)
+        "options": {0xC7: "fast"},
+    },
+    "epd2in7b_V2": {
+        "controller": SSD,
+        "colors": "red",
+        "refresh": {"full": 16.0, "fast": 16.0, "partial": 16.0, "short": 0.01},
+    },
+    "epd2in9_V2": {
+        "controller": SSD,
+        "colors": "mono",
+        "refresh": {"full": 3.0, "fast": 1.5, "partial": 0.3, "short": 0.01},
+    },
+    "epd2in9b_V3": {
+        "controller": UC,
+        "colors": "red",
+        "refresh": {"full": 15.0, "fast": 15.0, "partial": 15.0, "short": 0.1},
+    },
+}
+
+# profile used for drivers without an entry in `PROFILES`
+DEFAULT_PROFILE = {
+    "controller": SSD,
+    "colors": "mono",
+    "refresh": {"full": 3.0, "fast": 1.5, "partial": 0.3, "short": 0.01},
+}
+
+# `0x22` (Display Update Control 2) options of SSD16xx controllers, by refresh type
+SSD_UPDATE_OPTIONS = {
+    0x0F: "partial",
+    0xFF: "partial",
+    0xC7: "full",
+    0xF7: "full",
+}
+
+# gray values of the 4 levels of the 4-level grayscale mode, from black to white
+GRAY_LEVELS = np.array([0x00, 0x80, 0xC0, 0xFF], dtype=np.uint8)
+
+
+class Simulated:
+    # Pin definition
+    RST_PIN  = 17
+    DC_PIN   = 25
+    CS_PIN   = 8
+    BUSY_PIN = 24
+    PWR_PIN  = 18
+
+    # like the Raspberry Pi, chip-select is driven by the SPI controller
+    HARDWARE_CS = True
+
+    # maximum number of SPI transfers and GPIO transitions kept in `spi_log` and `gpio_log`
+    LOG_SIZE = 4096
+
+    # bytes per RAM row of SSD16xx controllers, which can be wider than the panel (e.g. for offset windows)
+    SSD_RAM_ROW_BYTES = 32
+
+    def __init__(self):
+        self.name = None
+        self.profile = DEFAULT_PROFILE
+        self.width = 0
+        self.height = 0
+        self.gray = False
+        self.output = None
+        self.time_scale = 1.0
+
+        # recorded `(dc, bytes)` SPI transfers and `(timestamp, pin, value)` GPIO transitions
+        self.spi_log = collections.deque(maxlen=self.LOG_SIZE)
+        self.gpio_log = collections.deque(maxlen=self.LOG_SIZE)
+
+        self._pins = {self.RST_PIN: 0, self.DC_PIN: 0, self.CS_PIN: 1, self.PWR_PIN: 0}
+        self._busy_level = 1
+        self._busy_until = 0.0
+        self._wake = threading.Event()
+        self._cancelled = False
+
+        self._ram = {}
+        self._stride = 0
+        self._command = None
+        self._params = bytearray()
+        self._update_option = None
+        self._window = (0, 0, 0, 0)
+        self._cursor = (0, 0)
+        self._address = (0, 0)
+
+        self.reset_stats()
+
+    def attach(self, name, width, height, gray=False, output=None, time_scale=1.0):
+        # describe the simulated panel; `name` is the driver module name, e.g. `epd2in9_V2`
+        self.name = name
+        self.profile = PROFILES.get(name, DEFAULT_PROFILE)
+        self.width = width
+        self.height = height
+        self.gray = gray
+        self.output = output
+        self.time_scale = time_scale
+
+        row_bytes = epdpack.linewidth(width)
+
+        if self.profile["controller"] == SSD:
+            planes = (0x24, 0x26)
+            self._stride = max(row_bytes, self.SSD_RAM_ROW_BYTES)
+        else:
+            planes = (0x10, 0x13)
+            self._stride = row_bytes
+
+        self._ram = {plane: bytearray([0xFF]) * (self._stride * height) for plane in planes}
+
+        # the red plane of SSD16xx tri-color panels is active-high, so it starts without any red
+        if self.profile["controller"] == SSD and self.profile["colors"] == "red":
+            self._ram[0x26] = bytearray(self._stride * height)
+
+        self._window = (0, row_bytes - 1, 0, height - 1)
+        self._cursor = (0, 0)
+
+        logger.info("simulating e-Paper `%s` (%d x %d)", name, width, height)
+
+    def reset_stats(self):
+        self.bytes_written = 0
+        self.commands = 0
+        self.refreshes = collections.Counter()
+        self.busy_seconds = 0.0
+
+    def stats(self):
+        # modelled `busy_seconds` are not scaled by `time_scale`
+        return {
+            "bytes_written": self.bytes_written,
+            "commands": self.commands,
+            "refreshes": dict(self.refreshes),
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+    def digital_write(self, pin, value):
+        if self._pins.get(pin) != value:
+            self.gpio_log.append((time.monotonic(), pin, value))
+        self._pins[pin] = value
+
+    def digital_read(self, pin):
+        if pin == self.BUSY_PIN:
+            return self._busy_level if time.monotonic() < self._busy_until else 1 - self._busy_level
+        return self._pins.get(pin, 0)
+
+    def wait_busy(self, pin, idle, timeout=None):
+        # the panel is busy until the modelled refresh duration has elapsed
+        self._busy_level = 1 - idle
+        self._wake.clear()
+
+        remaining = self._busy_until - time.monotonic()
+        if remaining > 0 and not self._cancelled:
+            self._wake.wait(remaining if timeout is None else min(remaining, timeout))
+
+        if self._cancelled:
+            logger.warning("e-Paper busy wait cancelled")
+            return False
+
+        return self.digital_read(pin) == idle
+
+    def cancel_wait(self):
+        self._cancelled = True
+        self._wake.set()
+
+    def reset_cancel(self):
+        self._cancelled = False
+
+    def delay_ms(self, delaytime):
+        time.sleep(delaytime / 1000.0 * self.time_scale)
+
+    def spi_writebyte(self, data):
+        self._transfer(data)
+
+    def spi_writebyte2(self, data):
+        self._transfer(data)
+
+    def module_init(self, *args, **kwargs):
+        return 0
+
+    def module_exit(self, *args, **kwargs):
+        logger.debug("simulated e-Paper released")
+
+    def snapshot(self):
+        # decode the panel RAM into a PIL Image, oriented like the canvases rendered by Baedge
+        from PIL import Image
+
+        row_bytes = epdpack.linewidth(self.width)
+
+        def plane(command):
+            ram = np.frombuffer(bytes(self._ram[command]), dtype=np.uint8).reshape(self.height, self._stride)
+            return np.unpackbits(ram[:, :row_bytes], axis=1)[:, :self.width].astype(bool)
+
+        if self.profile["controller"] == SSD:
+            black, red = plane(0x24), plane(0x26)
+        else:
+            black, red = plane(0x10), ~plane(0x13)
+
+        if self.gray:
+            # RAM `0x24` holds the inverted low bit, RAM `0x26` the inverted high bit of each pixel's level
+            levels = (~red).astype(np.uint8) << 1 | (~black).astype(np.uint8)
+            pixels = np.stack([GRAY_LEVELS[levels]] * 3, axis=-1)
+
+        else:
+            pixels = np.where(black[..., None], np.uint8(0xFF), np.uint8(0x00)).repeat(3, axis=-1)
+
+            if self.profile["colors"] == "red":
+                pixels[red] = (0xFF, 0x00, 0x00)
+
+        # panel RAM is `width` x `height`, canvases are rendered rotated by 90 degrees
+        return Image.fromarray(np.ascontiguousarray(np.rot90(pixels, -1)), "RGB")
+
+    def _transfer(self, data):
+        data = bytes(data)
+        self.bytes_written += len(data)
+        self.spi_log.append((self._pins[self.DC_PIN], data))
+
+        if self._pins[self.DC_PIN]:
+            self._data(data)
+            return
+
+        for command in data:
+            self._apply_params()
+            self._command = command
+            self.commands += 1
+            self._start(command)
+
+    def _start(self, command):
+        # handle a command byte; RAM writes start at the RAM address counter
+        controller = self.profile["controller"]
+
+        if controller == SSD and command in (0x24, 0x26):
+            self._address = self._cursor
+
+        elif controller == SSD and command == 0x20:
+            self._apply_params()
+            options = {**SSD_UPDATE_OPTIONS, **self.profile.get("options", {})}
+
+            # activations without a `0x22` option run the panel's default (full) update sequence
+            if self._update_option is None:
+                self._refresh("full")
+            else:
+                self._refresh(options.get(self._update_option, "short"))
+
+        elif controller == SSD and command == 0x12:
+            self._busy("short")
+
+        elif controller == UC and command in (0x10, 0x13):
+            self._address = (0, 0)
+
+        elif controller == UC and command == 0x12:
+            self._refresh("full")
+
+        elif controller == UC and command in (0x02, 0x04):
+            self._busy("short")
+
+    def _data(self, data):
+        if self._command in self._ram:
+            self._write_ram(self._ram[self._command], data)
+        else:
+            self._params += data
+
+    def _apply_params(self):
+        # parameters are applied once the next command starts, as they may be sent one byte at a time
+        params, command = self._params, self._command
+        self._params = bytearray()
+
+        if self.profile["controller"] != SSD or not params:
+            return
+
+        if command == 0x22:
+            self._update_option = params[0]
+
+        elif command == 0x44 and len(params) >= 2:
+            self._window = (params[0], params[1], self._window[2], self._window[3])
+
+        elif command == 0x45 and len(params) >= 4:
+            self._window = (self._window[0], self._window[1], params[0] | params[1] << 8, params[2] | params[3] << 8)
+
+        elif command == 0x4E:
+            self._cursor = (params[0], self._cursor[1])
+
+        elif command == 0x4F and len(params) >= 2:
+            self._cursor = (self._cursor[0], params[0] | params[1] << 8)
+
+    def _write_ram(self, ram, data):
+        if not ram:
+            return
+
+        row_bytes = self._stride
+        x_start, x_end = self._window[0], min(self._window[1], row_bytes - 1)
+        x, y = self._address
+        offset = 0
+
+        # fill the window row by row, wrapping to its first column
+        while offset < len(data) and y < self.height:
+            count = min(x_end - x + 1, len(data) - offset)
+            if count <= 0:
+                break
+
+            ram[y * row_bytes + x:y * row_bytes + x + count] = data[offset:offset + count]
+            offset += count
+            x += count
+
+            if x > x_end:
+                x, y = x_start, y + 1
+
+        self._address = (x, y)
+
+    def _busy(self, refresh):
+        duration = self.profile["refresh"][refresh]
+        self.busy_seconds += duration
+        self._busy_until = time.monotonic() + duration * self.time_scale
+
+    def _refresh(self, refresh):
+        self._busy(refresh)
+        self._update_option = None
+
+        if refresh == "short":
+            return
+
+        self.refreshes[refresh] += 1
+
+        if self.output and self._ram:
+            self.snapshot().save(self.output)
+            logger.debug("simulated e-Paper written to `%s`", self.output)
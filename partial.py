@@ -0,0 +1,150 @@
+""" partial-refresh engine for Baedge """
+
+import helpers as hlp
+
+
+def changed_rows(previous, current, rows):
+    """
+    Calculate the range of rows that differ between two packed display buffers
+
+    Parameters:
+        previous (bytes): Bytes of the previously displayed buffer.
+        current (bytes):  Bytes of the buffer to display.
+        rows (int):       Number of rows in each buffer.
+
+    Returns:
+        tuple: Tuple of the first and last (inclusive) changed row, or None if the buffers are identical
+    """
+
+    # pylint: disable=import-outside-toplevel
+    import numpy as np
+
+    previous = np.frombuffer(previous, dtype=np.uint8).reshape(rows, -1)
+    current = np.frombuffer(current, dtype=np.uint8).reshape(rows, -1)
+
+    changed = np.flatnonzero((previous != current).any(axis=1))
+
+    if changed.size == 0:
+        return None
+
+    return int(changed[0]), int(changed[-1])
+
+
+class PartialRefresh:
+    """
+    Partial-refresh state of an EPD, forcing a full refresh every `full_refresh_every` partial refreshes
+
+    Full refreshes write the frame to both RAM banks (`display_Base`) so that the following partial refreshes
+    have a correct baseline; partial refreshes only write the rows that changed (`display_Partial_Rows`).
+    """
+
+    def __init__(self, full_refresh_every):
+        """
+        Parameters:
+            full_refresh_every (int): Number of partial refreshes after which a full refresh is forced.
+        """
+
+        self.full_refresh_every = full_refresh_every
+
+        # number of partial refreshes since the last full refresh
+        self.count = 0
+
+        # buffer currently displayed on the panel, or None if unknown
+        self.previous = None
+
+    def display(self, epd, buffer):
+        """
+        Display a buffer using a partial refresh if possible, falling back to a full refresh otherwise
+
+        Parameters:
+            epd (object):   Object containing EPD library and configuration
+            buffer (bytes): Bytes of the packed display buffer
+
+        Returns:
+            string: String indicating the refresh type used (`partial` or `full`)
+        """
+
+        rows = None
+
+        if self.previous is not None and len(self.previous) == len(buffer):
+            rows = changed_rows(self.previous, buffer, epd.height)
+
+        if rows is None or self.count >= self.full_refresh_every:
+            self.full(epd, buffer)
+            return "full"
+
+        hlp.log_debug('PartialRefresh.display', f'partial refresh of rows {rows[0]} to {rows[1]}')
+        epd.display_Partial_Rows(buffer, rows[0], rows[1])
+
+        self.count += 1
+        self.previous = buffer
+
+        return "partial"
+
+    def full(self, epd, buffer):
+        """
+        Display a buffer using a full refresh
+
+        Parameters:
+            epd (object):   Object containing EPD library and configuration
+            buffer (bytes): Bytes of the packed display buffer
+
+        Returns:
+            bool: Boolean True
+        """
+
+        hlp.log_debug('PartialRefresh.full', f'full refresh after {self.count} partial refreshes')
+
+        self.restore(epd)
+        epd.display_Base(buffer)
+
+        self.previous = buffer
+
+        return True
+
+    def restore(self, epd):
+        """
+        Restore the full-refresh waveform after partial refreshes, and forget the displayed buffer
+
+        Parameters:
+            epd (object): Object containing EPD library and configuration
+
+        Returns:
+            bool: Boolean True
+        """
+
+        # partial refreshes leave the partial waveform loaded, re-initialize to load the full waveform
+        if self.count:
+            epd.init()
+
+        self.count = 0
+        self.forget()
+
+        return True
+
+    def reset(self):
+        """
+        Forget the partial-refresh state without re-initializing the EPD, e.g. before a refresh in another mode
+
+        Returns:
+            bool: Boolean True if partial refreshes left the partial waveform loaded
+        """
+
+        loaded = self.count > 0
+
+        self.count = 0
+        self.forget()
+
+        return loaded
+
+    def forget(self):
+        """
+        Forget the displayed buffer, so that the next refresh is a full refresh
+
+        Returns:
+            bool: Boolean True
+        """
+
+        self.previous = None
+
+        return True
@@ -0,0 +1,118 @@
+""" QR code cache """
+
+import threading
+import typing
+
+import helpers as hlp
+
+# error correction levels, by name of their constant in `qrcode.constants`
+# see https://pypi.org/project/qrcode/#advanced-usage
+ERROR_CORRECTION = {
+    "L": "ERROR_CORRECT_L",
+    "M": "ERROR_CORRECT_M",
+    "Q": "ERROR_CORRECT_Q",
+    "H": "ERROR_CORRECT_H",
+}
+
+
+class QRCodeOptions(typing.NamedTuple):
+    """ settings a QR code is generated with, see `cfg.baedge["qrcode"]` """
+    version: int
+    box_size: int
+    error_correction: str = "M"
+    fit: bool = True
+
+
+def rasterize(matrix, box_size):
+    """
+    Scale a QR code module matrix to a 1-bit image
+
+    Parameters:
+        matrix (list):  List of rows of booleans, True for dark modules (including the border).
+        box_size (int): Size of each module, in pixels.
+
+    Returns:
+        object: PIL Image in mode `1`, with dark modules drawn black
+    """
+
+    # NumPy and PIL are imported on first use, to keep them out of the server's startup
+    # pylint: disable=import-outside-toplevel
+    import numpy as np
+    from PIL import Image
+
+    # `1` images treat True as white, so dark modules are inverted before scaling
+    modules = ~np.asarray(matrix, dtype=bool)
+
+    return Image.fromarray(np.repeat(np.repeat(modules, box_size, axis=0), box_size, axis=1))
+
+
+class QRCodeCache:
+    """
+    Cache of generated QR code matrices and their rasterized images
+
+    Entries are keyed by content and QRCodeOptions.
+    """
+
+    def __init__(self):
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._codes)
+
+    def get(self, content, options):
+        """
+        Retrieve the image of a QR code, generating it on first use
+
+        Parameters:
+            content (string): Data to encode.
+            options (object): QRCodeOptions containing the version (between 1 and 40), the size of each module
+                              (in pixels), the error correction level (one of `ERROR_CORRECTION`), and whether
+                              to increase the version until the content fits.
+
+        Returns:
+            object: PIL Image in mode `1`
+        """
+
+        key = (content, options)
+
+        with self._lock:
+            entry = self._codes.get(key)
+
+            if entry is not None:
+                return entry[1]
+
+            # pylint: disable=import-outside-toplevel
+            import qrcode
+
+            # see https://pypi.org/project/qrcode/#advanced-usage
+            code = qrcode.QRCode(
+                box_size=options.box_size,
+                error_correction=getattr(qrcode.constants, ERROR_CORRECTION[options.error_correction]),
+                version=options.version,
+            )
+
+            # add data to the code and make it fit the bounding box
+            code.add_data(content)
+            code.make(options.fit)
+
+            matrix = code.get_matrix()
+            image = rasterize(matrix, options.box_size)
+            hlp.log_debug('QRCodeCache.get', f'generate QR code version {code.version} of {image.size} pixels')
+
+            self._codes[key] = (matrix, image)
+
+            return image
+
+    def clear(self):
+        """
+        Remove all QR codes from the cache
+
+        Returns:
+            bool: Boolean True
+        """
+
+        with self._lock:
+            self._codes.clear()
+
+        return True
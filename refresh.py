@@ -0,0 +1,199 @@
+""" refresh modes for Baedge """
+
+import threading
+
+import helpers as hlp
+
+# refresh modes a write can request, see `supported`
+MODES = ("full", "fast", "partial", "gray4")
+
+# waveform loaded into the EPD for each refresh mode
+# partial refreshes load their own waveform on each refresh, on top of the full waveform
+WAVEFORMS = {
+    "full": "full",
+    "fast": "fast",
+    "partial": "full",
+    "gray4": "gray4",
+}
+
+
+def supported(capabilities):
+    """
+    List the refresh modes an EPD model supports
+
+    Parameters:
+        capabilities (dict): Dict containing the capabilities declared by the driver of the EPD model
+
+    Returns:
+        list: List of refresh modes, see `MODES`
+    """
+
+    modes = ["full"]
+
+    if capabilities["fast_init"]:
+        modes.append("fast")
+
+    if capabilities["partial"]:
+        modes.append("partial")
+
+    if capabilities["gray_levels"] == 4:
+        modes.append("gray4")
+
+    return modes
+
+
+class Waveform:
+    """
+    Waveform loaded into an EPD, re-initializing the EPD when a refresh needs a different waveform
+
+    Fast refreshes leave ghosting behind, like partial refreshes do, so every `full_refresh_every` consecutive
+    fast refreshes, the next fast refresh is replaced by a full refresh.
+    """
+
+    def __init__(self, full_refresh_every):
+        """
+        Parameters:
+            full_refresh_every (int): Number of fast refreshes after which a full refresh is forced.
+        """
+
+        self.full_refresh_every = full_refresh_every
+
+        # waveform currently loaded into the EPD, or None if unknown
+        self.loaded = None
+
+        # number of fast refreshes since the last full refresh
+        self.count = 0
+
+    def resolve(self, mode):
+        """
+        Decide which refresh mode to use for a requested refresh mode
+
+        Parameters:
+            mode (string): String containing the requested refresh mode
+
+        Returns:
+            string: String containing the refresh mode to use
+        """
+
+        if mode == "fast" and self.count >= self.full_refresh_every:
+            hlp.log_debug('Waveform.resolve', f'full refresh after {self.count} fast refreshes')
+            return "full"
+
+        return mode
+
+    def load(self, epd, mode):
+        """
+        Load the waveform of a refresh mode into the EPD, unless it is already loaded
+
+        Parameters:
+            epd (object):  Object containing EPD library and configuration
+            mode (string): String containing the refresh mode
+
+        Returns:
+            bool: Boolean True if the EPD was re-initialized
+        """
+
+        waveform = WAVEFORMS[mode]
+
+        if waveform == self.loaded:
+            return False
+
+        hlp.log_debug('Waveform.load', f'load `{waveform}` waveform')
+
+        if waveform == "gray4":
+            epd.Init_4Gray()
+
+        elif waveform == "fast":
+            epd.init_Fast()
+
+        else:
+            epd.init()
+
+        self.loaded = waveform
+
+        return True
+
+    def record(self, mode):
+        """
+        Record a refresh, to decide when the next full refresh is due
+
+        Parameters:
+            mode (string): String containing the refresh mode used
+
+        Returns:
+            bool: Boolean True
+        """
+
+        if mode == "fast":
+            self.count += 1
+
+        # partial refreshes do not clear the ghosting left by fast refreshes
+        elif mode != "partial":
+            self.count = 0
+
+        return True
+
+    def forget(self):
+        """
+        Forget the loaded waveform, e.g. after the EPD was put to sleep, so that it is re-initialized on the next refresh
+
+        Returns:
+            bool: Boolean True
+        """
+
+        self.loaded = None
+
+        return True
+
+
+class Latency:
+    """
+    Durations of refreshes, by refresh mode, to compare the speed of refresh modes on an EPD model
+    """
+
+    def __init__(self):
+        self._modes = {}
+        self._lock = threading.Lock()
+
+    def record(self, mode, duration):
+        """
+        Record the duration of a refresh
+
+        Parameters:
+            mode (string):    String containing the refresh mode used
+            duration (float): Duration of the refresh, in milliseconds
+
+        Returns:
+            bool: Boolean True
+        """
+
+        with self._lock:
+            entry = self._modes.setdefault(mode, {"count": 0, "total_ms": 0.0, "min_ms": duration, "max_ms": duration})
+
+            entry["count"] += 1
+            entry["total_ms"] += duration
+            entry["last_ms"] = duration
+            entry["min_ms"] = min(entry["min_ms"], duration)
+            entry["max_ms"] = max(entry["max_ms"], duration)
+
+        return True
+
+    def stats(self):
+        """
+        Retrieve refresh durations
+
+        Returns:
+            dict: Dict containing the number of refreshes and their last, mean, minimum, and maximum duration, by mode
+        """
+
+        with self._lock:
+            return {
+                mode: {
+                    "count": entry["count"],
+                    "last_ms": round(entry["last_ms"], 1),
+                    "mean_ms": round(entry["total_ms"] / entry["count"], 1),
+                    "min_ms": round(entry["min_ms"], 1),
+                    "max_ms": round(entry["max_ms"], 1),
+                }
+                for mode, entry in self._modes.items()
+            }
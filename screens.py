@@ -0,0 +1,354 @@
+""" compiled screen layouts """
+
+import functools
+import hashlib
+import json
+import numbers
+import os
+import threading
+import typing
+
+import qrcodes
+import helpers as hlp
+import config as cfg
+
+# keys allowed in a screen configuration, see `cfg.screens`
+SCREEN_KEYS = ("font", "images", "qrcode", "shapes", "texts")
+
+# shape types that can be drawn, see https://pillow.readthedocs.io/en/latest/reference/ImageDraw.html
+SHAPE_TYPES = ("rectangle",)
+
+# generated QR codes, shared by all screens
+qrcode_cache = qrcodes.QRCodeCache()
+
+
+class ScreenError(ValueError):
+    """
+    Raised if a screen configuration is invalid
+    """
+
+
+class Font(typing.NamedTuple):
+    """ TrueType face and size of a font """
+    face: str
+    size: int
+
+
+class Shape(typing.NamedTuple):
+    """ shape drawn onto a screen """
+    type: str
+    coordinates: tuple
+    fill: object
+
+
+class Picture(typing.NamedTuple):
+    """ image file pasted onto a screen """
+    path: str
+    coordinates: tuple
+
+
+class Text(typing.NamedTuple):
+    """ (multiline) text drawn onto a screen """
+    content: str
+    coordinates: tuple
+    fill: object
+    font: Font
+
+
+class QRCode(typing.NamedTuple):
+    """ QR code pasted onto a screen, at fixed coordinates or relative to the screen edges """
+    content: str
+    image: object
+    coordinates: tuple
+    offset: float
+
+
+class Layout(typing.NamedTuple):
+    """ validated, geometry-independent layout of a screen """
+    name: str
+    digest: str
+    font: Font
+    shapes: tuple
+    images: tuple
+    texts: tuple
+    qrcode: QRCode
+
+
+def _fail(name, message):
+    raise ScreenError(f"screen `{name}`: {message}")
+
+
+def _coordinates(name, value, length, field):
+    if not isinstance(value, (tuple, list)) or len(value) != length:
+        _fail(name, f"`{field}` must be a sequence of {length} numbers")
+
+    if not all(isinstance(number, numbers.Real) for number in value):
+        _fail(name, f"`{field}` must be a sequence of {length} numbers")
+
+    return tuple(value)
+
+
+def _fill(name, value, field):
+    # color names (e.g. `red`) are drawn in red on tri-color EPD models, and as gray on all others
+    if isinstance(value, str):
+        # pylint: disable=import-outside-toplevel
+        from PIL import ImageColor
+
+        try:
+            ImageColor.getrgb(value)
+        except ValueError:
+            _fail(name, f"`{field}` `{value}` is not a color name")
+
+        return value
+
+    if not isinstance(value, int) or not 0 <= value <= 255:
+        _fail(name, f"`{field}` must be an integer between 0 and 255, or a color name")
+
+    return value
+
+
+def _font(name, value, field):
+    if not isinstance(value, dict) or "face" not in value or "size" not in value:
+        _fail(name, f"`{field}` must contain a `face` and a `size`")
+
+    if not os.path.isfile(value["face"]):
+        _fail(name, f"`{field}.face` `{value['face']}` does not exist")
+
+    if not isinstance(value["size"], int) or value["size"] < 1:
+        _fail(name, f"`{field}.size` must be a positive integer")
+
+    return Font(value["face"], value["size"])
+
+
+def compile_qrcode(name, value):
+    """
+    Validate the QR code of a screen and generate its image
+
+    Parameters:
+        name (string): Name of the screen.
+        value (dict):  Dict containing QR code configuration.
+
+    Returns:
+        object: QRCode
+    """
+
+    if not isinstance(value.get("content"), str) or not value["content"]:
+        _fail(name, "`qrcode.content` must be a non-empty string")
+
+    coordinates = None
+    offset = None
+
+    if "coordinates" in value:
+        coordinates = _coordinates(name, value["coordinates"], 2, "qrcode.coordinates")
+
+    elif isinstance(value.get("offset"), numbers.Real):
+        offset = value["offset"]
+
+    else:
+        _fail(name, "`qrcode` must contain `coordinates` or a numeric `offset`")
+
+    if cfg.baedge["qrcode"]["error_correction"] not in qrcodes.ERROR_CORRECTION:
+        _fail(name, f"QR code error correction must be one of {list(qrcodes.ERROR_CORRECTION)}")
+
+    try:
+        image = qrcode_cache.get(value["content"], qrcodes.QRCodeOptions(
+            version=cfg.baedge["qrcode"]["version"],
+            box_size=cfg.baedge["qrcode"]["box_size"],
+            error_correction=cfg.baedge["qrcode"]["error_correction"],
+            fit=cfg.baedge["qrcode"]["fit"],
+        ))
+
+    except ValueError as e:
+        _fail(name, f"`qrcode.content` cannot be encoded: {e}")
+
+    return QRCode(value["content"], image, coordinates, offset)
+
+
+def compile_screen(name, screen):
+    """
+    Validate a screen configuration and compile it into a layout
+
+    Parameters:
+        name (string): Name of the screen.
+        screen (dict): Dict containing screen configuration, see `cfg.screens`.
+
+    Returns:
+        object: Layout
+    """
+
+    if not isinstance(screen, dict):
+        _fail(name, "configuration must be a dict")
+
+    unknown = sorted(set(screen) - set(SCREEN_KEYS))
+
+    if unknown:
+        _fail(name, f"unknown keys {unknown}")
+
+    if "font" not in screen:
+        _fail(name, "`font` is required")
+
+    font = _font(name, screen["font"], "font")
+
+    shapes = []
+
+    for index, item in enumerate(screen.get("shapes", [])):
+        field = f"shapes[{index}]"
+
+        if item.get("type") not in SHAPE_TYPES:
+            _fail(name, f"`{field}.type` must be one of {list(SHAPE_TYPES)}")
+
+        shapes.append(Shape(
+            item["type"],
+            _coordinates(name, item.get("coordinates"), 4, field + ".coordinates"),
+            _fill(name, item.get("fill"), field + ".fill"),
+        ))
+
+    images = []
+
+    for index, item in enumerate(screen.get("images", [])):
+        field = f"images[{index}]"
+
+        if not isinstance(item.get("content"), str) or not os.path.isfile(item["content"]):
+            _fail(name, f"`{field}.content` `{item.get('content')}` does not exist")
+
+        images.append(Picture(
+            os.path.abspath(item["content"]),
+            _coordinates(name, item.get("coordinates"), 2, field + ".coordinates"),
+        ))
+
+    texts = []
+
+    for index, item in enumerate(screen.get("texts", [])):
+        field = f"texts[{index}]"
+
+        if not isinstance(item.get("content"), str):
+            _fail(name, f"`{field}.content` must be a string")
+
+        texts.append(Text(
+            item["content"].lstrip(),
+            _coordinates(name, item.get("coordinates"), 2, field + ".coordinates"),
+            _fill(name, item.get("fill"), field + ".fill"),
+            _font(name, item["font"], field + ".font") if "font" in item else font,
+        ))
+
+    code = compile_qrcode(name, screen["qrcode"]) if "qrcode" in screen else None
+
+    # the digest identifies the screen contents, e.g. for caching packed display buffers
+    digest = hashlib.sha256(json.dumps(screen, default=str, sort_keys=True).encode("utf-8")).hexdigest()
+
+    return Layout(name, digest, font, tuple(shapes), tuple(images), tuple(texts), code)
+
+
+def compile_screens(screens):
+    """
+    Compile all screen configurations
+
+    Parameters:
+        screens (dict): Dict containing screen configurations, see `cfg.screens`.
+
+    Returns:
+        dict: Dict containing a Layout for each screen
+    """
+
+    compiled = {
+        name: compile_screen(name, screen)
+        for name, screen in screens.items()
+        if name != "active"
+    }
+
+    for name in screens.get("active", []):
+        if name not in compiled:
+            raise ScreenError(f"active screen `{name}` is not configured")
+
+    hlp.log_debug('compile_screens', f'compiled {len(compiled)} screens')
+
+    return compiled
+
+
+# drawing operations of each layout, keyed by layout name and panel geometry
+_operations = {}
+_operations_lock = threading.Lock()
+
+
+def operations(layout, width, height, fitter):
+    """
+    Resolve a layout into drawing operations for a panel geometry
+
+    Text fonts are shrunk to fit the screen and QR code offsets are turned into coordinates;
+    operations are resolved once for each layout and panel geometry.
+
+    Parameters:
+        layout (object): Layout of the screen.
+        width (int):     Width of the eInk screen.
+        height (int):    Height of the eInk screen.
+        fitter (object): TextFitter used to fit texts, see `layout.TextFitter`.
+
+    Returns:
+        tuple: Tuple of Shape, Picture, Text, and QRCode operations, in drawing order
+    """
+
+    key = (layout.name, layout.digest, width, height)
+    resolved = _operations.get(key)
+
+    if resolved is not None:
+        return resolved
+
+    longer_side = max(width, height)
+    shorter_side = min(width, height)
+
+    texts = []
+
+    for text in layout.texts:
+        # shrink the font until the text fits between its coordinates and the edges of the screen
+        box = (longer_side - text.coordinates[0], shorter_side - text.coordinates[1])
+        size = fitter.fit(text.content, text.font.face, text.font.size, box)
+
+        texts.append(text._replace(font=text.font._replace(size=size)))
+
+    codes = []
+
+    if layout.qrcode is not None:
+        code = layout.qrcode
+
+        if code.coordinates is None:
+            code = code._replace(coordinates=hlp.generate_relative_coordinates(
+                height,
+                width,
+                code.offset,
+                code.image.size,
+            ))
+
+        codes.append(code)
+
+    resolved = layout.shapes + layout.images + tuple(texts) + tuple(codes)
+
+    with _operations_lock:
+        _operations[key] = resolved
+
+    return resolved
+
+
+def clear_operations():
+    """
+    Remove the drawing operations resolved for all layouts
+
+    Returns:
+        bool: Boolean True
+    """
+
+    with _operations_lock:
+        _operations.clear()
+
+    return True
+
+
+@functools.cache
+def load_layouts():
+    """
+    Compile (and validate) the layouts of all configured screens, on first use
+
+    Returns:
+        dict: Dict of layouts, keyed by screen name
+    """
+
+    return compile_screens(cfg.screens)
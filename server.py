@@ -4,6 +4,7 @@ import logging
 import os
 import signal
 import sys
+import time
 
 from flask import (
     Flask,
@@ -17,6 +18,8 @@ from flask import (
 import helpers as hlp
 import config as cfg
 import baedge
+import screens
+import worker
 
 # override server debug mode if log level is explicitly set to `DEBUG`
 if cfg.app["logging"]["level"] == "DEBUG":
@@ -51,14 +54,35 @@ def handle_signal(signal_name, signal_frame):
 
     hlp.log_debug('handle_signal', 'catch signal `' + str(signal_name) + '`, attempt graceful shutdown')
 
+    # let the display worker finish its current job, so it releases the EPD
+    released = True
+
+    if server.worker and not server.worker.stop(timeout=cfg.app["jobs"]["stop_timeout"]):
+        # the panel did not release its BUSY line in time, cancel the wait so the worker releases the EPD
+        hlp.log_error('handle_signal', 'display worker did not stop in time, cancel wait for busy EPD')
+        baedge.load_library().epdconfig.cancel_wait()
+
+        # the worker may still be sending a buffer to the EPD, which must not be interleaved with clearing it
+        released = server.worker.stop(timeout=cfg.app["jobs"]["stop_timeout"])
+
+        if not released:
+            hlp.log_error('handle_signal', 'display worker did not release the EPD, skip clearing screen')
+
+        # cancellation lasts until re-armed, so that the worker cannot start another wait in the meantime
+        else:
+            baedge.load_library().epdconfig.reset_cancel()
+
     # attempt to clear the screen without sleeping to allow for releasing GPIO
-    baedge.clear_screen(
-        server.epd,
-        sleep_screen=False
-    )
+    # the screen is kept if configured, so that the next start can skip clearing and writing it again
+    # the screen is not initialized if the server was not started directly, or if initializing it failed
+    if server.epd and released and cfg.baedge["clear_on_exit"]:
+        baedge.clear_screen(
+            server.epd,
+            sleep_screen=False
+        )
 
     # release GPIO and exit EPD module cleanly
-    baedge.epd_library.epdconfig.module_exit(cleanup=True)
+    baedge.load_library().epdconfig.module_exit(cleanup=True)
 
     # good goodbye
     sys.exit(0)
@@ -72,6 +96,38 @@ server = Flask(
     template_folder=cfg.app["templates"],
 )
 
+# EPD library and configuration, set once the screen is initialized
+server.epd = None
+
+# background display worker, started once the screen is initialized
+server.worker = None
+
+# background warm-up of the buffer cache, started once the initial screen is displayed
+server.warmup = None
+
+# durations (in milliseconds) from the start of the process to each startup stage, see `mark_startup`
+server.startup = {}
+STARTED_AT = hlp.process_started_at()
+
+
+def mark_startup(stage):
+    """
+    Record the time from the start of the process to a startup stage, once per stage
+
+    Parameters:
+        stage (string): String indicating the startup stage, e.g. `initialized`
+
+    Returns:
+        bool: Boolean True if the stage was not recorded before
+    """
+
+    if stage in server.startup:
+        return False
+
+    server.startup[stage] = round((time.time() - STARTED_AT) * 1000, 1)
+
+    return True
+
 
 @server.route(cfg.routes["root"], methods=['GET'])
 def root_get():
@@ -127,6 +183,10 @@ def status_get():
     """ status endpoint """
     hlp.log_debug('GET ' + cfg.routes["status"], 'init')
 
+    # report how long the server took to become available, once
+    if mark_startup("first_status"):
+        hlp.log_info('startup', 'startup timings (ms since process start): ' + str(server.startup))
+
     return make_response("OK", 200)
 
 
@@ -159,8 +219,26 @@ def status_screen_get():
     """ screen status endpoint """
     hlp.log_debug('GET ' + cfg.routes["status_screen"], 'init')
 
-    # render message and return status 200
-    return make_response("Device Status may be OK", 200)
+    status = {
+        "screen": baedge.on_glass["screen"],
+        "warmup": server.warmup.progress() if server.warmup else {"status": "disabled"},
+        "spi": baedge.spi_stats(),
+        "driver": {
+            "name": baedge.driver_name,
+            "mode": baedge.display_mode(server.epd) if server.epd else None,
+            "modes": baedge.supported_modes(server.epd) if server.epd else None,
+            "capabilities": baedge.capabilities(server.epd) if server.epd else None,
+        },
+
+        # durations of the refreshes since startup, by refresh mode
+        "refresh": baedge.refresh_latency.stats(),
+
+        # durations from the start of the process to each startup stage
+        "startup": server.startup,
+    }
+
+    # render screen status and return status 200
+    return make_response(jsonify(status), 200)
 
 
 @server.route(cfg.routes["device_clear"], methods=['POST'])
@@ -181,6 +259,12 @@ def write_post():
     # get `screen` identifier from POST data
     screen = request.form.get('screen')
 
+    # get optional `force` flag from POST data, to refresh the display even if the frame is already displayed
+    force = hlp.is_truthy(request.form.get('force'))
+
+    # get optional refresh `mode` from POST data (`full`, `fast`, `partial`, or `gray4`), trading image quality for speed
+    mode = request.form.get('mode') or None
+
     if screen:
         hlp.log_debug('POST ' + cfg.routes["device_write"], "screen is: " + screen)
 
@@ -189,15 +273,23 @@ def write_post():
             hlp.log_debug('POST ' + cfg.routes["device_write"], "select inactive screen")
             response = make_response("Cannot load screen `" + screen + "`", 400)
 
-        # continue for allowed screens
+        # catch missing display worker (e.g. if the screen could not be initialized) and bail
+        elif not server.epd or not server.worker:
+            hlp.log_debug('POST ' + cfg.routes["device_write"], "display worker is not available")
+            response = make_response("Unable to write to screen", 503)
+
+        # catch refresh modes the EPD model does not support and bail
+        elif mode and mode not in baedge.supported_modes(server.epd):
+            hlp.log_debug('POST ' + cfg.routes["device_write"], "select unsupported mode")
+            response = make_response("Cannot refresh screen in mode `" + mode + "`", 400)
+
+        # continue for allowed screens, writing happens asynchronously in the display worker
         else:
-            if baedge.write_screen(server.epd, screen):
-                hlp.log_debug('POST ' + cfg.routes["device_write"], "write to screen successful")
-                response = make_response("OK", 200)
+            job = server.worker.submit(screen, force=force, mode=mode)
+            hlp.log_debug('POST ' + cfg.routes["device_write"], "queued job `" + job["id"] + "`")
 
-            else:
-                hlp.log_debug('POST ' + cfg.routes["device_write"], "write to screen failed")
-                response = make_response("Unable to write to screen", 400)
+            response = make_response(jsonify(job), 202)
+            response.headers["Location"] = cfg.routes["device_jobs"].replace("<job_id>", job["id"])
 
     else:
         response = make_response("Payload did not contain expected data", 400)
@@ -205,6 +297,20 @@ def write_post():
     return response
 
 
+@server.route(cfg.routes["device_jobs"], methods=['GET'])
+def jobs_get(job_id):
+    """ display job status endpoint """
+    hlp.log_debug('GET ' + cfg.routes["device_jobs"], 'init')
+
+    job = server.worker.job(job_id) if server.worker else None
+
+    if not job:
+        return make_response("Unknown job `" + job_id + "`", 404)
+
+    # render job status and return status 200
+    return make_response(jsonify(job), 200)
+
+
 # assemble formatted route map
 # MUST BE defined after all routes have been added
 ROUTES = hlp.format_url_map(
@@ -217,24 +323,55 @@ ROUTES = hlp.format_url_map(
 # if no app name is specified, default to running Flask internally
 if __name__ == "__main__":
     hlp.log_debug(__name__, 'initialize function')
+    mark_startup("imported")
+
+    # compile (and validate) all screens at start, so that invalid screens fail before the screen is initialized
+    hlp.log_debug(__name__, 'compile screens')
+    layouts = screens.load_layouts()
+
+    # load all fonts referenced by screens ahead of the first write
+    hlp.log_debug(__name__, 'preload fonts')
+    baedge.font_registry.preload(layouts)
 
-    # skip screen initialization if an unsupported OS is detected:
-    if not baedge.SKIP_INITIALIZE_SCREEN:
-        # initialize eInk screen
-        hlp.log_debug(__name__, 'initialize screen')
-        server.epd = baedge.initialize_screen()
+    # initialize eInk screen
+    hlp.log_debug(__name__, 'initialize screen')
+    server.epd = baedge.initialize_screen(cfg.baedge["initial_screen"])
+    mark_startup("initialized")
+
+    # without a screen, the server only reports its status, and writes are rejected
+    if not server.epd:
+        hlp.log_error(__name__, 'unable to initialize screen, screen cannot be written')
+
+    else:
+        # decode and convert all images referenced by screens, to keep SD card reads out of writes
+        # images are converted to the image mode of the canvas, which depends on the display path of the EPD model
+        hlp.log_debug(__name__, 'preload images')
+        baedge.asset_cache.preload(
+            (image.path for layout in layouts.values() for image in layout.images),
+            baedge.canvas_mode(server.epd),
+        )
 
         hlp.log_debug(__name__, 'write initial screen: ' + cfg.baedge["initial_screen"])
         baedge.write_screen(server.epd, cfg.baedge["initial_screen"])
+        mark_startup("initial_screen")
 
-    else:
-        hlp.log_debug(__name__, 'skip screen initialization')
+        # hand the EPD over to the display worker, which serializes all further writes
+        hlp.log_debug(__name__, 'start display worker')
+        server.worker = worker.DisplayWorker(server.epd)
+        server.worker.start()
+
+        # render and pack the remaining active screens, so the first switch to them only pays for the refresh
+        if cfg.baedge["warmup"]["enable"]:
+            hlp.log_debug(__name__, 'start warm-up worker')
+            server.warmup = worker.WarmupWorker(server.epd, cfg.screens["active"])
+            server.warmup.start()
 
     # catch system signals and (attempt to) handle them gracefully
     # SIGKILL and SIGSTOP cannot be caught, blocked, or ignored
     # see https://docs.python.org/3/library/signal.html
     signal.signal(signal.SIGTERM, handle_signal)
     signal.signal(signal.SIGINT, handle_signal)
+    mark_startup("ready")
 
     # start Flask application
     hlp.log_info(__name__, 'start server at http://' + cfg.app["host"] + ":" + str(cfg.app["port"]))
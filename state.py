@@ -0,0 +1,69 @@
+""" persistent display state """
+
+import json
+import os
+
+import helpers as hlp
+
+
+def load(path):
+    """
+    Load the persisted display state
+
+    Parameters:
+        path (string): Path of the state file.
+
+    Returns:
+        dict: Dict containing the persisted state, or None if there is none or it cannot be read
+    """
+
+    try:
+        with open(path, encoding="utf-8") as file:
+            persisted = json.load(file)
+
+    except FileNotFoundError:
+        hlp.log_debug('state.load', 'no state file at `' + path + '`')
+        return None
+
+    # a corrupt state file is treated like a missing one, the panel is cleared and rewritten
+    except (OSError, ValueError) as e:
+        hlp.log_error('state.load', 'unable to read state file `' + path + '`: ' + str(e))
+        return None
+
+    return persisted if isinstance(persisted, dict) else None
+
+
+def save(path, persisted, sync=True):
+    """
+    Persist the display state
+
+    Parameters:
+        path (string):    Path of the state file.
+        persisted (dict): Dict containing the state to persist; must be JSON-serializable.
+        sync (bool):      Boolean indicating whether to flush the state to the storage device before returning.
+
+    Returns:
+        bool: Boolean True if the state was persisted successfully
+    """
+
+    temporary = path + ".tmp"
+
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        # write to a temporary file first, so that a crash mid-write cannot leave a truncated state file behind
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(persisted, file)
+
+            # syncing is slow on SD cards, state that is about to be replaced again can skip it
+            if sync:
+                file.flush()
+                os.fsync(file.fileno())
+
+        os.replace(temporary, path)
+
+    except OSError as e:
+        hlp.log_exception('state.save', e)
+        return False
+
+    return True
@@ -0,0 +1,29 @@
+""" shared pytest configuration for Baedge """
+
+import os
+import pathlib
+import sys
+
+import pytest
+
+# modules of the server are imported from the root of the repository, as when running `server.py`
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+# the simulated EPD is used without waiting for its modelled refreshes, and nothing is written outside the tests
+os.environ.setdefault("BAEDGE_SIMULATOR_TIME_SCALE", "0")
+os.environ.setdefault("BAEDGE_STATE", "false")
+
+
+@pytest.fixture(name="epd", scope="session")
+def fixture_epd():
+    """ initialize the simulated EPD """
+    # imported once the environment above is set, as configuration is read on import
+    # pylint: disable=import-outside-toplevel
+    import baedge
+
+    epd = baedge.initialize_screen()
+
+    assert epd is not None
+    assert baedge.simulated()
+
+    return epd
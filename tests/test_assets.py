@@ -0,0 +1,52 @@
+""" tests for the decoded image cache """
+
+import os
+
+from PIL import Image
+
+import assets
+
+
+def save_image(path, color, mtime_ns):
+    """ write a grayscale image file with a fixed modification time """
+    Image.new("L", (8, 8), color).save(path)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    return str(path)
+
+
+def test_images_are_cached_by_path_and_mode(tmp_path):
+    """ images are decoded once for each image mode """
+    path = save_image(tmp_path / "logo.png", 0, 1_000_000_000)
+    images = assets.AssetCache()
+
+    image = images.get(path, "1")
+
+    assert image.mode == "1"
+    assert images.get(path, "1") is image
+    assert images.get(path, "L").mode == "L"
+    assert len(images) == 2
+
+
+def test_changed_files_are_reloaded(tmp_path):
+    """ images are reloaded if their file changes, and the version of the file changes with it """
+    path = save_image(tmp_path / "logo.png", 0, 1_000_000_000)
+    images = assets.AssetCache()
+
+    version = images.version([path])
+    assert images.get(path, "L").getpixel((0, 0)) == 0
+
+    save_image(path, 255, 2_000_000_000)
+
+    assert images.version([path]) != version
+    assert images.get(path, "L").getpixel((0, 0)) == 255
+
+
+def test_preload_loads_each_image_once(tmp_path):
+    """ preloading loads every referenced image, once """
+    first = save_image(tmp_path / "first.png", 0, 1_000_000_000)
+    second = save_image(tmp_path / "second.png", 255, 1_000_000_000)
+    images = assets.AssetCache()
+
+    assert images.preload([first, second, first], "1") == 2
+    assert len(images) == 2
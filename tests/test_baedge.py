@@ -0,0 +1,15 @@
+""" tests for writing screens to the simulated EPD """
+
+import config as cfg
+import baedge
+
+SCREEN = cfg.screens["active"][0]
+
+
+def test_unchanged_frames_are_skipped_unless_full_refresh_is_requested(epd):
+    """ the panel is not refreshed for a displayed frame, unless forced or a full refresh is requested """
+    assert baedge.write_screen(epd, SCREEN, force=True)
+
+    assert baedge.write_screen(epd, SCREEN) == baedge.UNCHANGED
+    assert baedge.write_screen(epd, SCREEN, mode="full") is True
+    assert baedge.write_screen(epd, SCREEN, force=True) is True
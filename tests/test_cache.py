@@ -0,0 +1,73 @@
+""" tests for the packed display buffer cache """
+
+import cache
+
+
+def test_buffer_size_and_digest_cover_all_planes():
+    """ sizes and digests of multi-plane buffers include every plane """
+    assert cache.buffer_size(b"\x00" * 4) == 4
+    assert cache.buffer_size((b"\x00" * 4, b"\xff" * 2)) == 6
+
+    assert cache.buffer_digest((b"\x00", b"\xff")) == cache.buffer_digest(b"\x00\xff")
+    assert cache.buffer_digest(b"\x00\xff") != cache.buffer_digest(b"\xff\x00")
+
+
+def test_screen_key_depends_on_geometry_and_image_mode():
+    """ keys differ for the same screen on other panels or in other image modes """
+    key = cache.screen_key("digest", 128, 296, "1")
+
+    assert key == cache.screen_key("digest", 128, 296, "1")
+    assert key != cache.screen_key("other", 128, 296, "1")
+    assert key != cache.screen_key("digest", 176, 264, "1")
+    assert key != cache.screen_key("digest", 128, 296, "L/gray4")
+
+
+def test_evicts_least_recently_used_buffers():
+    """ the least recently used buffers are evicted to stay within the size bound """
+    buffers = cache.BufferCache(max_bytes=8)
+
+    buffers.put("a", b"\x00" * 4)
+    buffers.put("b", b"\x00" * 4)
+
+    # reading `a` makes `b` the least recently used buffer
+    assert buffers.get("a") is not None
+
+    buffers.put("c", b"\x00" * 4)
+
+    assert buffers.get("b") is None
+    assert buffers.get("a") is not None
+    assert buffers.get("c") is not None
+    assert buffers.size == 8
+
+
+def test_replacing_a_buffer_updates_the_size():
+    """ storing a buffer under an existing key replaces it """
+    buffers = cache.BufferCache(max_bytes=8)
+
+    buffers.put("a", b"\x00" * 4)
+    buffers.put("a", (b"\x00" * 2, b"\xff" * 2))
+
+    assert len(buffers) == 1
+    assert buffers.size == 4
+    assert buffers.get("a") == (b"\x00" * 2, b"\xff" * 2)
+
+
+def test_skips_buffers_larger_than_the_cache():
+    """ buffers larger than the cache are not stored, and do not evict others """
+    buffers = cache.BufferCache(max_bytes=8)
+    buffers.put("a", b"\x00" * 4)
+
+    assert not buffers.put("b", b"\x00" * 9)
+    assert buffers.get("a") is not None
+    assert buffers.get("b") is None
+
+
+def test_clear():
+    """ clearing the cache removes all buffers """
+    buffers = cache.BufferCache(max_bytes=8)
+    buffers.put("a", b"\x00" * 4)
+
+    buffers.clear()
+
+    assert len(buffers) == 0
+    assert buffers.size == 0
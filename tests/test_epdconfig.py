@@ -0,0 +1,107 @@
+""" tests for the hardware implementations of the Waveshare library """
+
+import time
+
+import pytest
+
+from lib.waveshare_epd import epdconfig
+
+BUSY_PIN = 24
+
+
+class BusyPanel(epdconfig.BusyPolling):
+    """ panel whose BUSY line never reaches its idle level """
+
+    # pylint: disable=unused-argument
+    def digital_read(self, pin):
+        """ read the BUSY line as busy """
+        return 1
+
+    def delay_ms(self, delaytime):
+        """ sleep between polls """
+        time.sleep(delaytime / 1000.0)
+
+
+def test_cancellation_lasts_until_reset():
+    """ a cancellation releases all later waits, until it is re-armed """
+    panel = BusyPanel()
+    panel.cancel_wait()
+
+    for _ in range(2):
+        start = time.monotonic()
+        assert not panel.wait_busy(BUSY_PIN, 0, timeout=5)
+        assert time.monotonic() - start < 1
+
+    panel.reset_cancel()
+
+    start = time.monotonic()
+    assert not panel.wait_busy(BUSY_PIN, 0, timeout=0.1)
+    assert time.monotonic() - start >= 0.1
+
+
+def test_detect_selects_the_gpio_backend(monkeypatch):
+    """ Raspberry Pis are driven through the configured GPIO backend """
+    monkeypatch.setattr(epdconfig, "is_raspberry_pi", lambda: True)
+    monkeypatch.setattr(epdconfig, "RaspberryPi", lambda: "gpiozero")
+    monkeypatch.setattr(epdconfig, "RaspberryPiLgpio", lambda: "lgpio")
+
+    assert epdconfig.detect() == "gpiozero"
+    assert epdconfig.detect("gpiozero") == "gpiozero"
+    assert epdconfig.detect("lgpio") == "lgpio"
+
+
+# pylint: disable=too-few-public-methods
+class FakeSpiDev:
+    """ spidev device that records transfers, and rejects transfers larger than its `bufsiz` as spidev does """
+
+    def __init__(self, bufsiz):
+        self.bufsiz = bufsiz
+        self.transfers = []
+
+    def writebytes2(self, data):
+        """ record a transfer """
+        if len(data) > self.bufsiz:
+            raise OSError("Message too long")
+
+        self.transfers.append(bytes(data))
+
+
+class FakeSpiTransport(epdconfig.SpiTransport):
+    """ spidev-based implementation, writing to a fake spidev device """
+
+    def __init__(self, bufsiz_path, bufsiz):
+        self.SPI_BUFSIZ_PATH = str(bufsiz_path)  # pylint: disable=invalid-name
+        self.SPI = FakeSpiDev(bufsiz)  # pylint: disable=invalid-name
+
+    def _spi_write(self, data):
+        self.SPI.writebytes2(data)
+
+
+@pytest.mark.parametrize("length", [0, 1, 15, 16, 17, 32, 53])
+@pytest.mark.parametrize("kind", [bytes, bytearray, list])
+def test_transfers_are_split_at_bufsiz(tmp_path, length, kind):
+    """ transfers are split into chunks of `bufsiz`, which reassemble to the payload """
+    bufsiz = 16
+    (tmp_path / "bufsiz").write_text(f"{bufsiz}\n", encoding="utf-8")
+
+    transport = FakeSpiTransport(tmp_path / "bufsiz", bufsiz)
+    payload = bytes(index % 251 for index in range(length))
+
+    transport.spi_writebyte2(kind(payload))
+
+    transfers = transport.SPI.transfers
+    full_chunks, remainder = divmod(length, bufsiz)
+
+    assert transport.spi_chunk_size() == bufsiz
+    assert b"".join(transfers) == payload
+    assert [len(transfer) for transfer in transfers] == [bufsiz] * full_chunks + ([remainder] if remainder else [])
+    assert transport.spi_stats()["bytes"] == length
+
+
+def test_bufsiz_defaults_if_unavailable(tmp_path):
+    """ the default `bufsiz` of spidev is used if the module parameter cannot be read """
+    transport = FakeSpiTransport(tmp_path / "missing", epdconfig.SpiTransport.SPI_BUFSIZ_DEFAULT)
+
+    transport.spi_writebyte2(bytes(epdconfig.SpiTransport.SPI_BUFSIZ_DEFAULT + 1))
+
+    assert [len(transfer) for transfer in transport.SPI.transfers] == [epdconfig.SpiTransport.SPI_BUFSIZ_DEFAULT, 1]
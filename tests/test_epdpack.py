@@ -0,0 +1,196 @@
+""" tests for frame buffer packing """
+
+import random
+
+import pytest
+from PIL import Image
+
+from lib.waveshare_epd import epdpack
+
+WIDTH = 16
+HEIGHT = 24
+
+
+def random_image(mode, size, values, seed=0):
+    """ create an image of randomly chosen pixel values """
+    generator = random.Random(seed)
+    image = Image.new(mode, size)
+    image.putdata([generator.choice(values) for _ in range(size[0] * size[1])])
+
+    return image
+
+
+def reference_buffer(image, width, height):
+    """ pack an image with the per-pixel loop of the Waveshare drivers' `getbuffer`, replaced by `epdpack.pack_image` """
+    buf = [0xFF] * (int(width / 8) * height)
+    image_monocolor = image.convert('1')
+    imwidth, imheight = image_monocolor.size
+    pixels = image_monocolor.load()
+
+    if imwidth == width and imheight == height:
+        for y in range(imheight):
+            for x in range(imwidth):
+                if pixels[x, y] == 0:
+                    buf[int((x + y * width) / 8)] &= ~(0x80 >> (x % 8))
+
+    elif imwidth == height and imheight == width:
+        for y in range(imheight):
+            for x in range(imwidth):
+                newx = y
+                newy = height - x - 1
+                if pixels[x, y] == 0:
+                    buf[int((newx + newy * width) / 8)] &= ~(0x80 >> (y % 8))
+
+    return bytes(buf)
+
+
+@pytest.mark.parametrize("size", [(WIDTH, HEIGHT), (HEIGHT, WIDTH)], ids=["vertical", "horizontal"])
+def test_pack_image_matches_reference(size):
+    """ packed buffers match the per-pixel loop in both orientations """
+    image = random_image("1", size, (0, 255))
+
+    assert epdpack.pack_image(image, WIDTH, HEIGHT) == reference_buffer(image, WIDTH, HEIGHT)
+
+
+def test_pack_image_pads_rows_with_white():
+    """ rows are padded to whole bytes with white pixels """
+    image = Image.new("1", (12, HEIGHT), 0)
+    buffer = epdpack.pack_image(image, 12, HEIGHT)
+
+    assert len(buffer) == 2 * HEIGHT
+    assert buffer[:2] == bytes([0x00, 0x0F])
+
+
+def test_pack_image_returns_white_frame_for_wrong_dimensions():
+    """ images that do not match the panel are packed into a white frame """
+    image = Image.new("1", (WIDTH + 8, HEIGHT), 0)
+
+    assert epdpack.pack_image(image, WIDTH, HEIGHT) == bytes([0xFF]) * (WIDTH // 8 * HEIGHT)
+
+
+def reference_buffers_red(image, width, height):
+    """ split an RGB image into black and red images pixel by pixel, and pack each with the per-pixel loop """
+    black = Image.new("1", image.size, 1)
+    red = Image.new("1", image.size, 1)
+
+    for y in range(image.size[1]):
+        for x in range(image.size[0]):
+            r, g, b = image.getpixel((x, y))
+
+            if max(g, b) < 0x80 <= r:
+                red.putpixel((x, y), 0)
+
+            elif r * 299 + g * 587 + b * 114 < 0x80 * 1000:
+                black.putpixel((x, y), 0)
+
+    return reference_buffer(black, width, height), reference_buffer(red, width, height)
+
+
+@pytest.mark.parametrize("size", [(WIDTH, HEIGHT), (HEIGHT, WIDTH)], ids=["vertical", "horizontal"])
+def test_pack_image_red_matches_reference(size):
+    """ black and red planes match the per-pixel loop in both orientations """
+    colors = ((0, 0, 0), (255, 255, 255), (255, 0, 0), (200, 40, 40), (64, 64, 64), (0, 0, 255), (255, 255, 0))
+    image = random_image("RGB", size, colors)
+    black, red = reference_buffers_red(image, WIDTH, HEIGHT)
+
+    assert epdpack.pack_image_red(image, WIDTH, HEIGHT) == (black, red)
+    assert epdpack.pack_image_red(image, WIDTH, HEIGHT, red_inverted=True) == (black, epdpack.invert(red))
+
+
+def test_pack_image_red_shares_empty_planes():
+    """ planes without inked pixels are the shared constant frames, in the polarity of the panel """
+    image = Image.new("RGB", (WIDTH, HEIGHT), (255, 255, 255))
+    size = WIDTH // 8 * HEIGHT
+
+    black, red = epdpack.pack_image_red(image, WIDTH, HEIGHT)
+    assert black is epdpack.solid(0xFF, size)
+    assert red is epdpack.solid(0xFF, size)
+
+    _, red = epdpack.pack_image_red(image, WIDTH, HEIGHT, red_inverted=True)
+    assert red is epdpack.solid(0x00, size)
+
+
+def test_invert():
+    """ all bits of a buffer are inverted """
+    assert epdpack.invert(bytes([0x00, 0x0F, 0xFF])) == bytes([0xFF, 0xF0, 0x00])
+
+
+def reference_buffer_4gray(image, width, height):
+    """ pack an image with the per-pixel loop of the Waveshare drivers' `getbuffer_4Gray` """
+    buf = [0xFF] * (int(width / 4) * height)
+    image_monocolor = image.convert('L')
+    imwidth, imheight = image_monocolor.size
+    pixels = image_monocolor.load()
+    i = 0
+
+    if imwidth == width and imheight == height:
+        for y in range(imheight):
+            for x in range(imwidth):
+                if pixels[x, y] == 0xC0:
+                    pixels[x, y] = 0x80
+                elif pixels[x, y] == 0x80:
+                    pixels[x, y] = 0x40
+                i = i + 1
+                if i % 4 == 0:
+                    buf[int((x + (y * width)) / 4)] = (
+                        (pixels[x - 3, y] & 0xc0) | (pixels[x - 2, y] & 0xc0) >> 2
+                        | (pixels[x - 1, y] & 0xc0) >> 4 | (pixels[x, y] & 0xc0) >> 6
+                    )
+
+    elif imwidth == height and imheight == width:
+        for x in range(imwidth):
+            for y in range(imheight):
+                newx = y
+                newy = height - x - 1
+                if pixels[x, y] == 0xC0:
+                    pixels[x, y] = 0x80
+                elif pixels[x, y] == 0x80:
+                    pixels[x, y] = 0x40
+                i = i + 1
+                if i % 4 == 0:
+                    buf[int((newx + (newy * width)) / 4)] = (
+                        (pixels[x, y - 3] & 0xc0) | (pixels[x, y - 2] & 0xc0) >> 2
+                        | (pixels[x, y - 1] & 0xc0) >> 4 | (pixels[x, y] & 0xc0) >> 6
+                    )
+
+    return buf
+
+
+def reference_planes_4gray(buf):
+    """ split a `getbuffer_4Gray` buffer into the RAM `0x24` and `0x26` planes, as the drivers' `display_4Gray` """
+    # bit written for each 2-bit value, `0b11` is white and `0b00` black
+    mappings = ({0b11: 0, 0b10: 1, 0b01: 0, 0b00: 1}, {0b11: 0, 0b10: 0, 0b01: 1, 0b00: 1})
+    planes = []
+
+    for mapping in mappings:
+        plane = bytearray()
+
+        for i in range(len(buf) // 2):
+            byte = 0
+
+            for value in (buf[i * 2], buf[i * 2 + 1]):
+                for shift in (6, 4, 2, 0):
+                    byte = (byte << 1) | mapping[(value >> shift) & 0b11]
+
+            plane.append(byte)
+
+        planes.append(bytes(plane))
+
+    return tuple(planes)
+
+
+@pytest.mark.parametrize("size", [(WIDTH, HEIGHT), (HEIGHT, WIDTH)], ids=["vertical", "horizontal"])
+def test_pack_image_4gray_matches_reference(size):
+    """ grayscale planes match the per-pixel loops for the 4 gray levels of the drivers """
+    image = random_image("L", size, (0x00, 0x80, 0xC0, 0xFF))
+    expected = reference_planes_4gray(reference_buffer_4gray(image, WIDTH, HEIGHT))
+
+    assert epdpack.pack_image_4gray(image, WIDTH, HEIGHT, inverted=True) == expected
+
+
+def test_quantize_4gray_maps_to_nearest_level():
+    """ gray values are mapped to the nearest of the 4 levels """
+    image = Image.new("L", (4, 2))
+    image.putdata([0x00, 0x3F, 0x40, 0x9F, 0xA0, 0xDF, 0xE0, 0xFF])
+
+    assert epdpack.quantize_4gray(image, 4, 2).tolist() == [[0, 0, 1, 1], [2, 2, 3, 3]]
@@ -0,0 +1,56 @@
+""" tests for the capability registry of the EPD drivers """
+
+import pytest
+
+import config as cfg
+import baedge
+import refresh
+
+from lib.waveshare_epd import epdregistry
+
+
+def test_drivers_declare_all_capabilities():
+    """ every indexed driver declares all capability fields """
+    drivers = epdregistry.drivers()
+
+    assert baedge.driver_name in drivers
+    assert "epd2in9_V2" in drivers
+
+    for name, capabilities in drivers.items():
+        assert set(epdregistry.FIELDS) <= set(capabilities), name
+        assert capabilities["planes"] in (1, 2), name
+        assert "full" in capabilities["refresh_ms"], name
+
+
+def test_unknown_drivers_are_not_loaded():
+    """ only drivers in the registry can be loaded """
+    assert epdregistry.capabilities("epd0in0") is None
+
+    with pytest.raises(ValueError):
+        epdregistry.load("epd0in0")
+
+
+def test_loaded_drivers_match_their_declared_resolution():
+    """ the declared resolution is the resolution of the driver """
+    epd = epdregistry.load("epd2in9_V2").EPD()
+
+    assert epdregistry.capabilities("epd2in9_V2")["resolution"] == (epd.width, epd.height)
+
+
+@pytest.mark.parametrize("image_mode, fast, partial, expected", [
+    ("1", True, False, "fast"),
+    ("1", False, False, "full"),
+    ("1", False, True, "partial"),
+    ("1", True, True, "partial"),
+    ("L", True, True, "gray4"),
+])
+def test_display_mode_is_the_fastest_enabled_mode(monkeypatch, image_mode, fast, partial, expected):
+    """ contents are written with the fastest enabled refresh mode the driver declares """
+    epd = epdregistry.load("epd2in9_V2").EPD()
+
+    monkeypatch.setitem(cfg.baedge, "image_mode", image_mode)
+    monkeypatch.setitem(cfg.baedge, "fast", {**cfg.baedge["fast"], "enable": fast})
+    monkeypatch.setitem(cfg.baedge, "partial", {**cfg.baedge["partial"], "enable": partial})
+
+    assert baedge.display_mode(epd) == expected
+    assert expected in refresh.supported(baedge.capabilities(epd))
@@ -0,0 +1,61 @@
+""" tests for fitting text to the screen """
+
+import pathlib
+
+import pytest
+
+import fonts
+import layout
+
+FACE = str(pathlib.Path(__file__).parent.parent / "media" / "fonts" / "RobotoMono" / "regular.ttf")
+
+
+@pytest.fixture(name="fitter")
+def fixture_fitter():
+    """ create a text fitter with its own font registry """
+    return layout.TextFitter(fonts.FontRegistry(max_fonts=64))
+
+
+def linear_fit(fitter, content, face, size, box):
+    """ find the font size by decrementing it one point at a time, as before bisection """
+    while size > layout.MIN_FONT_SIZE and not fitter.fits(content, face, size, box):
+        size -= 1
+
+    return size
+
+
+@pytest.mark.parametrize("content", ["Baedge", "Allocation ID: 8c2e\nAddress: 10.0.0.1\nVersion: 1.0", "x"])
+@pytest.mark.parametrize("box", [(296, 128), (200, 40), (60, 20), (5, 5)])
+@pytest.mark.parametrize("size", [15, 24, 40])
+def test_fit_matches_linear_search(fitter, content, box, size):
+    """ bisection finds the same font size as the linear search """
+    assert fitter.fit(content, FACE, size, box) == linear_fit(fitter, content, FACE, size, box)
+
+
+def test_fit_returns_largest_size_that_fits(fitter):
+    """ the fitted size fits the box, and the next larger size does not """
+    content, box = "Orchestration at the Edge", (200, 40)
+    size = fitter.fit(content, FACE, 40, box)
+
+    assert layout.MIN_FONT_SIZE < size < 40
+    assert fitter.fits(content, FACE, size, box)
+    assert not fitter.fits(content, FACE, size + 1, box)
+
+
+def test_fit_keeps_size_if_text_fits(fitter):
+    """ text that fits at its preferred size is not shrunk, nor enlarged """
+    assert fitter.fit("Baedge", FACE, 15, (296, 128)) == 15
+
+
+def test_fit_results_are_memoized(fitter):
+    """ fitted sizes are memoized, until cleared """
+    fitter.fit("Baedge", FACE, 40, (60, 20))
+    fonts_loaded = len(fitter.registry)
+
+    fitter.registry.clear()
+    fitter.fit("Baedge", FACE, 40, (60, 20))
+    assert len(fitter.registry) == 0
+
+    fitter.clear()
+    fitter.fit("Baedge", FACE, 40, (60, 20))
+    assert len(fitter.registry) == fonts_loaded
@@ -0,0 +1,103 @@
+""" tests for the partial-refresh engine """
+
+import partial
+
+ROWS = 8
+ROW_BYTES = 2
+
+
+class RecordingEPD:
+    """ EPD that records the calls of the partial-refresh engine """
+
+    height = ROWS
+
+    def __init__(self):
+        self.calls = []
+
+    def init(self):
+        """ record loading the full waveform """
+        self.calls.append(("init",))
+
+    def display_Base(self, buffer):  # pylint: disable=invalid-name
+        """ record a full refresh """
+        self.calls.append(("full", buffer))
+
+    def display_Partial_Rows(self, buffer, first, last):  # pylint: disable=invalid-name
+        """ record a partial refresh """
+        self.calls.append(("partial", buffer, first, last))
+
+
+def frame(changed=()):
+    """ create a white frame, with black bytes in the given rows """
+    buffer = bytearray(b"\xff" * (ROWS * ROW_BYTES))
+
+    for row in changed:
+        buffer[row * ROW_BYTES] = 0x00
+
+    return bytes(buffer)
+
+
+def test_changed_rows():
+    """ the window spans the first to the last changed row """
+    assert partial.changed_rows(frame(), frame(), ROWS) is None
+    assert partial.changed_rows(frame(), frame([3]), ROWS) == (3, 3)
+    assert partial.changed_rows(frame([1]), frame([6]), ROWS) == (1, 6)
+    assert partial.changed_rows(frame(), frame([0, ROWS - 1]), ROWS) == (0, ROWS - 1)
+
+
+def test_first_refresh_is_full():
+    """ without a known baseline, the frame is written with a full refresh """
+    epd = RecordingEPD()
+    engine = partial.PartialRefresh(full_refresh_every=3)
+
+    assert engine.display(epd, frame([2])) == "full"
+    assert epd.calls == [("full", frame([2]))]
+
+
+def test_only_changed_rows_are_refreshed():
+    """ refreshes after a full refresh only write the changed rows """
+    epd = RecordingEPD()
+    engine = partial.PartialRefresh(full_refresh_every=3)
+
+    engine.display(epd, frame())
+
+    assert engine.display(epd, frame([2, 4])) == "partial"
+    assert epd.calls[-1] == ("partial", frame([2, 4]), 2, 4)
+
+
+def test_identical_frames_fall_back_to_full_refresh():
+    """ frames without changed rows are written with a full refresh """
+    epd = RecordingEPD()
+    engine = partial.PartialRefresh(full_refresh_every=3)
+
+    engine.display(epd, frame([1]))
+
+    assert engine.display(epd, frame([1])) == "full"
+
+
+def test_full_refresh_is_forced_periodically():
+    """ every `full_refresh_every` partial refreshes, the full waveform is restored for a full refresh """
+    epd = RecordingEPD()
+    engine = partial.PartialRefresh(full_refresh_every=2)
+
+    engine.display(epd, frame())
+
+    assert engine.display(epd, frame([1])) == "partial"
+    assert engine.display(epd, frame([2])) == "partial"
+    assert engine.display(epd, frame([3])) == "full"
+
+    assert epd.calls[-2:] == [("init",), ("full", frame([3]))]
+    assert engine.count == 0
+
+
+def test_reset_forgets_the_baseline():
+    """ resetting reports whether the partial waveform is loaded, and forces the next refresh to be full """
+    epd = RecordingEPD()
+    engine = partial.PartialRefresh(full_refresh_every=3)
+
+    engine.display(epd, frame())
+    engine.display(epd, frame([1]))
+
+    assert engine.reset()
+    assert not engine.reset()
+    assert engine.display(epd, frame([2])) == "full"
@@ -0,0 +1,26 @@
+""" tests for the QR code cache """
+
+import qrcodes
+
+OPTIONS = qrcodes.QRCodeOptions(version=1, box_size=3)
+
+
+def test_codes_are_generated_once_per_content_and_options():
+    """ QR codes are cached by content and options """
+    codes = qrcodes.QRCodeCache()
+    image = codes.get("https://example.com", OPTIONS)
+
+    assert codes.get("https://example.com", OPTIONS) is image
+    assert codes.get("https://example.com", OPTIONS._replace(box_size=2)) is not image
+    assert codes.get("https://example.org", OPTIONS) is not image
+    assert len(codes) == 3
+
+
+def test_images_are_scaled_by_box_size():
+    """ each module of the QR code is `box_size` pixels wide, including the border """
+    codes = qrcodes.QRCodeCache()
+    image = codes.get("baedge", OPTIONS._replace(fit=False))
+
+    # version 1 QR codes have 21 modules, and a border of 4 modules on each side
+    assert image.mode == "1"
+    assert image.size == ((21 + 2 * 4) * 3, (21 + 2 * 4) * 3)
@@ -0,0 +1,108 @@
+""" tests for refresh modes and waveforms """
+
+import pytest
+
+import refresh
+
+
+class RecordingEPD:
+    """ EPD that records which waveform is loaded """
+
+    def __init__(self):
+        self.calls = []
+
+    def init(self):
+        """ record loading the full waveform """
+        self.calls.append("full")
+
+    def init_Fast(self):  # pylint: disable=invalid-name
+        """ record loading the fast waveform """
+        self.calls.append("fast")
+
+    def Init_4Gray(self):  # pylint: disable=invalid-name
+        """ record loading the 4-level grayscale waveform """
+        self.calls.append("gray4")
+
+
+def capabilities(fast_init=False, partial=False, gray_levels=2):
+    """ create the capabilities of an EPD model """
+    return {"fast_init": fast_init, "partial": partial, "gray_levels": gray_levels}
+
+
+def test_supported_modes():
+    """ the full refresh mode is always supported, others only if the driver declares them """
+    assert refresh.supported(capabilities()) == ["full"]
+    assert refresh.supported(capabilities(fast_init=True)) == ["full", "fast"]
+    assert refresh.supported(capabilities(fast_init=True, partial=True, gray_levels=4)) == list(refresh.MODES)
+
+
+@pytest.mark.parametrize("mode, waveform", [("full", "full"), ("fast", "fast"), ("partial", "full"), ("gray4", "gray4")])
+def test_each_mode_loads_its_waveform_once(mode, waveform):
+    """ the waveform of a refresh mode is loaded once, until it is forgotten """
+    epd = RecordingEPD()
+    waveforms = refresh.Waveform(full_refresh_every=3)
+
+    assert waveforms.load(epd, mode)
+    assert not waveforms.load(epd, mode)
+
+    waveforms.forget()
+
+    assert waveforms.load(epd, mode)
+    assert epd.calls == [waveform, waveform]
+
+
+def test_switching_modes_reloads_the_waveform():
+    """ the EPD is re-initialized when a refresh needs another waveform """
+    epd = RecordingEPD()
+    waveforms = refresh.Waveform(full_refresh_every=3)
+
+    for mode in ("fast", "fast", "full", "partial", "gray4", "fast"):
+        waveforms.load(epd, mode)
+
+    assert epd.calls == ["fast", "full", "gray4", "fast"]
+
+
+def test_full_refresh_every_n_fast_refreshes():
+    """ after `full_refresh_every` consecutive fast refreshes, the next fast refresh is a full refresh """
+    waveforms = refresh.Waveform(full_refresh_every=3)
+    used = []
+
+    for _ in range(8):
+        mode = waveforms.resolve("fast")
+        waveforms.record(mode)
+        used.append(mode)
+
+    assert used == ["fast", "fast", "fast", "full", "fast", "fast", "fast", "full"]
+
+
+def test_partial_refreshes_do_not_reset_the_fast_count():
+    """ partial refreshes leave the ghosting of fast refreshes, other full refreshes clear it """
+    waveforms = refresh.Waveform(full_refresh_every=2)
+
+    waveforms.record("fast")
+    waveforms.record("partial")
+    waveforms.record("fast")
+    assert waveforms.resolve("fast") == "full"
+
+    waveforms.record("gray4")
+    assert waveforms.resolve("fast") == "fast"
+
+    # only fast refreshes are replaced
+    waveforms.record("fast")
+    waveforms.record("fast")
+    assert waveforms.resolve("partial") == "partial"
+
+
+def test_latency_stats():
+    """ refresh durations are summarized by mode """
+    latency = refresh.Latency()
+
+    for duration in (100.0, 300.0, 200.0):
+        latency.record("full", duration)
+
+    latency.record("fast", 50.0)
+
+    assert latency.stats() == {
+        "full": {"count": 3, "last_ms": 200.0, "mean_ms": 200.0, "min_ms": 100.0, "max_ms": 300.0},
+        "fast": {"count": 1, "last_ms": 50.0, "mean_ms": 50.0, "min_ms": 50.0, "max_ms": 50.0},
+    }
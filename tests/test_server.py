@@ -0,0 +1,132 @@
+""" tests for the HTTP API, without a display worker unless one is started by a test """
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import config as cfg
+import baedge
+import helpers as hlp
+import server
+
+from lib.waveshare_epd import epdregistry
+
+SCREEN = cfg.screens["active"][0]
+
+
+@pytest.fixture(name="client")
+def fixture_client():
+    """ create a test client for the server """
+    return server.server.test_client()
+
+
+@pytest.mark.parametrize("mode", [None, "full", "unknown"])
+@pytest.mark.parametrize("display_worker", [None, object()], ids=["no-worker", "worker"])
+def test_write_without_screen_is_unavailable(client, monkeypatch, mode, display_worker):
+    """ writes are rejected with 503 if the screen could not be initialized """
+    monkeypatch.setattr(server.server, "epd", None)
+    monkeypatch.setattr(server.server, "worker", display_worker)
+
+    data = {"screen": SCREEN, **({"mode": mode} if mode else {})}
+    response = client.post(cfg.routes["device_write"], data=data)
+
+    assert response.status_code == 503
+
+
+def test_screen_status_describes_the_driver(client, monkeypatch, epd):
+    """ the screen status describes the driver, its refresh modes, and its capabilities """
+    monkeypatch.setattr(server.server, "epd", epd)
+
+    response = client.get(cfg.routes["status_screen"])
+    status = response.get_json()
+
+    assert response.status_code == 200
+    assert {"screen", "warmup", "spi", "driver", "refresh", "startup"} <= set(status)
+
+    driver = status["driver"]
+
+    assert driver["name"] == baedge.driver_name
+    assert driver["mode"] in driver["modes"]
+    assert "full" in driver["modes"]
+    assert set(epdregistry.FIELDS) <= set(driver["capabilities"])
+
+
+def test_screen_status_without_screen(client, monkeypatch):
+    """ the screen status is available if the screen could not be initialized """
+    monkeypatch.setattr(server.server, "epd", None)
+
+    response = client.get(cfg.routes["status_screen"])
+
+    assert response.status_code == 200
+    assert response.get_json()["driver"] == {
+        "name": baedge.driver_name,
+        "mode": None,
+        "modes": None,
+        "capabilities": None,
+    }
+
+
+@pytest.fixture(name="startup")
+def fixture_startup(monkeypatch):
+    """ record startup stages from scratch """
+    startup = {}
+    monkeypatch.setattr(server.server, "startup", startup)
+    return startup
+
+
+def test_startup_stages_are_recorded_once(startup):
+    """ each startup stage is recorded once, in milliseconds since the process started """
+    assert server.mark_startup("imported")
+    assert server.mark_startup("initialized")
+
+    recorded = dict(startup)
+
+    assert not server.mark_startup("imported")
+    assert startup == recorded
+    assert list(startup) == ["imported", "initialized"]
+    assert 0 <= startup["imported"] <= startup["initialized"]
+
+
+def test_first_status_is_recorded(client, startup):
+    """ the first status request records the time the server took to become available """
+    assert client.get(cfg.routes["status"]).status_code == 200
+
+    first_status = startup["first_status"]
+
+    assert client.get(cfg.routes["status"]).status_code == 200
+    assert startup == {"first_status": first_status}
+    assert first_status >= 0
+
+
+def test_screen_status_reports_startup(client, startup):
+    """ the screen status reports the startup stages """
+    server.mark_startup("ready")
+
+    assert client.get(cfg.routes["status_screen"]).get_json()["startup"] == startup
+
+
+def test_process_started_at():
+    """ the process started before the server module was imported, and not long before the tests """
+    assert time.time() - 3600 < server.STARTED_AT <= time.time()
+    assert hlp.process_started_at() == pytest.approx(server.STARTED_AT, abs=1)
+
+
+def test_import_defers_hardware_and_rendering():
+    """ importing the server neither detects the hardware nor loads drivers, hardware libraries, or renderers """
+    deferred = ["PIL", "qrcode", "spidev", "gpiozero", "lgpio", "subprocess", "lib.waveshare_epd." + baedge.driver_name]
+    code = (
+        "import sys, server\n"
+        "from lib.waveshare_epd import epdconfig\n"
+        f"print([name for name in {deferred!r} if name in sys.modules])\n"
+        "print('implementation' in vars(epdconfig))\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.splitlines()[-2:] == ["[]", "False"]
@@ -0,0 +1,113 @@
+""" tests for the persisted display state """
+
+import os
+
+import pytest
+
+import config as cfg
+import baedge
+import cache
+import state
+
+SCREEN = cfg.screens["active"][0]
+
+
+@pytest.fixture(name="persisted")
+def fixture_persisted(epd, monkeypatch, tmp_path):
+    """ persist the display state to a temporary file, as on real hardware """
+    path = str(tmp_path / "state.json")
+
+    monkeypatch.setitem(cfg.baedge, "state", {"enable": True, "file": path})
+
+    # the state of the simulated EPD is never persisted, the simulated EPD stays attached
+    monkeypatch.setattr(baedge, "simulated", lambda: False)
+
+    return epd, path
+
+
+def record_clears(epd, monkeypatch):
+    """ record calls of the `Clear` method of the EPD driver """
+    clears = []
+
+    def clear(driver):
+        clears.append(driver)
+
+    monkeypatch.setattr(type(epd), "Clear", clear)
+
+    return clears
+
+
+def test_load_missing_and_corrupt_files(tmp_path):
+    """ missing and unreadable state files are treated as no state """
+    path = tmp_path / "state.json"
+
+    assert state.load(str(path)) is None
+
+    path.write_text("{", encoding="utf-8")
+    assert state.load(str(path)) is None
+
+    path.write_text("[]", encoding="utf-8")
+    assert state.load(str(path)) is None
+
+
+def test_save_and_load(tmp_path):
+    """ saved state is loaded back, and no temporary file is left behind """
+    path = str(tmp_path / "nested" / "state.json")
+
+    assert state.save(path, {"digest": "digest", "screen": SCREEN})
+    assert state.load(path) == {"digest": "digest", "screen": SCREEN}
+    assert os.listdir(os.path.dirname(path)) == ["state.json"]
+
+
+def test_restore_skips_clear_if_screen_is_displayed(persisted, monkeypatch):
+    """ the panel is not cleared if it still displays the initial screen """
+    epd, path = persisted
+    digest = cache.buffer_digest(baedge.prepare_screen(epd, SCREEN))
+    state.save(path, {"driver": baedge.driver_name, "digest": digest, "screen": SCREEN})
+
+    clears = record_clears(epd, monkeypatch)
+    baedge.initialize_screen(SCREEN)
+
+    assert not clears
+    assert baedge.on_glass == {"digest": digest, "screen": SCREEN}
+
+
+def test_restore_skips_clear_if_panel_is_cleared(persisted, monkeypatch):
+    """ the panel is not cleared again if it was left cleared """
+    _, path = persisted
+    state.save(path, {"driver": baedge.driver_name, "digest": baedge.CLEARED, "screen": None})
+
+    clears = record_clears(baedge.load_library().EPD(), monkeypatch)
+    baedge.initialize_screen(SCREEN)
+
+    assert not clears
+    assert baedge.on_glass == {"digest": baedge.CLEARED, "screen": None}
+
+
+@pytest.mark.parametrize("persisted_state", [
+    {"driver": baedge.driver_name, "digest": "outdated", "screen": SCREEN},
+    {"driver": "epd0in0", "digest": baedge.CLEARED, "screen": None},
+    {"driver": baedge.driver_name, "digest": None, "screen": None},
+], ids=["outdated", "other-driver", "unknown"])
+def test_restore_clears_otherwise(persisted, monkeypatch, persisted_state):
+    """ the panel is cleared if its persisted state does not match what is needed at startup """
+    epd, path = persisted
+    state.save(path, persisted_state)
+
+    clears = record_clears(epd, monkeypatch)
+    baedge.initialize_screen(SCREEN)
+
+    assert len(clears) == 1
+    assert state.load(path)["digest"] == baedge.CLEARED
+
+
+def test_write_syncs_state_once(persisted, monkeypatch):
+    """ writing a screen flushes the state file once, after the refresh """
+    epd, path = persisted
+    syncs = []
+    monkeypatch.setattr(os, "fsync", syncs.append)
+
+    assert baedge.write_screen(epd, SCREEN, force=True)
+
+    assert len(syncs) == 1
+    assert state.load(path)["screen"] == SCREEN
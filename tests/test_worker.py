@@ -0,0 +1,94 @@
+""" tests for the display worker, against the simulated EPD """
+
+import time
+
+import config as cfg
+import baedge
+import worker
+
+SCREENS = cfg.screens["active"][:3]
+
+
+def wait_for(display_worker, job_id, timeout=30):
+    """ wait until a job has reached a terminal status """
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        job = display_worker.job(job_id)
+
+        if job["status"] in (worker.DONE, worker.COALESCED, worker.FAILED):
+            return job
+
+        time.sleep(0.01)
+
+    raise TimeoutError(f"job `{job_id}` did not finish")
+
+
+def test_pending_jobs_are_coalesced(epd):
+    """ only the most recently submitted screen is drawn, earlier pending jobs are coalesced """
+    display_worker = worker.DisplayWorker(epd)
+
+    # jobs are submitted before the worker starts, so all but the last one are still pending when coalesced
+    jobs = [display_worker.submit(screen_name, force=True) for screen_name in SCREENS]
+
+    for job, successor in zip(jobs, jobs[1:]):
+        coalesced = display_worker.job(job["id"])
+
+        assert coalesced["status"] == worker.COALESCED
+        assert coalesced["coalesced_by"] == successor["id"]
+        assert coalesced["result"] is None
+
+    display_worker.start()
+
+    try:
+        last = wait_for(display_worker, jobs[-1]["id"])
+
+    finally:
+        assert display_worker.stop(timeout=30)
+
+    assert last["status"] == worker.DONE
+    assert last["result"] == "written"
+    assert baedge.on_glass["screen"] == SCREENS[-1]
+
+
+def test_unchanged_frames_are_not_refreshed(epd):
+    """ a screen that is already displayed is not written again, unless forced """
+    display_worker = worker.DisplayWorker(epd)
+    display_worker.start()
+
+    try:
+        first = wait_for(display_worker, display_worker.submit(SCREENS[0])["id"])
+        second = wait_for(display_worker, display_worker.submit(SCREENS[0])["id"])
+        forced = wait_for(display_worker, display_worker.submit(SCREENS[0], force=True)["id"])
+
+    finally:
+        assert display_worker.stop(timeout=30)
+
+    assert first["result"] in ("written", baedge.UNCHANGED)
+    assert second["result"] == baedge.UNCHANGED
+    assert forced["result"] == "written"
+
+
+def test_unsupported_modes_fail(epd):
+    """ jobs requesting a refresh mode the EPD model does not support fail """
+    display_worker = worker.DisplayWorker(epd)
+    display_worker.start()
+
+    try:
+        job = wait_for(display_worker, display_worker.submit(SCREENS[0], force=True, mode="unknown")["id"])
+
+    finally:
+        assert display_worker.stop(timeout=30)
+
+    assert job["status"] == worker.FAILED
+
+
+def test_history_is_bounded(epd):
+    """ only the most recent jobs are kept for status lookups """
+    display_worker = worker.DisplayWorker(epd, history=2)
+
+    jobs = [display_worker.submit(SCREENS[0]) for _ in range(3)]
+
+    assert display_worker.job(jobs[0]["id"]) is None
+    assert display_worker.job(jobs[1]["id"])["status"] == worker.COALESCED
+    assert display_worker.job(jobs[2]["id"])["status"] == worker.QUEUED
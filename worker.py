@@ -0,0 +1,283 @@
+""" background display worker for Baedge """
+
+import collections
+import threading
+import time
+import uuid
+
+import helpers as hlp
+import config as cfg
+import baedge
+
+# job statuses, in order of progression
+QUEUED = "queued"
+RENDERING = "rendering"
+REFRESHING = "refreshing"
+DONE = "done"
+
+# terminal job statuses for jobs that were not drawn
+COALESCED = "coalesced"
+FAILED = "failed"
+
+
+class DisplayWorker(threading.Thread):
+    """
+    Single background thread that owns the EPD and writes screens to it, one job at a time
+
+    Only one job is kept pending: submitting a job while another one is still pending coalesces the pending one,
+    so that only the most recently requested screen is drawn.
+    """
+
+    def __init__(self, epd, history=None):
+        """
+        Parameters:
+            epd (object):  Object containing EPD library and configuration
+            history (int): Maximum number of jobs to keep for status lookups
+        """
+
+        super().__init__(name="baedge-display-worker", daemon=True)
+
+        self.epd = epd
+
+        self._condition = threading.Condition()
+        self._history = history or cfg.app["jobs"]["history"]
+        self._jobs = collections.OrderedDict()
+        self._pending = None
+        self._stopping = False
+
+    def submit(self, screen_name, force=False, mode=None):
+        """
+        Queue a screen to be written to the EPD
+
+        Parameters:
+            screen_name (string): String indicating which screen to load data from
+            force (bool):         Boolean indicating whether to refresh the display if the frame is already displayed
+            mode (string):        String containing the refresh mode, or None for the default refresh mode
+
+        Returns:
+            dict: Dict containing the status of the queued job
+        """
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "screen": screen_name,
+            "force": force,
+            "mode": mode,
+            "status": QUEUED,
+            "result": None,
+            "coalesced_by": None,
+            "timestamps": {
+                QUEUED: time.time(),
+            },
+            "timings": {},
+        }
+
+        with self._condition:
+            # coalesce the pending job, it would be overwritten by this job anyway
+            if self._pending is not None:
+                hlp.log_debug('DisplayWorker.submit', 'coalesce job `' + self._pending["id"] + '`')
+                self._pending["coalesced_by"] = job["id"]
+                self._set_status(self._pending, COALESCED)
+
+            self._pending = job
+            self._jobs[job["id"]] = job
+
+            # only keep a bounded number of jobs for status lookups
+            while len(self._jobs) > self._history:
+                self._jobs.popitem(last=False)
+
+            self._condition.notify()
+
+            return self._export(job)
+
+    def job(self, job_id):
+        """
+        Retrieve the status of a job
+
+        Parameters:
+            job_id (string): String containing the job identifier
+
+        Returns:
+            dict: Dict containing the status of the job, or None if the job is unknown
+        """
+
+        with self._condition:
+            job = self._jobs.get(job_id)
+
+            return self._export(job) if job else None
+
+    def stop(self, timeout=None):
+        """
+        Stop the worker after the current job (if any) has finished
+
+        Parameters:
+            timeout (float): Maximum number of seconds to wait for the current job to finish
+
+        Returns:
+            bool: Boolean True if the worker has stopped
+        """
+
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+
+        if self.is_alive():
+            self.join(timeout)
+
+        return not self.is_alive()
+
+    def run(self):
+        hlp.log_debug('DisplayWorker.run', 'start worker')
+
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopping:
+                    self._condition.wait()
+
+                if self._stopping:
+                    hlp.log_debug('DisplayWorker.run', 'stop worker')
+                    return
+
+                job, self._pending = self._pending, None
+                self._set_status(job, RENDERING)
+
+            self._process(job)
+
+    def _process(self, job):
+        """
+        Write the screen of a job to the EPD and record its result
+        """
+
+        def progress(stage):
+            with self._condition:
+                self._set_status(job, stage)
+
+        try:
+            result = baedge.write_screen(self.epd, job["screen"], force=job["force"], progress=progress, mode=job["mode"])
+
+        # the worker must survive any failure of a single job
+        # pylint: disable=broad-exception-caught
+        except Exception as e:
+            hlp.log_exception('DisplayWorker._process', e)
+            result = False
+
+        with self._condition:
+            if result == baedge.UNCHANGED:
+                job["result"] = baedge.UNCHANGED
+                self._set_status(job, DONE)
+
+            elif result:
+                job["result"] = "written"
+                self._set_status(job, DONE)
+
+            else:
+                job["result"] = "failed"
+                self._set_status(job, FAILED)
+
+        hlp.log_debug('DisplayWorker._process', self._export(job))
+
+    @staticmethod
+    def _set_status(job, status):
+        """
+        Update the status of a job and the time spent in its previous status
+        """
+
+        now = time.time()
+        previous = job["status"]
+
+        job["timings"][previous] = round((now - job["timestamps"][previous]) * 1000, 1)
+        job["timestamps"][status] = now
+        job["status"] = status
+
+        if status in (DONE, COALESCED, FAILED):
+            job["timings"]["total"] = round((now - job["timestamps"][QUEUED]) * 1000, 1)
+
+    @staticmethod
+    def _export(job):
+        """
+        Create a serializable copy of a job
+        """
+
+        return {
+            "id": job["id"],
+            "screen": job["screen"],
+            "force": job["force"],
+            "mode": job["mode"],
+            "status": job["status"],
+            "result": job["result"],
+            "coalesced_by": job["coalesced_by"],
+
+            # durations (in milliseconds) spent in each status
+            "timings_ms": dict(job["timings"]),
+        }
+
+
+class WarmupWorker(threading.Thread):
+    """
+    Background thread that renders and packs screens ahead of their first write, so they are served from the buffer cache
+    """
+
+    def __init__(self, epd, screen_names):
+        """
+        Parameters:
+            epd (object):        Object containing EPD library and configuration
+            screen_names (list): List of screen names to warm up, in order
+        """
+
+        super().__init__(name="baedge-warmup-worker", daemon=True)
+
+        self.epd = epd
+        self.screen_names = list(screen_names)
+
+        self._lock = threading.Lock()
+        self._status = QUEUED
+        self._screens = {screen_name: QUEUED for screen_name in self.screen_names}
+        self._started_at = None
+        self._duration = None
+
+    def progress(self):
+        """
+        Retrieve the progress of the warm-up
+
+        Returns:
+            dict: Dict containing the overall status, the number of screens, and the status of each screen
+        """
+
+        with self._lock:
+            return {
+                "status": self._status,
+                "total": len(self._screens),
+                "done": sum(1 for status in self._screens.values() if status in (DONE, FAILED)),
+                "screens": dict(self._screens),
+                "duration_ms": self._duration,
+            }
+
+    def run(self):
+        hlp.log_debug('WarmupWorker.run', f'warm up {len(self.screen_names)} screens')
+
+        with self._lock:
+            self._status = RENDERING
+            self._started_at = time.time()
+
+        for screen_name in self.screen_names:
+            with self._lock:
+                self._screens[screen_name] = RENDERING
+
+            try:
+                baedge.prepare_screen(self.epd, screen_name)
+                status = DONE
+
+            # a screen that fails to render is rendered (and reported) again when it is written
+            # pylint: disable=broad-exception-caught
+            except Exception as e:
+                hlp.log_exception('WarmupWorker.run', e)
+                status = FAILED
+
+            with self._lock:
+                self._screens[screen_name] = status
+
+        with self._lock:
+            self._status = DONE
+            self._duration = round((time.time() - self._started_at) * 1000, 1)
+
+        hlp.log_debug('WarmupWorker.run', self.progress())